@@ -1,28 +1,26 @@
 from __future__ import annotations
 
-from dataclasses import asdict
+from dataclasses import asdict, replace
 import time
 
+import pandas as pd
 import streamlit as st
 
-from tradebot.app.bot_service import BotService
+from tradebot.app.registry import BotRunner, get_registry
 from tradebot.config.settings import BotConfig, load_config
 from tradebot.loggingx.logger import sanitize_secret
+from tradebot.loggingx.store import get_log_store
 
-try:
-    from streamlit_autorefresh import st_autorefresh
-except Exception:
-    st_autorefresh = None
+LOG_PAGE_SIZE = 50
+LOG_WINDOWS = {"15 min": 900, "1 hour": 3600, "24 hours": 86400, "All": None}
+CHART_WINDOWS = {"1 hour": 3600, "6 hours": 6 * 3600, "24 hours": 86400, "7 days": 7 * 86400, "All": None}
 
 
 def init_state() -> None:
-    cfg = load_config()
     defaults = {
-        "cfg": cfg,
-        "bot": BotService(cfg),
-        "running": False,
-        "last_decision_ts": 0.0,
+        "cfg": load_config(),
         "last_snapshot": None,
+        "snapshot_version": 0,
         "close_all_confirm": False,
     }
     for k, v in defaults.items():
@@ -30,8 +28,15 @@ def init_state() -> None:
             st.session_state[k] = v
 
 
+def current_runner() -> BotRunner:
+    # Bot process genelinde tek; session sadece config'ine karşılık gelen runner'ı okur.
+    return get_registry().get(st.session_state["cfg"])
+
+
 def sidebar_controls() -> BotConfig:
-    cfg: BotConfig = st.session_state["cfg"]
+    # Widget'lar paylaşılan botun config'inden başlar; izleyici sadece okur, değişiklik ancak Apply ile uygulanır.
+    runner = current_runner()
+    cfg = replace(runner.cfg)
     st.sidebar.header("Bot Controls")
     provider = st.sidebar.selectbox("Provider", ["RuleBased", "OpenAI", "Gemini", "Ollama"], index=["RuleBased", "OpenAI", "Gemini", "Ollama"].index(cfg.decider_provider))
     model_map = {
@@ -40,13 +45,15 @@ def sidebar_controls() -> BotConfig:
         "Gemini": ["gemini-1.5-flash", "gemini-1.5-pro"],
         "Ollama": ["llama3.1", "mistral"],
     }
-    model = st.sidebar.selectbox("Model", model_map[provider])
+    models = model_map[provider]
+    if provider == cfg.decider_provider and cfg.decider_model not in models:
+        models = [cfg.decider_model, *models]
+    model = st.sidebar.selectbox("Model", models, index=models.index(cfg.decider_model) if cfg.decider_model in models else 0)
     symbol = st.sidebar.text_input("Symbol", value=cfg.default_symbol).upper()
     market_type = st.sidebar.selectbox("Market Type", ["spot", "futures"], index=["spot", "futures"].index(cfg.market_type))
     mode = st.sidebar.selectbox("Mode", ["paper", "demo", "live"], index=["paper", "demo", "live"].index(cfg.bot_mode))
     decision_interval = st.sidebar.number_input("Decision interval (sec)", min_value=1, value=int(cfg.decision_interval_seconds))
     ui_refresh = st.sidebar.number_input("UI refresh interval (sec)", min_value=1, value=int(cfg.ui_refresh_interval_seconds))
-    emergency_stop = st.sidebar.toggle("Emergency Stop", value=st.session_state["bot"].emergency_stop)
 
     updated = BotConfig(**{**asdict(cfg),
         "decider_provider": provider,
@@ -57,25 +64,41 @@ def sidebar_controls() -> BotConfig:
         "decision_interval_seconds": int(decision_interval),
         "ui_refresh_interval_seconds": int(ui_refresh),
     })
+    if updated != cfg:
+        st.sidebar.caption("Bekleyen değişiklik: paylaşılan bot tüm izleyiciler için değişir")
+        if st.sidebar.button("Apply", width="stretch"):
+            # Bot yeniden kurulmaz; sadece değişen bileşen (decider/exchange/data) yerinde değiştirilir.
+            runner, report = get_registry().reconfigure(runner, updated)
+            st.session_state["reconfig_report"] = report
+    # Session config'i paylaşılan botun güncel config'ini izler (başka bir izleyici değiştirmiş olabilir).
+    updated = replace(runner.cfg)
     st.session_state["cfg"] = updated
-    st.session_state["bot"].set_emergency_stop(emergency_stop)
+    report = st.session_state.get("reconfig_report")
+    if report and report["changed"]:
+        st.sidebar.caption(f"Reconfigured {', '.join(report['components']) or 'config'} in {report['duration_ms']} ms")
+    if report and report["skipped"]:
+        st.sidebar.warning("Uygulanmadı: " + "; ".join(report["skipped"]))
+    st.sidebar.toggle(
+        "Emergency Stop",
+        value=runner.bot.emergency_stop,
+        key=f"emergency_stop_{hash(runner.key)}",
+        on_change=lambda: runner.set_emergency_stop(not runner.bot.emergency_stop),
+    )
     return updated
 
 
 def control_buttons(cfg: BotConfig) -> None:
+    runner = current_runner()
     c1, c2, c3, c4 = st.columns(4)
     with c1:
         if st.button("Start", width="stretch"):
-            st.session_state["bot"] = BotService(cfg)
-            st.session_state["running"] = True
-            st.session_state["last_decision_ts"] = 0.0
+            runner.start()
     with c2:
         if st.button("Stop", width="stretch"):
-            st.session_state["running"] = False
+            runner.stop()
     with c3:
         if st.button("Run Once", width="stretch"):
-            st.session_state["last_snapshot"] = st.session_state["bot"].run_once()
-            st.session_state["last_decision_ts"] = time.time()
+            runner.run_once()
     with c4:
         if st.button("Close All Positions", width="stretch"):
             st.session_state["close_all_confirm"] = True
@@ -83,24 +106,42 @@ def control_buttons(cfg: BotConfig) -> None:
     if st.session_state.get("close_all_confirm"):
         st.warning("Close All için onay verin")
         if st.checkbox("Evet, tüm pozisyonları kapat", key="confirm_close_all"):
-            st.session_state["last_snapshot"] = st.session_state["bot"].close_all_positions()
+            runner.close_all()
             st.session_state["close_all_confirm"] = False
+    st.caption(f"Bot: {'running' if runner.running else 'stopped'} | Viewers share one bot per config")
 
 
 def tick_runtime() -> None:
-    bot: BotService = st.session_state["bot"]
-    cfg: BotConfig = st.session_state["cfg"]
-    now = time.time()
+    # Decision/refresh döngüsü registry thread'inde; session sadece son yayınlanan snapshot'ı okur.
+    published = current_runner().read()
+    if published is not None and published.version != st.session_state["snapshot_version"]:
+        st.session_state["last_snapshot"] = published.snapshot
+        st.session_state["snapshot_version"] = published.version
+
+
+def _prepared(name: str, version: int, build):
+    # Panel verisi (DataFrame, log metni) versiyon başına bir kez hazırlanır; değişmeyen panel tekrar kurulmaz.
+    cache = st.session_state.setdefault("prepared", {})
+    hit = cache.get(name)
+    if hit is not None and hit[0] == version:
+        st.session_state.setdefault("render_skips", {}).setdefault(name, 0)
+        st.session_state["render_skips"][name] += 1
+        return hit[1]
+    value = build()
+    cache[name] = (version, value)
+    return value
 
-    if st.session_state["running"] and now - st.session_state["last_decision_ts"] >= cfg.decision_interval_seconds:
-        st.session_state["last_snapshot"] = bot.run_once()
-        st.session_state["last_decision_ts"] = now
-    else:
-        # Decision zamanı gelmese bile UI tarafında balance/position/pnl canlı yenilensin.
-        st.session_state["last_snapshot"] = bot.refresh_only()
 
+def _timed_panel(name: str, render) -> None:
+    snapshot = st.session_state.get("last_snapshot")
+    if not snapshot:
+        return
+    started = time.perf_counter()
+    render(snapshot, snapshot.get("versions", {}).get(name, -1))
+    st.session_state.setdefault("render_ms", {})[name] = (time.perf_counter() - started) * 1000
 
-def render_panels(snapshot: dict) -> None:
+
+def render_cards(snapshot: dict, version: int) -> None:
     cards = snapshot["account_cards"]
     a, b, c, d, e = st.columns(5)
     a.metric("Wallet Balance", f"{cards['wallet_balance']:.2f}")
@@ -108,33 +149,160 @@ def render_panels(snapshot: dict) -> None:
     c.metric("Equity", f"{cards['equity']:.2f}")
     d.metric("Unrealized PnL", f"{cards['unrealized_pnl']:.2f}")
     e.metric("Realized PnL(Session)", f"{cards['realized_pnl']:.2f}")
-
     st.caption("Not: Paper modda bakiye/pozisyon simülasyon verisidir. Demo/Live modda spot için USDT bakiyesi test hesaptan senkronlanır.")
+
+
+def render_positions(snapshot: dict, version: int) -> None:
     st.subheader("Open Positions")
-    st.dataframe(snapshot["positions"], width="stretch")
+    st.dataframe(_prepared("positions", version, lambda: pd.DataFrame(snapshot["positions"])), width="stretch")
+
+
+def render_decision(snapshot: dict, version: int) -> None:
     st.subheader("Last Decision")
     st.json(snapshot["last_decision"])
-    st.subheader("Recent Orders")
-    st.dataframe(snapshot["recent_orders"], width="stretch")
     st.subheader("Order Result")
     st.json(snapshot["order_result"])
-    st.subheader("Recent Logs")
-    st.code("\n".join(snapshot["logs"][:30]))
+    if snapshot.get("shadow_leaderboard"):
+        st.subheader("Shadow Leaderboard")
+        st.dataframe(_prepared("shadow", version, lambda: pd.DataFrame(snapshot["shadow_leaderboard"])), width="stretch")
     if snapshot.get("error"):
         st.error(snapshot["error"])
 
 
+def render_orders(snapshot: dict, version: int) -> None:
+    st.subheader("Recent Orders")
+    st.dataframe(_prepared("orders", version, lambda: pd.DataFrame(snapshot["recent_orders"])), width="stretch")
+
+
+def _chart_frames(payload: dict) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    def frame(points: list, column: str) -> pd.DataFrame:
+        df = pd.DataFrame(points, columns=["t", column])
+        df["time"] = pd.to_datetime(df["t"], unit="s", utc=True)
+        return df
+
+    markers = pd.DataFrame(payload["markers"], columns=["t", "action", "price", "status"])
+    markers["time"] = pd.to_datetime(markers["t"], unit="s", utc=True)
+    return frame(payload["equity"], "equity"), frame(payload["price"], "price"), markers
+
+
+def render_charts(snapshot: dict, version: int) -> None:
+    import altair as alt
+
+    # Seri sunucu tarafinda min/max piramidinde tutulur; pencere ne olursa olsun en fazla CHART_POINTS nokta gelir.
+    st.subheader("Equity / Price")
+    cfg = st.session_state["cfg"]
+    window = st.selectbox("Window", list(CHART_WINDOWS), index=len(CHART_WINDOWS) - 1, key="chart_window")
+    charts = current_runner().bot.charts
+    equity, price, markers = _prepared(
+        "charts", (version, window), lambda: _chart_frames(charts.payload(CHART_WINDOWS[window], cfg.chart_points))
+    )
+    left, right = st.columns(2)
+    left.altair_chart(alt.Chart(equity).mark_line().encode(x="time:T", y=alt.Y("equity:Q", scale=alt.Scale(zero=False))), width="stretch")
+    line = alt.Chart(price).mark_line().encode(x="time:T", y=alt.Y("price:Q", scale=alt.Scale(zero=False)))
+    points = alt.Chart(markers).mark_point(filled=True, size=80).encode(x="time:T", y="price:Q", color="action:N", tooltip=["action:N", "price:Q", "status:N"])
+    right.altair_chart(line + points, width="stretch")
+    st.caption(f"Points sent: equity={len(equity)}, price={len(price)}, decisions={len(markers)}")
+
+
+def render_analytics(snapshot: dict, version: int) -> None:
+    analytics = snapshot.get("analytics")
+    if not analytics:
+        return
+    st.subheader("Performance")
+    total = analytics["total"]
+    a, b, c, d, e = st.columns(5)
+    a.metric("Trades", total["trades"])
+    b.metric("Win Rate", f"{total['win_rate'] * 100:.1f}%")
+    c.metric("Net PnL", f"{total['net_pnl']:.2f}")
+    d.metric("Avg Hold", f"{total['avg_hold_seconds'] / 60:.1f} min")
+    e.metric("Max Drawdown", f"{analytics['max_drawdown']:.2f}")
+    tables = _prepared(
+        "analytics",
+        version,
+        lambda: {name: pd.DataFrame(analytics[name]) for name in ("daily", "hourly", "by_symbol", "by_decider")},
+    )
+    daily, hourly, by_symbol, by_decider = st.tabs(["Daily", "Hourly", "Per symbol", "Per decider"])
+    daily.dataframe(tables["daily"], width="stretch")
+    hourly.dataframe(tables["hourly"], width="stretch")
+    by_symbol.dataframe(tables["by_symbol"], width="stretch")
+    by_decider.dataframe(tables["by_decider"], width="stretch")
+
+
+def render_logs(snapshot: dict, version: int) -> None:
+    store = get_log_store()
+    if store is None:
+        st.subheader("Recent Logs")
+        st.code(_prepared("logs", version, lambda: "\n".join(snapshot["logs"][:30])))
+        return
+    # LOG_DIR aciksa disk store'dan filtreli/sayfali okunur; sadece eslesen segmentler acilir.
+    st.subheader("Logs")
+    facets = store.facets()
+    a, b, c, d, e = st.columns(5)
+    window = a.selectbox("Range", list(LOG_WINDOWS), key="log_window")
+    level = b.selectbox("Min level", ["", "INFO", "WARNING", "ERROR"], key="log_level")
+    event = c.text_input("Event", key="log_event", placeholder="tick.*")
+    symbol = d.selectbox("Symbol", [""] + facets["symbols"], key="log_symbol")
+    text = e.text_input("Search", key="log_text")
+    page = int(st.number_input("Page", min_value=1, value=1, step=1, key="log_page"))
+    seconds = LOG_WINDOWS[window]
+    filters = (window, level, event, symbol, text, page)
+    result = _prepared(
+        "logs_query",
+        (version, filters),
+        lambda: store.query(
+            start=time.time() - seconds if seconds else None,
+            level=level or None,
+            event=event or None,
+            symbol=symbol or None,
+            text=text or None,
+            offset=(page - 1) * LOG_PAGE_SIZE,
+            limit=LOG_PAGE_SIZE,
+        ),
+    )
+    rows = pd.DataFrame(result["rows"])
+    st.dataframe(rows.drop(columns=["t"], errors="ignore"), width="stretch")
+    st.caption(
+        f"Page {page} | {len(result['rows'])} rows | {'more pages' if result['has_more'] else 'last page'} | "
+        f"segments read {result['segments_scanned']}/{result['segments_total']}"
+    )
+
+
+def render_timings() -> None:
+    render_ms = st.session_state.get("render_ms", {})
+    skips = st.session_state.get("render_skips", {})
+    snapshot = st.session_state.get("last_snapshot") or {}
+    stages = snapshot.get("stage_timings_ms", {})
+    weight = snapshot.get("rate_limit") or {}
+    prompt = snapshot.get("prompt") or {}
+    st.caption(
+        "Render ms: " + ", ".join(f"{k}={v:.1f}" for k, v in render_ms.items())
+        + " | Cache hit: " + ", ".join(f"{k}={v}" for k, v in skips.items())
+        + " | Tick ms: " + ", ".join(f"{k}={v}" for k, v in stages.items())
+        + (f" | Binance weight: {weight['used_weight_1m']}/{weight['limit_per_minute']} (waiting {weight['waiting']})" if weight else "")
+        + (f" | Prompt: {prompt['tokens']}/{prompt['budget']} tok" + (f" (cached {prompt['cached_tokens']})" if prompt.get("cached_tokens") else "") if prompt else "")
+    )
+
+
+def render_panels(cfg: BotConfig) -> None:
+    # Her panel kendi fragment'inde yenilenir; tam script rerun'i sadece sidebar/buton etkileşiminde olur.
+    every = f"{cfg.ui_refresh_interval_seconds}s"
+    st.fragment(tick_runtime, run_every=every)()
+    st.fragment(lambda: _timed_panel("cards", render_cards), run_every=every)()
+    st.fragment(lambda: _timed_panel("positions", render_positions), run_every=every)()
+    st.fragment(lambda: _timed_panel("decision", render_decision), run_every=every)()
+    st.fragment(lambda: _timed_panel("orders", render_orders), run_every=every)()
+    st.fragment(lambda: _timed_panel("charts", render_charts), run_every=every)()
+    st.fragment(lambda: _timed_panel("analytics", render_analytics), run_every=every)()
+    st.fragment(lambda: _timed_panel("logs", render_logs), run_every=every)()
+    st.fragment(render_timings, run_every=every)()
+
+
 def main() -> None:
     st.set_page_config(page_title="TradeBot Live Monitor", layout="wide")
     init_state()
     cfg = sidebar_controls()
     control_buttons(cfg)
 
-    if st_autorefresh:
-        st_autorefresh(interval=cfg.ui_refresh_interval_seconds * 1000, key="ui_refresh")
-    else:
-        st.info("Auto refresh eklentisi yok; canlı güncelleme için streamlit-autorefresh paketini kurun.")
-
     st.caption(
         f"Python {cfg.python_version} | Mode={cfg.bot_mode} | Market={cfg.market_type} | LiveEnabled={cfg.live_trading_enabled} | API={sanitize_secret(cfg.binance_api_key)}"
     )
@@ -143,8 +311,7 @@ def main() -> None:
     if cfg.bot_mode in {"demo", "live"} and cfg.market_type == "futures":
         st.warning("Futures demo/live order entegrasyonu bu MVP'de tamamlanmadı. Spot testnet kullanın.")
 
-    tick_runtime()
-    render_panels(st.session_state["last_snapshot"])
+    render_panels(cfg)
 
 
 if __name__ == "__main__":
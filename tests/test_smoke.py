@@ -1,5 +1,6 @@
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from tradebot.config.settings import load_config
@@ -178,3 +179,1153 @@ def test_mainnet_credentials_when_testnet_false():
     k, sct = svc._active_api_credentials()
     assert k == 'main_key'
     assert sct == 'main_secret'
+
+
+def test_shadow_runner_leaderboard_and_timeout():
+    import time as _time
+    from tradebot.app.shadow import ShadowRunner, parse_shadow_spec
+    from tradebot.config.settings import BotConfig
+    from tradebot.deciders.base import BaseDecider
+
+    class SlowDecider(BaseDecider):
+        def decide(self, context):
+            _time.sleep(0.5)
+            return {"action": "buy", "position_size_pct": 10.0}
+
+    assert parse_shadow_spec("Ollama:llama3.1:8b") == ("Ollama", "llama3.1:8b")
+    cfg = BotConfig(shadow_deciders=["RuleBased:rule-v1", "RuleBased:rule-v1"], shadow_timeout_seconds=0.1)
+    runner = ShadowRunner(cfg)
+    runner.add_slot("slow", SlowDecider())
+    ctx = BotContext(
+        symbol="DOGEUSDT",
+        market_type="spot",
+        latest_price=0.1,
+        indicators={"ema_9": 0.11, "ema_21": 0.1, "rsi_14": 50, "atr_14": 0.001},
+        balances={"wallet": 1000, "available": 1000},
+        positions=[],
+        recent_orders=[],
+    )
+    runner.collect(runner.submit(ctx), ctx)
+    # Takilan decider'in onceki isi surerken ona yeni is verilmez.
+    assert [slot.name for slot, _ in runner.submit(ctx)] == ["RuleBased:rule-v1", "RuleBased:rule-v1#2"]
+    board = {row["name"]: row for row in runner.leaderboard(0.12)}
+    runner.shutdown()
+    assert set(board) == {"RuleBased:rule-v1", "RuleBased:rule-v1#2", "slow"}
+    assert board["RuleBased:rule-v1"]["trades"] == 1
+    assert board["RuleBased:rule-v1"]["total_pnl"] > 0
+    assert board["slow"]["timeouts"] == 1 and board["slow"]["trades"] == 0 and board["slow"]["skipped"] == 1
+
+
+def _exit_immediately(*args):
+    return None
+
+
+def test_shared_buffer_and_supervisor_restart():
+    from tradebot.app.supervisor import ShardSupervisor, shard_symbols
+    from tradebot.config.settings import BotConfig
+    from tradebot.data.shared_buffer import SharedMarketBuffer
+
+    assert shard_symbols(["A", "B", "C"], 2) == [["A", "C"], ["B"]]
+    sup = ShardSupervisor(BotConfig(lookback=5), symbols=["dogeusdt", "btcusdt"], workers=2, target=_exit_immediately, mp_context="fork", restart_backoff=0)
+    sup.start()
+    try:
+        for proc in sup.procs:
+            proc.join(timeout=5)
+        assert sup.monitor() == [0, 1]
+        reader = SharedMarketBuffer.attach(sup.buffer.name, sup.symbols, 5, 2)
+        candles = pd.DataFrame({"open_time": range(8), "open": 1.0, "high": 1.0, "low": 1.0, "close": [float(i) for i in range(8)], "volume": 1.0})
+        sup.buffer.publish("DOGEUSDT", candles=candles, price=0.2, account={"wallet_balance": 1000, "available_balance": 900, "base_qty": 1000, "entry_price": 0.1, "realized_pnl": 2})
+        assert reader.read_candles("DOGEUSDT")["close"].tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+        reader.close()
+        view = sup.combined_view()
+        assert view["account_cards"]["unrealized_pnl"] > 99
+        assert view["account_cards"]["realized_pnl"] == 2
+        assert [w["restarts"] for w in view["workers"]] == [1, 1]
+    finally:
+        sup.stop()
+
+
+def test_batch_indicators_match_single_snapshot():
+    import numpy as np
+    from tradebot.indicators.batch import compute_batch_snapshot_from_frames, rank_candidates
+
+    rng = np.random.default_rng(7)
+    frames = {}
+    for sym in ["AUSDT", "BUSDT", "CUSDT"]:
+        close = 100 + np.cumsum(rng.normal(0, 1, 120))
+        frames[sym] = pd.DataFrame({
+            "open": close, "high": close + rng.random(120), "low": close - rng.random(120), "close": close, "volume": rng.random(120) * 10,
+        })
+    table = compute_batch_snapshot_from_frames(frames)
+    for sym, df in frames.items():
+        single = compute_indicator_snapshot(df)
+        for key, value in single.items():
+            assert abs(table.loc[sym, key] - value) < 1e-9
+    assert {"bb_upper", "macd_hist", "vwap"}.issubset(table.columns)
+    assert set(rank_candidates(table).index).issubset(frames)
+
+    # Yeni listelenmis (az mumlu) sembol digerlerinin penceresini kisaltmaz; kendi EMA'si kendi mumlarindan hesaplanir.
+    frames["NEWUSDT"] = frames["AUSDT"].tail(10).reset_index(drop=True)
+    mixed = compute_batch_snapshot_from_frames(frames)
+    assert abs(mixed.loc["BUSDT", "ema_21"] - table.loc["BUSDT", "ema_21"]) < 1e-9
+    assert abs(mixed.loc["BUSDT", "macd_signal"] - table.loc["BUSDT", "macd_signal"]) < 1e-9
+    assert abs(mixed.loc["NEWUSDT", "ema_9"] - compute_indicator_snapshot(frames["NEWUSDT"])["ema_9"]) < 1e-9
+    assert np.isnan(mixed.loc["NEWUSDT", "rsi_14"])
+    assert compute_batch_snapshot_from_frames({}).empty
+
+
+def _stub_bot(tmp_path: Path, monkeypatch, delay: float = 0.0, **overrides):
+    import time as _time
+    from tradebot.app import bot_service
+    from tradebot.config.settings import BotConfig
+
+    closes = [1 + i * 0.005 + (0.02 if i % 2 else 0.0) for i in range(60)]
+    frame = pd.DataFrame({"open_time": range(60), "open": closes, "high": closes, "low": closes, "close": closes, "volume": [1.0] * 60})
+
+    def fake_fetch(*args, **kwargs):
+        _time.sleep(delay)
+        return frame.copy()
+
+    monkeypatch.setattr(bot_service, "fetch_ohlcv", fake_fetch)
+    bot = bot_service.BotService(BotConfig(state_file=str(tmp_path / "state.json"), cooldown_seconds=0, **overrides))
+
+    def fake_rules(symbol):
+        _time.sleep(delay)
+        return {"step_size": 0.001, "min_qty": 0.001, "min_notional": 1, "tick_size": 0.0001}
+
+    bot.exchange.get_symbol_rules = fake_rules
+    bot.exchange.get_latest_price = lambda symbol: closes[-1]
+    return bot
+
+
+def test_async_tick_runs_io_concurrently(tmp_path: Path, monkeypatch):
+    import time as _time
+
+    bot = _stub_bot(tmp_path, monkeypatch, delay=0.3)
+    started = _time.perf_counter()
+    snap = bot.run_once()
+    assert _time.perf_counter() - started < 0.8
+    assert snap["error"] is None
+    assert snap["order_result"]["status"] == "filled"
+    assert snap["positions"][0]["qty"] > 0
+    assert {"data", "decide", "snapshot"}.issubset(snap["stage_timings_ms"])
+
+
+def test_slow_shadow_decider_does_not_delay_tick(tmp_path: Path, monkeypatch):
+    import time as _time
+    from tradebot.deciders.base import BaseDecider
+
+    class SlowDecider(BaseDecider):
+        def decide(self, context):
+            _time.sleep(1.0)
+            return {"action": "hold"}
+
+    bot = _stub_bot(tmp_path, monkeypatch, shadow_timeout_seconds=5)
+    bot.shadow.add_slot("slow", SlowDecider())
+    started = _time.perf_counter()
+    snap = bot.run_once()
+    assert _time.perf_counter() - started < 0.8 and snap["error"] is None
+    bot.shadow.shutdown()
+
+
+def test_async_tick_stage_timeout(tmp_path: Path, monkeypatch):
+    bot = _stub_bot(tmp_path, monkeypatch, delay=0.5, data_timeout_seconds=0.1)
+    snap = bot.run_once()
+    assert "data stage timeout" in snap["error"]
+    assert snap["order_result"]["status"] == "error"
+
+
+def test_timed_out_stage_threads_return_before_next_tick(tmp_path: Path, monkeypatch):
+    import time as _time
+    import requests
+    from tradebot.data.market_data import fetch_ohlcv
+    from tradebot.deciders.ollama_decider import OllamaDecider
+
+    running: list[float] = []
+
+    def hung(timeout):
+        # Cevap vermeyen sunucu: istek ancak requests timeout'u dolunca hata ile doner.
+        running.append(timeout)
+        try:
+            _time.sleep(timeout)
+        finally:
+            running.remove(timeout)
+        raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(requests, "post", lambda url, json, timeout: hung(timeout))
+    monkeypatch.setattr(requests, "get", lambda url, params, timeout: hung(timeout))
+    bot = _stub_bot(tmp_path, monkeypatch, decide_timeout_seconds=0.3, data_timeout_seconds=0.3)
+    bot.decider = OllamaDecider()
+    started = _time.perf_counter()
+    snap = bot.run_once()
+    # Thread kendi timeout'unu asamanin kalan suresiyle sinirlar; tick bittiginde calisan is kalmaz.
+    assert _time.perf_counter() - started < 1.5 and running == []
+    assert snap["last_decision"]["action"] == "hold" and snap["last_decision"]["fallback_reason"]
+
+    bot.fetch_ohlcv = fetch_ohlcv
+    started = _time.perf_counter()
+    snap = bot.run_once()
+    assert _time.perf_counter() - started < 1.5 and running == []
+    assert "data stage timeout" in snap["error"] or "timed out" in snap["error"]
+
+
+def test_bot_registry_shares_bot_and_publishes_versions(tmp_path: Path):
+    from dataclasses import replace
+    from tradebot.app.registry import BotRegistry
+    from tradebot.config.settings import BotConfig
+
+    registry = BotRegistry()
+    cfg = BotConfig(state_file=str(tmp_path / "state.json"))
+    runner = registry.get(cfg)
+    assert registry.get(replace(cfg, ui_refresh_interval_seconds=5)) is runner
+    assert registry.get(replace(cfg, default_symbol="BTCUSDT")) is not runner
+
+    calls = []
+    runner.bot.refresh_only = lambda: calls.append(1) or {"n": len(calls)}
+    runner.ensure_thread = lambda: None
+    first = runner.read()
+    second = runner.read()
+    assert first.version == second.version == 1 and len(calls) == 1
+    runner.refresh()
+    assert registry.bus.wait_for(runner.key, after_version=1, timeout=1).snapshot == {"n": 2}
+    # Eski config'le remove, yerinde yeniden yapilandirilmis botu da bulur.
+    moved, _ = registry.reconfigure(runner, replace(cfg, timeframe_slow="15m"))
+    assert moved is runner and registry.get(cfg) is runner
+    registry.remove(cfg)
+    assert runner not in registry.runners() and registry.get(cfg) is not runner
+    registry.shutdown()
+
+
+def test_apply_config_swaps_only_changed_components(tmp_path: Path):
+    from dataclasses import replace
+    from tradebot.app.bot_service import BotService
+    from tradebot.config.settings import BotConfig
+
+    cfg = BotConfig(state_file=str(tmp_path / "state.json"))
+    bot = BotService(cfg)
+    decider, exchange, history = bot.decider, bot.exchange, bot.history
+    bot.portfolio.session_realized_pnl = 3.0
+    bot.risk.register_trade("DOGEUSDT")
+
+    report = bot.apply_config(replace(cfg, decider_provider="Ollama", decider_model="mistral", max_positions=5))
+    assert report["components"] == ["decider", "risk"]
+    assert bot.decider is not decider and bot.exchange is exchange and bot.history is history
+    assert bot.risk.cfg.max_positions == 5 and "DOGEUSDT" in bot.risk.last_trade_ts
+    assert bot.portfolio.session_realized_pnl == 3.0
+
+    bot.wallet.buy(price=0.1, quote_amount=10)
+    report = bot.apply_config(replace(bot.cfg, default_symbol="BTCUSDT", market_type="futures"))
+    assert report["changed"] == [] and len(report["skipped"]) == 2
+    assert bot.cfg.default_symbol == "DOGEUSDT" and bot.exchange is exchange
+
+
+def test_cold_start_lazy_imports_and_first_decision_budget():
+    from tradebot.app.startup_profile import TIME_TO_FIRST_DECISION_BUDGET_MS, cold_time_to_first_decision
+
+    report = cold_time_to_first_decision()
+    assert report["eager_heavy_modules"] == []
+    assert report["error"] is None
+    assert report["total_ms"] < TIME_TO_FIRST_DECISION_BUDGET_MS
+
+
+def test_paper_ledger_vectorized_mark_to_market():
+    from tradebot.portfolio.ledger import PaperLedger
+
+    ledger = PaperLedger(starting_balance=1000, capacity=1)
+    ledger.buy("DOGEUSDT", price=0.1, quote_amount=100)
+    ledger.buy("BTCUSDT", price=50000, quote_amount=100)
+    ledger.revalue({"DOGEUSDT": 0.11, "BTCUSDT": 45000})
+    svc = PortfolioService()
+    expected = [
+        svc.build_position("DOGEUSDT", qty=1000, entry_price=0.1, mark_price=0.11),
+        svc.build_position("BTCUSDT", qty=0.002, entry_price=50000, mark_price=45000),
+    ]
+    table = ledger.position_table()
+    for row, pos in zip(table, expected):
+        assert row["symbol"] == pos.symbol
+        assert abs(row["unrealized_pnl"] - pos.unrealized_pnl) < 1e-9
+        assert abs(row["pnl_pct"] - pos.pnl_pct) < 1e-9
+    cards = ledger.account_cards()
+    assert abs(cards["unrealized_pnl"] - sum(p.unrealized_pnl for p in expected)) < 1e-9
+
+    fee_ledger = PaperLedger(starting_balance=1000, fee_rate=0.001)
+    qty = fee_ledger.buy("DOGEUSDT", price=0.1, quote_amount=100.1)
+    fee_ledger.revalue(np.array([0.1]))
+    sold, realized = fee_ledger.sell("DOGEUSDT", price=0.1, qty=qty)
+    assert sold == qty and abs(realized) < 1e-9
+    cards = fee_ledger.account_cards()
+    assert cards["fees"] > 0.19
+    assert fee_ledger.position_table() == []
+
+
+def test_bot_paper_fills_and_snapshot_go_through_ledger(tmp_path: Path, monkeypatch):
+    bot = _stub_bot(tmp_path, monkeypatch, paper_fee_rate=0.001)
+    result = bot.execution.execute("DOGEUSDT", 1.0, {"action": "buy", "position_size_pct": 10})
+    assert result["status"] == "filled" and result["fee"] > 0
+    assert bot.ledger.qty[bot.ledger.index["DOGEUSDT"]] == result["qty"]
+
+    snap = bot._build_snapshot(1.1, None, result, None)
+    assert [row["symbol"] for row in snap["positions"]] == ["DOGEUSDT"]
+    assert snap["account_cards"]["fees"] == bot.ledger.account_cards()["fees"] > 0
+    assert snap["account_cards"]["unrealized_pnl"] > 0
+
+
+def test_order_book_gap_detection_and_depth_aware_paper_fill(tmp_path: Path):
+    import pytest
+    from tradebot.config.settings import BotConfig
+    from tradebot.data.order_book import DepthReplayFeed, OrderBook, SequenceGapError
+    from tradebot.execution.service import ExecutionService
+    from tradebot.exchange.binance_client import BinanceClient
+    from tradebot.history.store import InMemoryHistory
+
+    feed = DepthReplayFeed.synthetic(levels=20, updates=500, seed=3)
+    feed.to_jsonl(tmp_path / "depth.jsonl")
+    book = OrderBook("DOGEUSDT", max_levels=25)
+    assert DepthReplayFeed.from_jsonl(tmp_path / "depth.jsonl").apply_to(book) == 500
+    assert len(book.bids.levels) <= 25 and book.best_bid()[0] < book.best_ask()[0]
+    with pytest.raises(SequenceGapError):
+        book.apply_diff({"U": book.last_update_id + 5, "u": book.last_update_id + 6, "b": []})
+    assert book.needs_resync
+
+    class DummyExchange(BinanceClient):
+        def __init__(self):
+            pass
+        def get_symbol_rules(self, symbol: str) -> dict:
+            return {"step_size": 1.0, "min_qty": 1.0, "min_notional": 1, "tick_size": 0.0001}
+
+    cfg = BotConfig(paper_depth_fill=True)
+    svc = ExecutionService(cfg, InMemoryHistory(state_file=str(tmp_path / "s.json")), PaperWallet(1000, 1000), DummyExchange())
+    thin = OrderBook("DOGEUSDT")
+    thin.apply_snapshot(1, bids=[[0.099, 500]], asks=[[0.101, 300], [0.102, 200]])
+    svc.order_books["DOGEUSDT"] = thin
+    out = svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0})
+    assert out["status"] == "partially_filled" and out["qty"] == 500
+    assert 0.101 < out["avg_price"] < 0.102 and out["slippage_bps"] > 0
+    out = svc.execute("DOGEUSDT", 0.1, {"action": "close", "position_size_pct": 100.0})
+    assert out["status"] == "filled" and out["avg_price"] == 0.099 and out["realized_pnl"] < 0
+
+    orders = len(svc.history.list_orders(50))
+    svc.wallet.buy(0.1, 10)
+    dust = OrderBook("DOGEUSDT")
+    dust.apply_snapshot(2, bids=[[0.099, 0.4]], asks=[[0.101, 0.4]])
+    svc.order_books["DOGEUSDT"] = dust
+    out = svc.execute("DOGEUSDT", 0.1, {"action": "close", "position_size_pct": 100.0})
+    assert out == {"status": "rejected", "details": "insufficient book depth"}
+    assert svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0})["status"] == "rejected"
+    assert len(svc.history.list_orders(50)) == orders and svc.wallet.base_qty == 100
+
+
+def test_panel_versions_change_only_with_their_content(tmp_path: Path, monkeypatch):
+    bot = _stub_bot(tmp_path, monkeypatch)
+    panels = ("cards", "positions", "orders", "analytics", "decision", "logs")
+    first = bot._build_snapshot(1.0, None, None, None)["versions"]
+    again = bot._build_snapshot(1.0, None, None, None)["versions"]
+    # Grafik her snapshot'ta yeni nokta alir; diger paneller icerik ayniysa versiyonu korur.
+    assert {k: again[k] for k in panels} == {k: first[k] for k in panels} and again["charts"] > first["charts"]
+    assert bot._section_version("probe", {"a": 1}) == bot._section_version("probe", {"a": 1}) == 1
+    assert bot._section_version("probe", {"a": 2}) == 2
+
+    bot.logger.info("panel.version_probe")
+    logged = bot._build_snapshot(1.0, None, None, None)["versions"]
+    assert logged["logs"] > first["logs"]
+    assert all(logged[k] == first[k] for k in panels if k != "logs")
+
+    result = bot.execution.execute(bot.cfg.default_symbol, 1.0, {"action": "buy", "position_size_pct": 10})
+    traded = bot._build_snapshot(1.0, None, result, None)["versions"]
+    assert bot.history.version == first["orders"] + 1 == traded["orders"]
+    assert traded["cards"] > first["cards"] and traded["positions"] > first["positions"] and traded["decision"] > first["decision"]
+
+    moved = bot._build_snapshot(1.1, None, result, None)["versions"]
+    assert moved["cards"] > traded["cards"] and moved["positions"] > traded["positions"]
+    assert (moved["orders"], moved["decision"]) == (traded["orders"], traded["decision"])
+
+def test_state_journal_recovers_wallet_risk_and_decision(tmp_path: Path, monkeypatch):
+    from dataclasses import replace
+    from tradebot.app.bot_service import BotService
+    from tradebot.history.journal import StateJournal
+
+    bot = _stub_bot(tmp_path, monkeypatch, journal_snapshot_every=3)
+    bot.run_once()
+    bot.apply_config(replace(bot.cfg, max_positions=7))
+    bot.run_once()
+    wallet = (bot.wallet.wallet_balance, bot.wallet.available_balance, bot.wallet.base_qty, bot.wallet.entry_price)
+    assert wallet[2] > 0
+    bot.journal.close()
+    with open(bot.journal.journal_path, "a") as fh:
+        fh.write('{"seq": 99, "ts"')
+
+    recovered = BotService(replace(bot.cfg, max_positions=3))
+    assert (recovered.wallet.wallet_balance, recovered.wallet.available_balance, recovered.wallet.base_qty, recovered.wallet.entry_price) == wallet
+    assert abs(recovered.risk.last_trade_ts["DOGEUSDT"] - bot.risk.last_trade_ts["DOGEUSDT"]) < 1
+    assert recovered.last_decision == bot.last_decision
+    assert recovered.cfg.max_positions == 7
+    assert recovered.recovery["snapshot_seq"] > 0 and recovered.verify_recovery()["ok"]
+    assert StateJournal(bot.cfg.state_file).recover().seq == recovered.recovery["seq"]
+
+
+def test_state_file_change_repoints_journal_recorder_and_metrics(tmp_path: Path, monkeypatch):
+    from dataclasses import replace
+    from tradebot.app import memory, metrics
+    from tradebot.app.bot_service import BotService
+    from tradebot.history.recorder import iter_ticks
+
+    bot = _stub_bot(tmp_path, monkeypatch, record_ticks_dir=str(tmp_path / "ticks"))
+    bot.run_once()
+    bot._journal("config", {"bot_mode": "live", "market_type": "futures", "max_positions": 5})
+    wallet = (bot.wallet.wallet_balance, bot.wallet.base_qty)
+    assert wallet[1] > 0
+
+    report = bot.apply_config(replace(bot.cfg, state_file=str(tmp_path / "other.json")))
+    assert "history" in report["components"]
+    assert bot.journal.journal_path == tmp_path / "other.journal.jsonl" and bot.journal.snapshot_path.exists()
+    assert bot.metrics_name == "bot.other" and "bot.other" in metrics.collect() and "bot.state" not in metrics.collect()
+    assert "bot.other.history_orders" in memory.buffer_sizes() and "bot.state.history_orders" not in memory.buffer_sizes()
+    bot.run_once()
+    bot.recorder.close()
+    headers = [tick["header"]["cfg"]["state_file"] for tick in iter_ticks(tmp_path / "ticks")]
+    assert headers == [str(tmp_path / "state.json"), str(tmp_path / "other.json")]
+
+    recovered = BotService(replace(bot.cfg, record_ticks_dir=""))
+    assert (recovered.wallet.wallet_balance, recovered.wallet.base_qty) == (bot.wallet.wallet_balance, bot.wallet.base_qty)
+    assert recovered.cfg.max_positions == 5
+    assert (recovered.cfg.bot_mode, recovered.cfg.market_type) == ("paper", "spot")
+
+
+def test_tick_recorder_replays_without_divergence(tmp_path: Path, monkeypatch):
+    from tradebot.app.replay import TickReplayer
+    from tradebot.history.recorder import iter_ticks, segment_paths
+
+    bot = _stub_bot(tmp_path, monkeypatch, record_ticks_dir=str(tmp_path / "ticks"), record_segment_ticks=4, record_max_segments=2)
+    for _ in range(10):
+        bot.run_once()
+    bot.recorder.close()
+    assert len(segment_paths(tmp_path / "ticks")) == 2
+    ticks = list(iter_ticks(tmp_path / "ticks"))
+    assert len(ticks) == 6 and len(ticks[1]["klines"]["fast"]) == 60
+    assert ticks[0]["header"]["wallet"]["base_qty"] > 0 and "binance_api_secret" not in ticks[0]["header"]["cfg"]
+
+    report = TickReplayer(tmp_path / "ticks").run(profile="cpu", top=5)
+    assert report["ticks"] == 6 and report["divergences"] == []
+    assert "cumulative" in report["profile"] and report["tick_ms"]["p95"] > 0
+    assert TickReplayer(tmp_path / "ticks", decider="live").run(profile="memory", top=3)["divergences"] == []
+    # Replay canli botun disk log'una yazmaz ve metrics portunu acmaz.
+    header = {**ticks[0]["header"], "cfg": {**ticks[0]["header"]["cfg"], "log_dir": str(tmp_path / "logs"), "metrics_port": 9}}
+    replay_cfg = TickReplayer(tmp_path / "ticks")._build_bot(header).cfg
+    assert (replay_cfg.log_dir, replay_cfg.metrics_port) == ("", 0)
+
+
+def test_demo_recording_replays_orders_without_api_keys(tmp_path: Path, monkeypatch):
+    from tradebot.app.replay import TickReplayer
+    from tradebot.history.recorder import iter_ticks
+
+    bot = _stub_bot(
+        tmp_path, monkeypatch, bot_mode="demo", binance_api_key="k", binance_api_secret="s",
+        user_stream_enabled=False, record_ticks_dir=str(tmp_path / "ticks"),
+    )
+    bot.exchange.get_account_balances = lambda api_key, api_secret: {"wallet_balance": 1000.0, "available_balance": 1000.0}
+    bot.exchange.get_account_assets = lambda api_key, api_secret: ({"DOGE": {"free": 1e9, "locked": 0.0}}, 0)
+    bot.exchange.place_market_order = lambda api_key, api_secret, symbol, side, quantity, client_order_id=None: {
+        "status": "filled", "side": side, "qty": quantity, "avg_price": 1.3,
+    }
+    for _ in range(3):
+        bot.run_once()
+    bot.recorder.close()
+    ticks = list(iter_ticks(tmp_path / "ticks"))
+    assert "filled" in [t["order_result"]["status"] for t in ticks] and "binance_api_key" not in ticks[0]["header"]["cfg"]
+
+    # Kayitta API key yok; replay emirleri "API key missing" ile bloklanmaz, borsa cevabi kayittan gelir.
+    report = TickReplayer(tmp_path / "ticks").run()
+    assert report["ticks"] == 3 and report["divergences"] == []
+
+
+def test_log_store_rotates_indexes_and_pages(tmp_path: Path):
+    import time as _time
+    from tradebot.loggingx.logger import get_logger
+    from tradebot.loggingx.store import LogStore, LogStoreHandler
+
+    store = LogStore(tmp_path / "logs", segment_records=10, max_segments=3)
+    handler = LogStoreHandler(store)
+    logger = get_logger("tradebot.test_store")
+    logger.addHandler(handler)
+    started = _time.time()
+    try:
+        for i in range(45):
+            symbol = "BTCUSDT" if i % 3 == 0 else "DOGEUSDT"
+            if i == 40:
+                logger.warning("tick.stage_timeout", extra={"extra_data": {"stage": "data", "symbol": symbol}})
+            else:
+                logger.info("tick.decision" if i % 2 else "config.reloaded", extra={"extra_data": {"symbol": symbol, "i": i}})
+    finally:
+        logger.removeHandler(handler)
+    assert len(store.segments) == 3 and len(list((tmp_path / "logs").glob("logs-*.jsonl.gz"))) == 4
+
+    page = store.query(event="tick.*", symbol="dogeusdt", limit=5)
+    assert len(page["rows"]) == 5 and page["has_more"]
+    assert all(r["message"].startswith("tick.") and r["symbol"] == "DOGEUSDT" for r in page["rows"])
+    assert page["rows"][0]["t"] >= page["rows"][-1]["t"]
+    nxt = store.query(event="tick.*", symbol="DOGEUSDT", limit=5, offset=5)
+    assert {r["i"] for r in nxt["rows"]}.isdisjoint({r.get("i") for r in page["rows"]})
+
+    warn = store.query(level="WARNING", start=started)
+    assert [r["message"] for r in warn["rows"]] == ["tick.stage_timeout"] and warn["segments_scanned"] == 1
+    assert store.query(text="no such thing")["rows"] == []
+
+    store.close()
+    reopened = LogStore(tmp_path / "logs", segment_records=10, max_segments=3)
+    assert sum(s["count"] for s in reopened.segments) == 35
+    assert reopened.query(level="WARNING")["rows"][0]["stage"] == "data"
+
+
+def test_trade_analytics_running_aggregates_persist_and_serve(tmp_path: Path):
+    import urllib.request
+    from tradebot.app import metrics
+    from tradebot.history.store import InMemoryHistory
+
+    history = InMemoryHistory(state_file=str(tmp_path / "s.json"))
+    history.analytics.decider = "RuleBased:rule-v1"
+    a = history.analytics
+    a.record_fill("DOGEUSDT", "BUY", 100, 0.10, ts=1_700_000_000)
+    a.record_fill("DOGEUSDT", "SELL", 100, 0.12, realized_pnl=2.0, fee=0.01, ts=1_700_000_600)
+    a.record_fill("BTCUSDT", "BUY", 0.01, 30000, decider="OpenAI:gpt", ts=1_700_003_600)
+    a.record_fill("BTCUSDT", "SELL", 0.01, 29000, realized_pnl=-10.0, decider="OpenAI:gpt", ts=1_700_007_200)
+    history.add_order("DOGEUSDT", "BUY", 50, 0.1, "paper", "FILLED")
+    history.add_order("DOGEUSDT", "SELL", 50, 0.1, "paper", "REJECTED")
+
+    summary = a.summary()
+    total = summary["total"]
+    assert total["fills"] == 5 and total["trades"] == 2 and total["win_rate"] == 0.5
+    assert total["avg_hold_seconds"] == 2100 and abs(total["net_pnl"] - (-8.01)) < 1e-9
+    assert {r["decider"]: r["trades"] for r in summary["by_decider"]} == {"RuleBased:rule-v1": 1, "OpenAI:gpt": 1}
+    assert {r["symbol"]: r["realized_pnl"] for r in summary["by_symbol"]} == {"DOGEUSDT": 2.0, "BTCUSDT": -10.0}
+    assert len(summary["hourly"]) == 4 and abs(a.realized_max_drawdown - 10.0) < 1e-9
+    for equity in (1000, 1010, 990, 1005):
+        a.update_equity(equity)
+    assert a.max_drawdown == 20 and a.current_drawdown == 5
+
+    reloaded = InMemoryHistory(state_file=str(tmp_path / "s.json")).analytics
+    assert reloaded.total == a.total and reloaded.open_qty == {"DOGEUSDT": 50}
+
+    metrics.register_source("test.analytics", a.metrics)
+    server = metrics.serve(0)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5).read().decode()
+        assert 'tradebot_total_trades{source="test.analytics"} 2.0' in body
+    finally:
+        metrics.unregister_source("test.analytics")
+        metrics.shutdown()
+    # Port baska process'te tutuluyorsa (shard worker, replay) bot acilisi patlamaz.
+    import socket
+
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        assert metrics.serve(busy.getsockname()[1]) is None
+
+
+def test_chart_buffer_payload_stays_constant_size():
+    import math
+    from tradebot.data.series import ChartBuffer, MinMaxSeries
+
+    short, long = MinMaxSeries(capacity=256), MinMaxSeries(capacity=256)
+    t0 = 1_700_000_000.0
+    for i in range(200_000):
+        value = 100 + 10 * math.sin(i / 500) + (50 if i == 123_456 else 0)
+        long.append(t0 + i * 10, value)
+        if i < 1_000:
+            short.append(t0 + i * 10, value)
+    assert sum(len(level) for level in long.levels) <= 8 * 256
+    full = long.query(max_points=600)
+    assert 0 < len(full) <= 600 and len(short.query(max_points=600)) <= 600
+    assert max(v for _, v in full) > 150 and min(v for _, v in full) < 91
+    assert [t for t, _ in full] == sorted(t for t, _ in full)
+    recent = long.query(start=t0 + 199_000 * 10, max_points=600)
+    assert 0 < len(recent) <= 600 and recent[0][0] >= t0 + 198_000 * 10
+
+    charts = ChartBuffer(max_markers=50)
+    for i in range(5_000):
+        charts.append(t0 + i * 10, 1000 + i * 0.01, 0.1)
+        if i % 10 == 0:
+            charts.mark(t0 + i * 10, "buy", 0.1, "filled")
+    payload = charts.payload(window_seconds=3600, max_points=100, max_markers=20)
+    assert len(payload["equity"]) <= 100 and len(payload["markers"]) <= 20
+    assert payload["markers"][-1]["t"] == t0 + 4_990 * 10
+
+
+def test_weight_limiter_priorities_headers_and_bans(monkeypatch):
+    import threading
+    import time as _time
+    import pytest
+    import requests
+    from tradebot.exchange import rate_limit as rl
+
+    assert rl.endpoint_weight("spot", "depth", {"limit": 1000}) == 50 and rl.endpoint_weight("futures", "klines", {"limit": 200}) == 2
+    monkeypatch.setattr(rl, "UI_RESERVE", 0.01)
+    limiter = rl.WeightLimiter(limit_per_minute=600, headroom=1.0)  # 10 weight/s
+    limiter.acquire(600, rl.PRIORITY_MARKET)
+    order: list[str] = []
+
+    def take(name, priority):
+        limiter.acquire(5, priority)
+        order.append(name)
+
+    ui = threading.Thread(target=take, args=("ui", rl.PRIORITY_UI))
+    ui.start()
+    _time.sleep(0.05)
+    with rl.request_priority(rl.PRIORITY_ORDER):
+        take("order", None)
+    ui.join(timeout=30)
+    assert order == ["order", "ui"] and limiter.granted["order"] == 5
+    with pytest.raises(rl.RateLimitTimeout):
+        limiter.acquire(500, rl.PRIORITY_MARKET, timeout=0.05)
+
+    limiter.observe({"X-MBX-USED-WEIGHT-1M": "590"}, 200)
+    assert limiter.tokens <= 10 and limiter.metrics()["used_weight_1m"] == 590
+
+    class Resp:
+        status_code = 429
+        headers = {"Retry-After": "0.2", "X-MBX-USED-WEIGHT-1M": "6001"}
+
+    monkeypatch.setattr(requests, "get", lambda *a, **k: Resp())
+    with pytest.raises(rl.RateLimitedError):
+        rl.public_get("https://rl-test.example", "spot", "/api/v3/ticker/price", "ticker/price", {"symbol": "DOGEUSDT"})
+    shared = rl.get_limiter("https://rl-test.example/other", "spot")
+    assert shared.throttled == 1 and shared.metrics()["blocked_for_s"] > 0
+    started = _time.monotonic()
+    shared.observe({"X-MBX-USED-WEIGHT-1M": "0"})
+    shared.tokens = shared.capacity
+    shared.acquire(1, rl.PRIORITY_ORDER)
+    assert _time.monotonic() - started >= 0.1
+
+
+def test_transport_retries_breaker_and_hedging(monkeypatch):
+    import time as _time
+    import pytest
+    from tradebot.exchange import transport as tr
+
+    calls: list[str] = []
+    state = {"fail": True}
+
+    def fake_get(base_url, market_type, path, endpoint, params, timeout=15.0, host=None):
+        calls.append(host)
+        if state["fail"]:
+            raise ConnectionError("down")
+        if host == "https://api.binance.com":
+            _time.sleep(0.3)
+        return {"host": host}
+
+    monkeypatch.setattr(tr, "public_get", fake_get)
+    t = tr.Transport(retries=3, backoff_base=0.001, backoff_cap=0.002, failure_threshold=4, reset_seconds=0.1)
+    assert all(0 <= t.backoff(i) <= 0.002 for i in range(10))
+    with pytest.raises(ConnectionError):
+        t.get_json("https://testnet.binance.vision", "spot", "/api/v3/klines", "klines", {})
+    assert len(calls) == 3 and t.retried == 2
+    with pytest.raises(tr.CircuitOpenError):
+        for _ in range(3):
+            t.get_json("https://testnet.binance.vision", "spot", "/api/v3/klines", "klines", {})
+    n = len(calls)
+    with pytest.raises(tr.CircuitOpenError):
+        t.get_json("https://testnet.binance.vision", "spot", "/api/v3/klines", "klines", {})
+    assert len(calls) == n
+    _time.sleep(0.12)
+    state["fail"] = False
+    assert t.get_json("https://testnet.binance.vision", "spot", "/api/v3/klines", "klines", {})["host"] == "https://testnet.binance.vision"
+    assert t.breakers["https://testnet.binance.vision/api/v3/klines"].state == "closed"
+
+    hedged = tr.Transport(hedge_enabled=True, hedge_after_ms=50)
+    started = _time.perf_counter()
+    assert hedged.get_json("https://api.binance.com", "spot", "/api/v3/ticker/price", "ticker/price", {})["host"] == "https://api1.binance.com"
+    assert _time.perf_counter() - started < 0.25 and hedged.hedged == 1
+    _time.sleep(0.35)
+    ranked = hedged.ranked_hosts("https://api.binance.com")
+    assert ranked.index("https://api1.binance.com") < ranked.index("https://api.binance.com")
+
+
+def test_user_data_stream_feeds_account_state_and_sell(tmp_path: Path):
+    import asyncio
+    import json as _json
+    import time as _time
+    from tradebot.config.settings import BotConfig
+    from tradebot.exchange.binance_client import BinanceClient
+    from tradebot.exchange.user_stream import UserDataStream
+    from tradebot.execution.service import ExecutionService
+    from tradebot.history.store import InMemoryHistory
+
+    sessions = [
+        [
+            {"e": "executionReport", "s": "DOGEUSDT", "c": "b1", "S": "BUY", "x": "TRADE", "X": "FILLED", "i": 1, "l": "100", "L": "0.1", "z": "100", "Z": "10"},
+            {"e": "outboundAccountPosition", "u": 20, "B": [{"a": "DOGE", "f": "100", "l": "0"}, {"a": "USDT", "f": "90", "l": "0"}]},
+            {"e": "listenKeyExpired"},
+        ],
+        [{"e": "outboundAccountPosition", "u": 5, "B": [{"a": "USDT", "f": "1", "l": "0"}]}],
+    ]
+
+    class FakeSocket:
+        def __init__(self, messages):
+            self.messages = messages
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, *exc):
+            return False
+        def __aiter__(self):
+            return self._gen()
+        async def _gen(self):
+            for message in self.messages:
+                yield _json.dumps(message)
+            await asyncio.sleep(3600)
+
+    class StreamExchange(BinanceClient):
+        def __init__(self):
+            super().__init__("spot", True)
+            self.keys: list[str] = []
+            self.closed: list[str] = []
+            self.orders: list[tuple] = []
+        def create_listen_key(self, api_key):
+            self.keys.append(f"key{len(self.keys)}")
+            return self.keys[-1]
+        def close_listen_key(self, api_key, listen_key):
+            self.closed.append(listen_key)
+        def keepalive_listen_key(self, api_key, listen_key):
+            pass
+        def get_account_assets(self, api_key, api_secret):
+            return {"USDT": {"free": 100.0, "locked": 0.0}}, 10
+        def get_symbol_rules(self, symbol):
+            return {"step_size": 1.0, "min_qty": 1.0, "min_notional": 1.0, "tick_size": 0.0001, "base_asset": "DOGE", "quote_asset": "USDT"}
+        def get_account_balances(self, api_key, api_secret):
+            raise AssertionError("REST balance call while stream is live")
+        def place_market_order(self, api_key, api_secret, symbol, side, quantity, client_order_id=None):
+            self.orders.append((side, quantity))
+            return {"status": "filled", "side": side, "qty": quantity, "avg_price": 0.12}
+
+    exchange = StreamExchange()
+    urls: list[str] = []
+    stream = UserDataStream(exchange, "k", "s", connect=lambda url: urls.append(url) or FakeSocket(sessions[len(urls) - 1]))
+    stream.start()
+    deadline = _time.time() + 5
+    while not (stream.connects == 2 and stream.healthy()) and _time.time() < deadline:
+        _time.sleep(0.02)
+    assert stream.healthy() and urls == ["wss://stream.testnet.binance.vision/ws/key0", "wss://stream.testnet.binance.vision/ws/key1"]
+    assert exchange.closed == ["key0"]
+    # Reconcile (updateTime=10) ve eski stamp'li olay (u=5) stream'in yeni bakiyesini ezmez.
+    assert stream.state.balance("USDT") == (90.0, 0.0) and stream.state.balance("DOGE") == (100.0, 0.0)
+    assert stream.state.orders["b1"]["avg_price"] == 0.1 and stream.state.orders["b1"]["status"] == "FILLED"
+
+    cfg = BotConfig(bot_mode="demo", market_type="spot", binance_api_key="x", binance_api_secret="y")
+    svc = ExecutionService(cfg, InMemoryHistory(state_file=str(tmp_path / "s.json")), PaperWallet(1000, 1000), exchange)
+    svc.account_state = stream.state
+    assert svc.execute("DOGEUSDT", 0.12, {"action": "buy", "position_size_pct": 10.0})["status"] == "filled"
+    # Hesapta 100 DOGE daha var ama bot sadece kendi aldigi 75'i satar; giris fiyati botun kendi dolumudur.
+    out = svc.close_all("DOGEUSDT", 0.13)
+    assert exchange.orders == [("BUY", 75.0), ("SELL", 75.0)]
+    assert abs(out["realized_pnl"] - 0.0) < 1e-9 and svc.position("DOGEUSDT") == (0.0, 0.0)
+    assert svc.close_all("DOGEUSDT", 0.12) == {"status": "noop", "details": "No bot position"}
+    assert svc.execute("DOGEUSDT", 0.12, {"action": "sell", "position_size_pct": 50.0})["status"] == "noop"
+    from tradebot.history.journal import StateJournal
+
+    journal = StateJournal(str(tmp_path / "s.json"))
+    journal.append("fill", {"wallet": {}, "positions": {"DOGEUSDT": [75.0, 0.12]}})
+    journal.close()
+    assert StateJournal(str(tmp_path / "s.json")).recover().positions == {"DOGEUSDT": [75.0, 0.12]}
+    stream.stop()
+    assert not stream.healthy() and exchange.closed == ["key0", "key1"]
+
+
+def test_prompt_encoder_stable_prefix_and_budget(monkeypatch):
+    import json as _json
+    import requests
+    from tradebot.deciders.llm_utils import PROMPT_PREFIX, PromptEncoder, encode_candles
+    from tradebot.deciders.ollama_decider import OllamaDecider
+
+    candles = [{"open_time": i, "open": 0.1 + i * 0.001, "high": 0.102 + i * 0.001, "low": 0.099 + i * 0.001, "close": 0.101 + i * 0.001, "volume": 100.0 + i} for i in range(40)]
+
+    def ctx(price: float) -> BotContext:
+        return BotContext(
+            symbol="DOGEUSDT",
+            market_type="spot",
+            latest_price=price,
+            indicators={"rsi_14": 51.234567891, "ema_9": 0.1412345678},
+            balances={"wallet": 1000.123456789, "available": 900.0},
+            positions=[],
+            recent_orders=[{"side": "BUY", "qty": 10.0, "price": 0.1, "status": "FILLED"}],
+            candles_1m=candles,
+            candles_5m=candles,
+        )
+
+    first, second = PromptEncoder(token_budget=2000).encode(ctx(0.14)), PromptEncoder(token_budget=2000).encode(ctx(0.141))
+    assert first.prefix == second.prefix == PROMPT_PREFIX and first.body != second.body
+    body = _json.loads(first.body)
+    assert body["ind"] == {"ema_9": 0.14123, "rsi_14": 51.235} and body["bal"] == [1000.1235, 900]
+    assert len(body["c1"]["r"]) == 20 and body["c1"]["b"] == 0.12 and body["c1"]["r"][:2] == [[0, 167, -83, 83], [0, 165, -83, 83]] and body["c1"]["v"][0] < 100
+    assert encode_candles([]) == {}
+
+    tight = PromptEncoder(token_budget=first.prefix_tokens + 120).encode(ctx(0.14))
+    assert tight.tokens <= tight.budget and tight.trimmed[0] == "orders" and tight.candles < 20
+    assert "ord" not in _json.loads(tight.body)
+
+    sent = {}
+
+    class Resp:
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"response": '{"action":"buy","confidence":0.7,"position_size_pct":5}', "prompt_eval_count": 321}
+
+    monkeypatch.setattr(requests, "post", lambda url, json, timeout: sent.update(json) or Resp())
+    decider = OllamaDecider(encoder=PromptEncoder(token_budget=2000))
+    assert decider.decide(ctx(0.14))["action"] == "buy"
+    assert sent["system"] == PROMPT_PREFIX and sent["prompt"] == first.body
+    assert decider.last_prompt["tokens"] == first.tokens and decider.last_prompt["provider_tokens"] == 321
+
+
+def test_decide_many_batches_symbols_with_per_symbol_fallback(tmp_path: Path, monkeypatch):
+    import json as _json
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    import threading
+    from tradebot.app.supervisor import _tick_all, _tick_runner
+    from tradebot.deciders.base import BaseDecider
+    from tradebot.deciders.batching import BatchingDecider
+    from tradebot.deciders.llm_utils import BATCH_PROMPT_PREFIX
+    from tradebot.deciders.ollama_decider import OllamaDecider
+
+    def ctx(symbol: str) -> BotContext:
+        return BotContext(symbol, "spot", 1.0, {"rsi_14": 50.0}, {"wallet": 100, "available": 100}, [], [])
+
+    sent = {}
+
+    class Resp:
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"response": '[{"symbol":"AUSDT","action":"buy","confidence":0.8,"position_size_pct":5},{"symbol":"BUSDT","action":"sell","confidence":"high"},{"symbol":"CUSDT","act'}
+
+    monkeypatch.setattr(requests, "post", lambda url, json, timeout: sent.update(json) or Resp())
+    out = OllamaDecider().decide_many([ctx("AUSDT"), ctx("BUSDT"), ctx("CUSDT")])
+    assert sent["system"] == BATCH_PROMPT_PREFIX and [c["s"] for c in _json.loads(sent["prompt"])] == ["AUSDT", "BUSDT", "CUSDT"]
+    assert out["AUSDT"]["action"] == "buy" and out["AUSDT"]["position_size_pct"] == 5.0
+    assert out["BUSDT"]["action"] == "hold" and "malformed" in out["BUSDT"]["fallback_reason"]
+    assert out["CUSDT"]["action"] == "hold" and out["CUSDT"]["fallback_reason"]
+
+    class CountingDecider(BaseDecider):
+        def __init__(self):
+            self.calls: list[list[str]] = []
+        def decide(self, context):
+            raise AssertionError("single decide while batching")
+        def decide_many(self, contexts):
+            self.calls.append(sorted(c.symbol for c in contexts))
+            return {c.symbol: {"action": "hold", "confidence": 0.5, "reason": "batched"} for c in contexts if c.symbol != "BUSDT"}
+
+    inner = CountingDecider()
+    batcher = BatchingDecider(inner, max_batch=3, max_wait_ms=2000)
+    bots = [_stub_bot(tmp_path / s, monkeypatch, default_symbol=s) for s in ("AUSDT", "BUSDT", "CUSDT")]
+    for bot in bots:
+        bot.decider = batcher
+    # Worker tick'leri tek loop ve tek havuzda calisir; tick sayisiyla thread birikmez, kapaninca havuz da kapanir.
+    shard_threads = lambda: sum(1 for t in threading.enumerate() if t.name.startswith("shard-tick"))
+    runner = _tick_runner(bots)
+    runner.run(_tick_all(bots))
+    assert inner.calls == [["AUSDT", "BUSDT", "CUSDT"]] and batcher.batches == 1
+    pool = runner.get_loop()._default_executor
+    for _ in range(3):
+        runner.run(_tick_all(bots))
+    assert runner.get_loop()._default_executor is pool and shard_threads() <= 6 * len(bots) + 4
+    runner.close()
+    assert shard_threads() == 0
+    assert bots[0].last_decision["reason"] == "batched"
+    assert bots[1].last_decision["fallback_reason"] == "batch decider returned no decision"
+
+    class EchoDecider(BaseDecider):
+        def __init__(self):
+            self.calls: list[list[str]] = []
+        def decide(self, context):
+            return {"action": "hold", "reason": f"{context.symbol}:{context.balances['wallet']}"}
+        def decide_many(self, contexts):
+            self.calls.append([c.symbol for c in contexts])
+            return {c.symbol: self.decide(c) for c in contexts}
+
+    echo = EchoDecider()
+    batcher = BatchingDecider(echo, max_batch=4, max_wait_ms=2000)
+    contexts = [ctx("AUSDT"), ctx("AUSDT"), ctx("BUSDT"), ctx("AUSDT")]
+    for i, context in enumerate(contexts):
+        context.balances = {"wallet": i, "available": i}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        decisions = list(pool.map(batcher.decide, contexts))
+    assert [d["reason"] for d in decisions] == ["AUSDT:0", "AUSDT:1", "BUSDT:2", "AUSDT:3"]
+    assert [sorted(call) for call in echo.calls] == [["AUSDT", "BUSDT"]] and batcher.batches == 3 and batcher.batched == 4
+
+
+def test_loadtest_step_reports_latency_and_compares_to_baseline():
+    import json as _json
+
+    from tradebot.app.loadtest import LoadStep, LoadTest, compare, render_html
+
+    report = LoadTest([LoadStep(2, 0.5, 1)], duration=1.5, exchange_latency_ms=5, llm_latency_ms=20, ui_refresh_seconds=0.5, label="now").run()
+    step = report["steps"][0]
+    assert step["key"] == "2x0.5s/1ui" and step["ticks"] >= 2 and step["errors"] == 0
+    assert step["tick_ms"]["p50"] > 0 and step["tick_ms"]["p95"] >= step["tick_ms"]["p50"]
+    assert step["refreshes"] >= 1 and "decide" in step["stage_p95_ms"] and step["rss_mb_peak"] > 0
+
+    baseline = _json.loads(_json.dumps(report))
+    baseline["label"] = "before"
+    baseline["steps"][0]["tick_ms"]["p95"] = step["tick_ms"]["p95"] / 2
+    compared = compare(report, baseline)
+    assert compared["steps"][0]["vs_baseline"]["tick_p95_pct"] == 100.0
+    page = render_html(compared)
+    assert "<svg" in page and "before" in page and "2x0.5s/1ui" in page
+
+
+def test_exposure_book_tracks_portfolio_incrementally_and_resets_daily_loss():
+    import random
+
+    from tradebot.config.settings import BotConfig
+    from tradebot.history.journal import RecoveredState, apply_event
+    from tradebot.risk.manager import RiskManager
+    from tradebot.risk.portfolio import ExposureBook, parse_groups
+
+    now = [86_400 * 20_000 + 3600.0]
+    book = ExposureBook(clock=lambda: now[0])
+    book.configure_groups(parse_groups(["majors:BTCUSDT|ETHUSDT"]))
+    rng = random.Random(7)
+    marks = {"BTCUSDT": 100.0, "ETHUSDT": 50.0, "DOGEUSDT": 0.1}
+    for _ in range(300):
+        symbol = rng.choice(list(marks))
+        marks[symbol] *= 1 + rng.uniform(-0.02, 0.02)
+        if rng.random() < 0.5:
+            book.mark(symbol, marks[symbol])
+        else:
+            book.fill(rng.choice(["a", "b"]), symbol, rng.choice(["BUY", "SELL"]), rng.uniform(0.1, 2.0), marks[symbol])
+    # Artimli toplamlar pozisyonlardan bastan hesaplananla ayni olmali.
+    notional = {s: sum(book.position(a, s)[0] for a in "ab") * marks[s] for s in marks}
+    unrealized = sum(book.position(a, s)[0] * (marks[s] - book.position(a, s)[1]) for a in "ab" for s in marks)
+    assert abs(book.gross - sum(abs(v) for v in notional.values())) < 1e-6
+    assert abs(book.group_net["majors"] - notional["BTCUSDT"] - notional["ETHUSDT"]) < 1e-6
+    assert abs(book.unrealized - unrealized) < 1e-6
+
+    book = ExposureBook(clock=lambda: now[0])
+    book.configure_groups(parse_groups(["majors:BTCUSDT|ETHUSDT"]))
+    cfg = BotConfig(max_group_notional_usdt=150, max_gross_exposure_usdt=1000, max_daily_loss_usdt=5, cooldown_seconds=0, max_positions=5)
+    risk = RiskManager(cfg, clock=lambda: now[0], book=book)
+    buy = {"action": "buy", "position_size_pct": 10.0}
+    book.fill("a", "BTCUSDT", "BUY", 1.0, 100.0)
+    assert risk.validate("ETHUSDT", buy, 500.0, 0, 0.0, notional=60.0) == (False, "max_group_notional_usdt limit")
+    assert risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0, notional=60.0) == (True, "ok")
+    # Anlik fiyat dususu (gerceklesmemis) yeni girisi durdurmaz; gun icinde gerceklesen zarar durdurur.
+    book.mark("BTCUSDT", 94.0)
+    assert book.day_pnl() == -6.0 and risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0, notional=10.0) == (True, "ok")
+    book.fill("a", "BTCUSDT", "SELL", 0.5, 94.0)
+    assert book.realized_day() == -3.0 and risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0, notional=10.0) == (True, "ok")
+    book.fill("a", "BTCUSDT", "SELL", 0.5, 94.0)
+    assert risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0, notional=10.0) == (False, "max_daily_loss_usdt reached")
+    # Limit asilsa da zarardaki pozisyondan cikis engellenmez.
+    assert risk.validate("BTCUSDT", {"action": "sell", "position_size_pct": 10.0}, 500.0, 1, 0.0) == (True, "ok")
+    assert risk.validate("BTCUSDT", {"action": "close", "position_size_pct": 100.0}, 500.0, 1, 0.0) == (True, "ok")
+    now[0] += 86_400
+    assert book.day_pnl() == 0.0 and risk.validate("DOGEUSDT", buy, 500.0, 0, -50.0, notional=10.0) == (True, "ok")
+
+    state = RecoveredState()
+    apply_event(state, {"seq": 1, "ts": now[0] - 86_400, "type": "fill", "data": {"wallet": {}, "realized_pnl": -4.0}})
+    apply_event(state, {"seq": 2, "ts": now[0], "type": "fill", "data": {"wallet": {}, "realized_pnl": -2.0}})
+    assert state.session_realized_pnl == -6.0 and state.day_realized_pnl == -2.0
+
+
+def test_bots_in_one_process_keep_separate_risk_books(tmp_path: Path, monkeypatch):
+    from dataclasses import replace
+    from tradebot.app import metrics
+
+    a = _stub_bot(tmp_path / "a", monkeypatch, risk_book="acct-a")
+    b = _stub_bot(tmp_path / "b", monkeypatch, risk_book="acct-b")
+    shared = _stub_bot(tmp_path / "c", monkeypatch, risk_book="acct-a")
+    assert a.risk.book is shared.risk.book and a.risk.book is not b.risk.book
+    assert {"risk.paper.spot.acct-a", "risk.paper.spot.acct-b"} <= set(metrics.collect())
+
+    # A'nin gunluk zarari ve notional'i B'yi etkilemez; ayni defteri paylasan bot ayni limite takilir.
+    buy = {"action": "buy", "position_size_pct": 10.0}
+    a.risk.book.fill(a.account, "DOGEUSDT", "BUY", 100.0, 1.0)
+    a.risk.book.fill(a.account, "DOGEUSDT", "SELL", 100.0, 0.9)
+    a.risk.book.fill(a.account, "DOGEUSDT", "BUY", 100.0, 1.0)
+    assert a.risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0) == (False, "max_daily_loss_usdt reached")
+    assert shared.risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0) == (False, "max_daily_loss_usdt reached")
+    assert b.risk.validate("DOGEUSDT", buy, 500.0, 0, 0.0) == (True, "ok")
+    assert a.risk.book.gross == 100.0 and b.risk.book.gross == 0.0 and b.risk.book.realized_day() == 0.0
+
+    # Defter adi degisince bot yeni deftere gecer, pozisyonu eski defterden silinir.
+    b.wallet.buy(1.0, 50.0)
+    b._sync_exposure()
+    assert b.risk.book.gross > 0
+    old = b.risk.book
+    b.apply_config(replace(b.cfg, risk_book="acct-d"))
+    assert b.book_name == "paper.spot.acct-d" and old.gross == 0.0 and b.risk.book.gross > 0
+    assert "risk.paper.spot.acct-b" not in metrics.collect()
+
+def test_order_manager_retries_without_duplicates_and_tracks_lifecycle(tmp_path: Path):
+    from dataclasses import replace
+    import threading
+    from tradebot.config.settings import BotConfig
+    from tradebot.execution.orders import OrderManager, OrderTable, client_order_id
+    from tradebot.execution.service import ExecutionService
+    from tradebot.history.store import InMemoryHistory
+
+    class ApiError(Exception):
+        def __init__(self, code, message):
+            super().__init__(message)
+            self.code = code
+
+    class FlakyExchange:
+        def __init__(self, script):
+            self.script = script
+            self.placed: list[str] = []
+            self.queries = 0
+            self.query_down = False
+            self.gate = threading.Event()
+            self.gate.set()
+        def place_market_order(self, api_key, api_secret, symbol, side, quantity, client_order_id=None):
+            self.gate.wait()
+            step = self.script.pop(0)
+            if step in ("lost_after_send", "ok", "new"):
+                self.placed.append(client_order_id)
+            if step == "lost_after_send" or step == "lost_before_send":
+                raise ConnectionError("read timed out")
+            if step == "insufficient":
+                raise ApiError(-2010, "Account has insufficient balance for requested action.")
+            status = "new" if step == "new" else "filled"
+            return {"status": status, "side": side, "qty": quantity if status == "filled" else 0.0, "avg_price": 0.1, "exchange_order_id": len(self.placed)}
+        def get_order(self, api_key, api_secret, symbol, cid):
+            self.queries += 1
+            if self.query_down:
+                raise ConnectionError("read timed out")
+            if cid not in self.placed:
+                raise ApiError(-2013, "Order does not exist.")
+            return {"status": "filled", "side": "BUY", "qty": 10.0, "avg_price": 0.1, "exchange_order_id": 1}
+
+    cid = client_order_id("bot", "DOGEUSDT", "buy", "1700000000")
+    assert cid == client_order_id("bot", "DOGEUSDT", "BUY", "1700000000") and len(cid) <= 36
+    assert cid != client_order_id("bot", "DOGEUSDT", "SELL", "1700000000")
+
+    # Istek borsaya ulasti ama cevap kayboldu: tekrar gondermek yerine ayni id ile sorgulanir.
+    exchange = FlakyExchange(["lost_after_send"])
+    manager = OrderManager(exchange, OrderTable(), retry_backoff=0.0)
+    record = manager.submit("k", "s", "DOGEUSDT", "BUY", 10.0, cid).result(timeout=5)
+    assert record.status == "filled" and exchange.placed == [cid] and manager.recovered == 1
+    assert manager.submit("k", "s", "DOGEUSDT", "BUY", 10.0, cid).result(timeout=5) is record and manager.deduplicated == 1
+    # Istek hic ulasmadi: sorgu -2013 doner, ayni id ile bir kez daha gonderilir.
+    exchange = FlakyExchange(["lost_before_send", "ok"])
+    manager = OrderManager(exchange, OrderTable(), retry_backoff=0.0)
+    record = manager.submit("k", "s", "DOGEUSDT", "BUY", 10.0, "c2").result(timeout=5)
+    assert record.status == "filled" and exchange.placed == ["c2"] and record.attempts == 2
+    exchange.script.append("insufficient")
+    record = manager.submit("k", "s", "DOGEUSDT", "BUY", 10.0, "c3").result(timeout=5)
+    assert record.status == "rejected" and "insufficient" in record.result()["details"] and exchange.queries == 1
+
+    # NEW ack'i sonrasi dolum user data stream'den gelir; eski rapor durumu geri almaz.
+    exchange = FlakyExchange(["new"])
+    table = OrderTable()
+    manager = OrderManager(exchange, table, retry_backoff=0.0)
+    record = manager.submit("k", "s", "DOGEUSDT", "SELL", 5.0, "c4").result(timeout=5)
+    assert record.status == "new" and record.submit_to_ack_ms is not None and [r.client_order_id for r in table.open_orders("DOGEUSDT")] == ["c4"]
+    manager.on_execution_report({"e": "executionReport", "c": "c4", "X": "PARTIALLY_FILLED", "z": "2", "Z": "0.2", "i": 9})
+    manager.on_execution_report({"e": "executionReport", "c": "c4", "X": "FILLED", "z": "5", "Z": "0.5", "i": 9})
+    manager.on_execution_report({"e": "executionReport", "c": "c4", "X": "NEW", "z": "0", "Z": "0", "i": 9})
+    assert record.status == "filled" and record.executed_qty == 5.0 and abs(record.avg_price - 0.1) < 1e-12
+    assert table.by_exchange_id(9) is record and table.open_orders() == [] and record.ack_to_fill_ms is not None
+    assert manager.metrics()["orders"] == {"filled": 1} and manager.metrics()["ack_to_fill_ms"]["p50"] is not None
+
+    # Ack gelmeden tick beklemeyi birakir; emir arka planda tamamlanir.
+    cfg = BotConfig(bot_mode="demo", market_type="spot", binance_api_key="x", binance_api_secret="y", order_wait_seconds=0.05, state_file=str(tmp_path / "s.json"))
+    exchange = FlakyExchange(["ok"])
+    exchange.gate.clear()
+    svc = ExecutionService(cfg, InMemoryHistory(state_file=cfg.state_file), PaperWallet(1000, 1000), exchange)
+    svc.account_state = type("Live", (), {"live": True, "quote_balances": lambda self, quote: {"available_balance": 100.0}})()
+    svc.store_symbol_rules("DOGEUSDT", {"step_size": 1.0, "min_qty": 1.0, "min_notional": 1.0, "tick_size": 0.0001})
+    out = svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0})
+    assert out["status"] == "pending" and svc.orders.table.get(out["client_order_id"]).status == "pending_new"
+    # Onceki emir acikken ayni yonde yeni emir acilmaz.
+    assert svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0}, intent="t2")["status"] == "blocked"
+    exchange.gate.set()
+    assert svc.orders.wait(svc.orders._futures[out["client_order_id"]], 5).status == "filled"
+    # Gec gelen dolum history'ye ve botun pozisyonuna bir kez islenir.
+    late = svc.settle_orders()
+    assert [(symbol, result["status"], result["qty"]) for symbol, result in late] == [("DOGEUSDT", "filled", 100.0)]
+    assert svc.settle_orders() == [] and svc.position("DOGEUSDT") == (100.0, 0.1) and len(svc.history) == 1
+    # Ayni karar (ayni mum) tekrar islenirse ayni clientOrderId uretilir ve ikinci emir gonderilmez.
+    exchange.script += ["ok"]
+    sell = {"action": "sell", "position_size_pct": 50.0}
+    svc.account_state = type("Live", (), {"live": True, "balance": lambda self, asset: (100.0, 0.0)})()
+    first = svc.execute("DOGEUSDT", 0.1, sell, intent="sell:1700000000")
+    again = svc.execute("DOGEUSDT", 0.1, sell, intent="sell:1700000000")
+    assert first["status"] == "filled" and first["qty"] == 50.0 and again["status"] == "noop"
+    assert again["client_order_id"] == first["client_order_id"] and exchange.placed.count(first["client_order_id"]) == 1
+
+    # Gonderim ve tum sorgular zaman asimina ugrar: emir unknown olarak acik kalir, ayni yonde yeni emir acilmaz;
+    # sonraki tick'te sorgu FILLED donunce dolum bir kez islenir.
+    exchange = FlakyExchange(["lost_after_send"])
+    exchange.query_down = True
+    cfg = replace(cfg, order_wait_seconds=5, state_file=str(tmp_path / "u.json"))
+    svc = ExecutionService(cfg, InMemoryHistory(state_file=cfg.state_file), PaperWallet(1000, 1000), exchange)
+    svc.orders.retry_backoff = 0.0
+    svc.account_state = type("Live", (), {"live": True, "quote_balances": lambda self, quote: {"available_balance": 100.0}})()
+    svc.store_symbol_rules("DOGEUSDT", {"step_size": 1.0, "min_qty": 1.0, "min_notional": 1.0, "tick_size": 0.0001})
+    out = svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0}, intent="buy:1")
+    assert out["status"] == "unknown" and exchange.queries == svc.orders.max_retries
+    assert [r.client_order_id for r in svc.orders.table.open_orders("DOGEUSDT")] == [out["client_order_id"]]
+    assert svc.settle_orders() == [] and svc.orders.table.get(out["client_order_id"]).status == "unknown"
+    assert svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0}, intent="buy:2")["status"] == "blocked"
+    exchange.query_down = False
+    late = svc.settle_orders()
+    assert [(symbol, result["status"], result["qty"]) for symbol, result in late] == [("DOGEUSDT", "filled", 10.0)]
+    assert svc.orders.table.open_orders() == [] and svc.position("DOGEUSDT")[0] == 10.0 and exchange.placed == [out["client_order_id"]]
+    assert svc.settle_orders() == [] and len(svc.history) == 1
+    # Borsa emri hic gormediyse (-2013) unknown emir rejected olur.
+    exchange.script.append("lost_before_send")
+    exchange.query_down = True
+    lost = svc.execute("DOGEUSDT", 0.1, {"action": "buy", "position_size_pct": 10.0}, intent="buy:3")
+    assert lost["status"] == "unknown"
+    exchange.query_down = False
+    assert svc.settle_orders() == [] and svc.orders.table.get(lost["client_order_id"]).status == "rejected"
+    assert svc.orders.table.open_orders() == []
+
+
+def test_memory_stays_flat_over_long_soak(tmp_path: Path, monkeypatch):
+    import gc
+    import logging
+    import os
+    import sys
+    from tradebot.app import memory
+    from tradebot.loggingx.logger import configure_recent_logs
+
+    ticks = int(os.getenv("SOAK_TICKS", "1500"))
+    bot = _stub_bot(
+        tmp_path, monkeypatch, journal_enabled=False, memory_sample_seconds=0,
+        log_recent_max=50, history_max_orders=5, chart_level_capacity=4, chart_max_markers=5,
+    )
+    # pytest'in log yakalama handler'lari kayitlari test boyunca biriktirir; olcumu bozmamasi icin cikarilir.
+    for name in list(logging.root.manager.loggerDict):
+        logger = logging.getLogger(name)
+        if name.startswith("tradebot") and logger.handlers:
+            monkeypatch.setattr(logger, "handlers", [h for h in logger.handlers if type(h).__module__ != "_pytest.logging"])
+    try:
+        warmup = ticks // 5
+        baseline = 0
+        for i in range(ticks):
+            bot.run_once()
+            if i == warmup:
+                gc.collect()
+                baseline = sys.getallocatedblocks()
+        gc.collect()
+        # Isinma sonrasi blok sayisi tick sayisiyla buyumemeli (tick basina sizan tek nesne bile yakalanir).
+        assert sys.getallocatedblocks() - baseline < (ticks - warmup) // 2
+        sizes = memory.buffer_sizes()
+        assert {f"{bot.metrics_name}.history_orders", f"{bot.metrics_name}.chart_buckets", "logs.recent"} <= set(sizes)
+        for name, info in sizes.items():
+            assert info["cap"] is None or info["size"] <= info["cap"], name
+
+        profiler = memory.MemoryProfiler(interval=0, frames=2, top=3)
+        profiler.start()
+        try:
+            bot.run_once()
+            sample = profiler.sample()
+        finally:
+            profiler.stop()
+        assert sample["traced_mb"] > 0 and sample["subsystems_mb"]
+        assert 0 < len(profiler.top_allocators) <= 3
+        assert profiler.metrics()["rss_mb"] > 0
+    finally:
+        configure_recent_logs(300)
@@ -1,96 +1,543 @@
 from __future__ import annotations
 
+import asyncio
+from dataclasses import asdict, fields, replace
+from pathlib import Path
+import time
+from typing import Awaitable, Callable
+
+from tradebot.app import memory, metrics
+
+from tradebot.app.shadow import ShadowRunner
 from tradebot.config.settings import BotConfig
 from tradebot.data.market_data import fetch_ohlcv
+from tradebot.data.order_book import OrderBook
+from tradebot.data.series import ChartBuffer
 from tradebot.deciders.base import DEFAULT_DECISION, normalize_decision
 from tradebot.deciders.factory import create_decider
+from tradebot.exchange import rate_limit, transport
 from tradebot.exchange.binance_client import BinanceClient
-from tradebot.execution.paper import PaperWallet
+from tradebot.exchange.user_stream import UserDataStream
 from tradebot.execution.service import ExecutionService
+from tradebot.history.journal import StateJournal
+from tradebot.history.recorder import TickRecorder
 from tradebot.history.store import InMemoryHistory
 from tradebot.indicators.ta import compute_indicator_snapshot
-from tradebot.loggingx.logger import get_logger, get_recent_logs
+from tradebot.loggingx.logger import configure_recent_logs, get_log_version, get_logger, get_recent_logs
+from tradebot.loggingx.store import configure_log_store
 from tradebot.models.context import BotContext
 from tradebot.portfolio.service import PortfolioService
+from tradebot.risk import portfolio as exposure
 from tradebot.risk.manager import RiskManager
+from tradebot.utils import deadline
+
+
+DECIDER_FIELDS = {"decider_provider", "decider_model", "openai_api_key", "gemini_api_key", "ollama_base_url", "prompt_token_budget", "prompt_candles"}
+EXCHANGE_FIELDS = {"market_type", "binance_testnet"}
+DATA_FIELDS = {"default_symbol", "timeframe_fast", "timeframe_slow", "lookback"}
+SHADOW_FIELDS = {"shadow_deciders", "openai_api_key", "gemini_api_key", "ollama_base_url", "prompt_token_budget", "prompt_candles"}
+TRANSPORT_FIELDS = {
+    "rate_limit_headroom", "http_retries", "http_backoff_base_seconds", "http_backoff_cap_seconds",
+    "circuit_failure_threshold", "circuit_reset_seconds", "hedge_requests", "hedge_after_ms",
+}
+USER_STREAM_FIELDS = EXCHANGE_FIELDS | {
+    "bot_mode", "user_stream_enabled", "user_stream_keepalive_seconds", "user_stream_reconcile_seconds",
+    "binance_api_key", "binance_api_secret", "binance_test_api_key", "binance_test_api_secret",
+}
+RISK_FIELDS = {
+    "max_positions", "max_position_size_pct", "max_daily_loss_usdt", "cooldown_seconds", "allow_pyramiding",
+    "max_gross_exposure_usdt", "max_net_exposure_usdt", "max_symbol_notional_usdt", "max_group_notional_usdt", "risk_groups",
+}
+# Portfoy defteri mod + piyasa tipi + defter adi (bos ise state dosyasi) ile secilir.
+BOOK_FIELDS = {"state_file", "bot_mode", "market_type", "risk_book"}
+MEMORY_FIELDS = {"memory_sample_seconds", "memory_tracemalloc_frames", "memory_top_allocators", "log_recent_max"}
+# API key/secret'lar journal'a yazilmaz.
+# Calisma modu ve piyasa tipi journal'dan geri yuklenmez; her zaman baslangic config'inden gelir.
+UNRECOVERED_FIELDS = {"bot_mode", "market_type"}
+SECRET_FIELDS = {"openai_api_key", "gemini_api_key", "binance_api_key", "binance_api_secret", "binance_test_api_key", "binance_test_api_secret"}
+FILL_STATUSES = {"filled", "partially_filled", "simulated"}
+# Acik pozisyon varken degisirse wallet'taki miktar yanlis sembole/markete atfedilir.
+POSITION_BOUND_FIELDS = {"default_symbol", "market_type"}
 
 
 class BotService:
     def __init__(self, cfg: BotConfig) -> None:
         self.cfg = cfg
+        if cfg.log_dir:
+            configure_log_store(cfg.log_dir, cfg.log_segment_records, cfg.log_max_segments)
+        rate_limit.configure(cfg.rate_limit_headroom)
+        self._configure_transport()
         self.logger = get_logger("tradebot.service")
-        self.history = InMemoryHistory(cfg.state_file)
-        self.wallet = PaperWallet(wallet_balance=cfg.paper_starting_balance, available_balance=cfg.paper_starting_balance)
+        self.history = InMemoryHistory(cfg.state_file, maxlen=cfg.history_max_orders)
+        # Paper cuzdan defterin bir satirina bakar; hesap kartlari ve pozisyon tablosu defterden uretilir.
+        # Defter numpy kullanir; soguk baslangicta import maliyeti kurulusa kayar.
+        from tradebot.portfolio.ledger import LedgerWallet, PaperLedger
+
+        self.ledger = PaperLedger(cfg.paper_starting_balance, fee_rate=cfg.paper_fee_rate)
+        self.wallet = LedgerWallet(self.ledger, cfg.default_symbol)
         self.exchange = BinanceClient(cfg.market_type, cfg.binance_testnet)
+        self.fetch_ohlcv = fetch_ohlcv
         self.execution = ExecutionService(cfg, self.history, self.wallet, self.exchange)
-        self.risk = RiskManager(cfg)
+        self.user_stream: UserDataStream | None = None
+        exposure.configure(cfg.risk_groups)
+        self.account = Path(cfg.state_file).stem
+        self.book_name = self._book_name()
+        self.risk = RiskManager(cfg, book=exposure.get_book(self.book_name))
         self.portfolio = PortfolioService()
         self.decider = create_decider(cfg)
+        self.shadow = ShadowRunner(cfg)
         self.emergency_stop = cfg.emergency_stop
         self.last_decision = DEFAULT_DECISION.copy()
         self.last_price: float = 0.0
+        self.last_candles = None
+        self.stage_timings_ms: dict[str, float] = {}
+        self.last_prompt: dict | None = None
+        self.charts = ChartBuffer(max_markers=cfg.chart_max_markers, capacity=cfg.chart_level_capacity)
+        self._section_state: dict[str, tuple[int, object]] = {}
+        self.journal = StateJournal(cfg.state_file, cfg.journal_snapshot_every) if cfg.journal_enabled else None
+        self.recorder = TickRecorder(cfg.record_ticks_dir, cfg.record_segment_ticks, cfg.record_max_segments) if cfg.record_ticks_dir else None
+        self._snapshot_inputs: tuple[float, tuple[float, float] | None] | None = None
+        self.recovery = self._recover()
+        self._sync_exposure()
+        self.history.analytics.decider = self._decider_label()
+        self.metrics_name = f"bot.{Path(cfg.state_file).stem}"
+        metrics.register_source(self.metrics_name, self.metrics)
+        metrics.register_source(f"risk.{self.book_name}", self.risk.book.metrics)
+        self._configure_memory()
+        if cfg.metrics_port:
+            metrics.serve(cfg.metrics_port)
+
+    def _recover(self) -> dict:
+        if self.journal is None:
+            return {}
+        state = self.journal.recover()
+        if state.wallet:
+            for name, value in state.wallet.items():
+                setattr(self.wallet, name, float(value))
+        self.execution.positions.update({symbol: [float(qty), float(avg)] for symbol, (qty, avg) in state.positions.items()})
+        self.portfolio.session_realized_pnl = state.session_realized_pnl
+        self.risk.last_trade_ts.update(state.last_trade_ts)
+        self.risk.book.add_realized(state.day_realized_pnl, state.day)
+        if state.last_decision:
+            self.last_decision = state.last_decision
+        overrides = {k: v for k, v in state.config.items() if k in {f.name for f in fields(BotConfig)} and k not in SECRET_FIELDS | UNRECOVERED_FIELDS}
+        if overrides:
+            # Journal'daki config degisiklikleri tekrar journal'a yazilmadan uygulanir.
+            self.journal.suspended = True
+            try:
+                self.apply_config(replace(self.cfg, **overrides))
+            finally:
+                self.journal.suspended = False
+        report = {"seq": state.seq, "snapshot_seq": state.snapshot_seq, "replayed_events": state.replayed_events, "duration_ms": state.duration_ms}
+        if state.seq:
+            self.logger.info("recovery.loaded", extra={"extra_data": report})
+        return report
+
+    def _book_name(self) -> str:
+        return exposure.book_name(self.cfg.bot_mode, self.cfg.market_type, self.cfg.risk_book or Path(self.cfg.state_file).stem)
+
+    def _sync_exposure(self) -> None:
+        # Bu botun pozisyonu process portfoy defterine mutlak degerle yazilir (acilis, hesap degisikligi).
+        qty, avg = self.execution.position(self.cfg.default_symbol)
+        self.risk.book.set_position(self.account, self.cfg.default_symbol, qty, avg, self.last_price or None)
+
+    def _book_fill(self, symbol: str, result: dict, price: float) -> None:
+        if result.get("status") not in FILL_STATUSES:
+            return
+        realized = result.get("realized_pnl")
+        self.risk.book.fill(
+            self.account,
+            symbol,
+            str(result.get("side", "")),
+            float(result.get("qty", 0.0)),
+            float(result.get("avg_price") or price),
+            float(realized) if realized is not None else None,
+        )
+
+    def _settle_orders(self) -> None:
+        # Onceki tick'lerde "pending" donen emirlerin sonradan gelen dolumlari tick'teki fill ile ayni yoldan islenir.
+        for symbol, result in self.execution.settle_orders():
+            if "realized_pnl" in result:
+                self.portfolio.session_realized_pnl += float(result["realized_pnl"])
+            self._book_fill(symbol, result, result["avg_price"])
+            self.risk.register_trade(symbol)
+            self.charts.mark(time.time(), result["side"].lower(), result["avg_price"], result["status"])
+            self._journal_fill(symbol, result, register_trade=True)
+            self.logger.info("order.late_fill", extra={"extra_data": result})
+
+    def _journal(self, kind: str, data: dict) -> None:
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(kind, data)
+        except Exception:
+            self.logger.exception("journal.append_failed")
+
+    def _journal_fill(self, symbol: str, result: dict, register_trade: bool) -> None:
+        if result.get("status") not in FILL_STATUSES:
+            return
+        self._journal(
+            "fill",
+            {
+                "symbol": symbol,
+                "side": result.get("side"),
+                "qty": result.get("qty"),
+                "realized_pnl": float(result.get("realized_pnl", 0.0)),
+                "register_trade": register_trade,
+                "wallet": {
+                    "wallet_balance": self.wallet.wallet_balance,
+                    "available_balance": self.wallet.available_balance,
+                    "base_qty": self.wallet.base_qty,
+                    "entry_price": self.wallet.entry_price,
+                },
+                "positions": {name: list(row) for name, row in self.execution.positions.items()},
+            },
+        )
+
+    def verify_recovery(self) -> dict:
+        # Demo/live modda journal'dan gelen son bakiye ile borsadaki bakiye karsilastirilir.
+        if self.cfg.bot_mode == "paper" or self.journal is None:
+            return {"ok": True, "checked": False, "reason": "paper mode"}
+        try:
+            live = self._fetch_external_balances()
+        except Exception as exc:
+            return {"ok": False, "checked": False, "reason": f"exchange unavailable: {exc}"}
+        known = self.journal.state.external_balances
+        if live is None or known is None:
+            return {"ok": True, "checked": False, "reason": "no balance baseline"}
+        drift = {k: float(live[k]) - float(known.get(k, 0.0)) for k in ("wallet_balance", "available_balance")}
+        report = {"ok": all(abs(v) <= self.cfg.recovery_balance_tolerance for v in drift.values()), "checked": True, "drift": drift}
+        self.logger.log(20 if report["ok"] else 30, "recovery.consistency", extra={"extra_data": report})
+        return report
+
+    def _decider_label(self) -> str:
+        return f"{self.cfg.decider_provider}:{self.cfg.decider_model}"
+
+    def metrics(self) -> dict:
+        return {
+            "analytics": self.history.analytics.metrics(),
+            "stage_timings_ms": dict(self.stage_timings_ms),
+            "prompt": dict(self.last_prompt or {}),
+            "last_price": self.last_price,
+            "emergency_stop": self.emergency_stop,
+            "rate_limit": self._rate_limit_metrics(),
+            "transport": transport.get_transport().metrics(),
+            "user_stream": self.user_stream.metrics() if self.user_stream is not None else {"enabled": False},
+            "orders": self.execution.orders.metrics(),
+        }
+
+    def _configure_memory(self) -> None:
+        logs = configure_recent_logs(self.cfg.log_recent_max)
+        profiler = memory.configure(self.cfg.memory_sample_seconds, self.cfg.memory_tracemalloc_frames, self.cfg.memory_top_allocators)
+        metrics.register_source("memory", profiler.metrics)
+        # Buffer'lar weakref ile izlenir; bot silinince kayit da duser.
+        memory.track_buffer("logs.recent", logs, self.cfg.log_recent_max)
+        self._track_buffers()
+
+    def _track_buffers(self) -> None:
+        memory.track_buffer(f"{self.metrics_name}.history_orders", self.history, self.cfg.history_max_orders)
+        memory.track_buffer(f"{self.metrics_name}.chart_buckets", self.charts, 2 * len(self.charts.price.levels) * self.cfg.chart_level_capacity + self.cfg.chart_max_markers)
+        memory.track_buffer(f"{self.metrics_name}.order_table", self.execution.orders.table, self.cfg.order_table_size)
+
+    def _configure_transport(self) -> None:
+        transport.configure(
+            retries=self.cfg.http_retries,
+            backoff_base=self.cfg.http_backoff_base_seconds,
+            backoff_cap=self.cfg.http_backoff_cap_seconds,
+            failure_threshold=self.cfg.circuit_failure_threshold,
+            reset_seconds=self.cfg.circuit_reset_seconds,
+            hedge_enabled=self.cfg.hedge_requests,
+            hedge_after_ms=self.cfg.hedge_after_ms,
+        )
+
+    def _rate_limit_metrics(self) -> dict:
+        return rate_limit.get_limiter(self.exchange.base_url, self.cfg.market_type).metrics()
 
     def set_emergency_stop(self, enabled: bool) -> None:
         self.emergency_stop = enabled
 
+    def apply_config(self, new_cfg: BotConfig) -> dict:
+        # Sadece degisen bileseni degistirir; wallet, risk cooldown, session PnL ve cache'ler korunur.
+        started = time.perf_counter()
+        changed = {f.name for f in fields(BotConfig) if getattr(self.cfg, f.name) != getattr(new_cfg, f.name)}
+        skipped = []
+        if self.execution.position(self.cfg.default_symbol)[0] > 0:
+            for name in sorted(changed & POSITION_BOUND_FIELDS):
+                changed.discard(name)
+                skipped.append(f"{name}: open position")
+        for name in changed:
+            # cfg nesnesi execution/risk/shadow ile paylasimli; yerinde guncellemek hepsine yansir.
+            setattr(self.cfg, name, getattr(new_cfg, name))
+
+        components = []
+        if changed & USER_STREAM_FIELDS and self.user_stream is not None:
+            # Yeni key/market ile stream ilk bakiye isteginde yeniden acilir.
+            self.stop_user_stream()
+            components.append("user_stream")
+        if changed & EXCHANGE_FIELDS:
+            self.exchange = BinanceClient(self.cfg.market_type, self.cfg.binance_testnet)
+            self.execution.exchange_client = self.exchange
+            self.execution.orders.client = self.exchange
+            self.execution.clear_symbol_rules()
+            components.append("exchange")
+        if changed & (DATA_FIELDS | EXCHANGE_FIELDS):
+            if changed & ({"default_symbol"} | EXCHANGE_FIELDS):
+                self.last_price = 0.0
+                self.last_candles = None
+            # Pozisyon yokken sembol degisir; cuzdan defterin yeni sembol satirina bakar.
+            self.wallet.symbol = self.cfg.default_symbol
+            components.append("data")
+        if changed & DECIDER_FIELDS:
+            self.decider = create_decider(self.cfg)
+            self.history.analytics.decider = self._decider_label()
+            components.append("decider")
+        if changed & SHADOW_FIELDS:
+            self.shadow.shutdown()
+            self.shadow = ShadowRunner(self.cfg)
+            components.append("shadow")
+        if "state_file" in changed:
+            self.history = InMemoryHistory(self.cfg.state_file, maxlen=self.cfg.history_max_orders)
+            self.history.analytics.decider = self._decider_label()
+            self.execution.history = self.history
+            self._repoint_state()
+            components.append("history")
+        if "risk_groups" in changed:
+            exposure.configure(self.cfg.risk_groups)
+        if changed & BOOK_FIELDS:
+            # Bot baska hesaba/defter adina gecti: pozisyonu eski defterden silinir, yeni defterine yazilir.
+            self.risk.book.set_position(self.account, self.cfg.default_symbol, 0.0, 0.0)
+            self.account = Path(self.cfg.state_file).stem
+            if self._book_name() != self.book_name:
+                metrics.unregister_source(f"risk.{self.book_name}")
+                self.book_name = self._book_name()
+                self.risk.book = exposure.get_book(self.book_name)
+                metrics.register_source(f"risk.{self.book_name}", self.risk.book.metrics)
+            self._sync_exposure()
+        if changed & RISK_FIELDS:
+            components.append("risk")
+        if "paper_fee_rate" in changed:
+            self.ledger.fee_rate = self.cfg.paper_fee_rate
+        if changed & MEMORY_FIELDS:
+            self._configure_memory()
+            components.append("memory")
+        if changed & TRANSPORT_FIELDS:
+            rate_limit.configure(self.cfg.rate_limit_headroom)
+            self._configure_transport()
+            components.append("transport")
+        journaled = {name: getattr(self.cfg, name) for name in changed - SECRET_FIELDS - {"state_file"}}
+        if journaled:
+            self._journal("config", journaled)
+
+        report = {
+            "changed": sorted(changed),
+            "components": components,
+            "skipped": skipped,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if changed or skipped:
+            self.logger.info("config.reloaded", extra={"extra_data": report})
+        return report
+
+    def _repoint_state(self) -> None:
+        # Hesap (state dosyasi) degisti: journal, kayit segmenti ve metrik adi yeni dosyaya tasinir.
+        if self.journal is not None:
+            carried = self.journal.state
+            self.journal.close()
+            self.journal = StateJournal(self.cfg.state_file, self.cfg.journal_snapshot_every)
+            seq = self.journal.recover().seq
+            # Yeni dosyanin seq'i devam eder; icerik botun guncel durumudur ve hemen snapshot'lanir.
+            self.journal.state = replace(carried, seq=seq, snapshot_seq=seq, replayed_events=0)
+            self.journal.snapshot()
+        if self.recorder is not None:
+            # Sonraki tick yeni state dosyali header ile yeni segment acar.
+            self.recorder.close()
+        metrics.unregister_source(self.metrics_name)
+        memory.untrack_buffers(f"{self.metrics_name}.")
+        self.metrics_name = f"bot.{Path(self.cfg.state_file).stem}"
+        metrics.register_source(self.metrics_name, self.metrics)
+        self._track_buffers()
+
     def refresh_only(self) -> dict:
-        return self._snapshot(error=None)
+        # Dashboard refresh'i weight bucket'inda en dusuk oncelikle siraya girer.
+        with rate_limit.request_priority(rate_limit.PRIORITY_UI):
+            return self._snapshot(error=None)
 
     def run_once(self) -> dict:
+        return asyncio.run(self.run_once_async())
+
+    async def run_once_async(self) -> dict:
+        record = {"ts": time.time(), "symbol": self.cfg.default_symbol} if self.recorder is not None else None
+        # Segment header'i tick'ten once alinir: replay segmentin ilk tick'ini de ayni baslangic durumundan oynatir.
+        header = self._record_header() if record is not None and self.recorder.needs_header() else None
+        snapshot = await self._tick(record)
+        if record is not None:
+            self._record_tick(record, snapshot, header)
+        return snapshot
+
+    async def _tick(self, record: dict | None) -> dict:
         try:
-            c1 = fetch_ohlcv(self.exchange.base_url, self.cfg.market_type, self.cfg.default_symbol, self.cfg.timeframe_fast, self.cfg.lookback)
-            c5 = fetch_ohlcv(self.exchange.base_url, self.cfg.market_type, self.cfg.default_symbol, self.cfg.timeframe_slow, self.cfg.lookback)
-            self.logger.info("tick.data_fetched", extra={"extra_data": {"symbol": self.cfg.default_symbol, "rows": len(c1)}})
+            symbol = self.cfg.default_symbol
+            # Birbirinden bagimsiz I/O (iki kline, symbol rules, hesap bakiyesi) ayni anda gonderilir.
+            c1, c5, rules, balances, depth = await self._stage(
+                "data",
+                self.cfg.data_timeout_seconds,
+                lambda: asyncio.gather(
+                    asyncio.to_thread(self.fetch_ohlcv, self.exchange.base_url, self.cfg.market_type, symbol, self.cfg.timeframe_fast, self.cfg.lookback),
+                    asyncio.to_thread(self.fetch_ohlcv, self.exchange.base_url, self.cfg.market_type, symbol, self.cfg.timeframe_slow, self.cfg.lookback),
+                    self._optional(self._prefetch_rules(symbol)),
+                    self._optional(asyncio.to_thread(self._fetch_external_balances)),
+                    self._optional(self._fetch_depth(symbol)),
+                ),
+            )
+            if record is not None:
+                record.update(klines={"fast": c1, "slow": c5}, rules=rules, balances=balances, depth=depth)
+            if depth is not None:
+                self.execution.order_books.setdefault(symbol, OrderBook(symbol)).apply_snapshot(depth["lastUpdateId"], depth["bids"], depth["asks"])
+            if rules is not None:
+                self.execution.store_symbol_rules(symbol, rules)
+            self.logger.info("tick.data_fetched", extra={"extra_data": {"symbol": symbol, "rows": len(c1)}})
+            self.last_candles = c1
             indicators = compute_indicator_snapshot(c1)
             latest_price = float(c1.iloc[-1]["close"])
             self.last_price = latest_price
+            self.risk.book.mark(symbol, latest_price)
+            self._settle_orders()
             positions = []
             if self.wallet.base_qty > 0:
-                positions.append(self.portfolio.build_position(self.cfg.default_symbol, self.wallet.base_qty, self.wallet.entry_price, latest_price))
+                positions.append(self.portfolio.build_position(symbol, self.wallet.base_qty, self.wallet.entry_price, latest_price))
 
             context = BotContext(
-                symbol=self.cfg.default_symbol,
+                symbol=symbol,
                 market_type=self.cfg.market_type,
                 latest_price=latest_price,
                 indicators=indicators,
                 balances={"wallet": self.wallet.wallet_balance, "available": self.wallet.available_balance},
                 positions=positions,
                 recent_orders=self.history.list_orders(10),
-                candles_1m=c1.tail(20).to_dict("records"),
-                candles_5m=c5.tail(20).to_dict("records"),
+                candles_1m=c1.tail(self.cfg.prompt_candles).to_dict("records"),
+                candles_5m=c5.tail(self.cfg.prompt_candles).to_dict("records"),
             )
 
-            decision = normalize_decision(self.decider.decide(context))
+            shadow_jobs = self.shadow.submit(context)
+            try:
+                raw_decision = await self._stage("decide", self.cfg.decide_timeout_seconds, lambda: asyncio.to_thread(self.decider.decide, context))
+                decision = normalize_decision(raw_decision)
+            except TimeoutError:
+                raw_decision = None
+                decision = {**DEFAULT_DECISION, "fallback_reason": "decider timeout"}
+            self.last_prompt = self.decider.last_prompt
+            if record is not None:
+                record.update(context=asdict(context), decision_raw=raw_decision, decision=decision, prompt=self.last_prompt)
             self.last_decision = decision
-            self.logger.info("tick.decision", extra={"extra_data": decision})
+            self._journal("decision", decision)
+            self.logger.info("tick.decision", extra={"extra_data": {**decision, "prompt_tokens": (self.last_prompt or {}).get("tokens")}})
 
             ok, msg = self.risk.validate(
-                self.cfg.default_symbol,
+                symbol,
                 decision,
                 self.wallet.available_balance,
-                open_positions=1 if self.wallet.base_qty > 0 else 0,
+                open_positions=1 if self.execution.position(symbol)[0] > 0 else 0,
                 session_realized_pnl=self.portfolio.session_realized_pnl,
+                notional=self.wallet.available_balance * decision.get("position_size_pct", 0.0) / 100,
             )
             self.logger.info("tick.risk", extra={"extra_data": {"ok": ok, "reason": msg}})
             if not ok:
-                return self._snapshot(order_result={"status": "blocked", "reason": msg}, error=None)
+                self.shadow.collect_async(shadow_jobs, context)
+                return await self._snapshot_async(order_result={"status": "blocked", "reason": msg}, error=None, balances=balances)
 
-            order_result = self.execution.execute(self.cfg.default_symbol, latest_price, decision, self.emergency_stop)
+            # Emir asamasi bilerek timeout/cancel edilmez: yarim kalan bir emrin durumu bilinemez hale gelir.
+            # Emir kimligi kararin mumuna baglidir: ayni mumda tekrarlanan karar ayni clientOrderId'yi uretir.
+            intent = f"{decision['action']}:{int(c1.iloc[-1]['open_time'])}"
+            order_result = await asyncio.to_thread(self.execution.execute, symbol, latest_price, decision, self.emergency_stop, balances, intent)
             if "realized_pnl" in order_result:
                 self.portfolio.session_realized_pnl += float(order_result["realized_pnl"])
-            if order_result.get("status") in {"filled", "simulated"}:
-                self.risk.register_trade(self.cfg.default_symbol)
+            self._book_fill(symbol, order_result, latest_price)
+            if order_result.get("status") in FILL_STATUSES:
+                self.risk.register_trade(symbol)
+                self.charts.mark(time.time(), decision["action"], float(order_result.get("avg_price", latest_price)), order_result["status"])
+                balances = None
+            self._journal_fill(symbol, order_result, register_trade=True)
             self.logger.info("tick.execution", extra={"extra_data": order_result})
-            return self._snapshot(order_result=order_result, error=None)
+            # Shadow sonuclari emirden sonra ve tick'i bekletmeden toplanir (SHADOW_TIMEOUT_SECONDS tick'e eklenmez).
+            self.shadow.collect_async(shadow_jobs, context)
+            return await self._snapshot_async(order_result=order_result, error=None, balances=balances)
         except Exception as exc:
             self.logger.exception("tick.failed")
-            return self._snapshot(order_result={"status": "error"}, error=str(exc))
+            return await self._snapshot_async(order_result={"status": "error"}, error=str(exc) or type(exc).__name__)
+
+    def _record_header(self) -> dict:
+        return {
+            "cfg": {f.name: getattr(self.cfg, f.name) for f in fields(BotConfig) if f.name not in SECRET_FIELDS},
+            "wallet": {name: getattr(self.wallet, name) for name in ("wallet_balance", "available_balance", "base_qty", "entry_price")},
+            # Demo/live modda botun kendi pozisyonu (sell/close boyutu buradan gelir).
+            "positions": {name: list(row) for name, row in self.execution.positions.items()},
+            "session_realized_pnl": self.portfolio.session_realized_pnl,
+            "last_trade_ts": dict(self.risk.last_trade_ts),
+            # Gunluk zarar limiti gerceklesmis PnL'e bakar; replay kendi defterini bu degerden kurar.
+            "day": self.risk.book.day,
+            "day_realized_pnl": self.risk.book.realized_today,
+            "rules": self.execution.cached_symbol_rules(self.cfg.default_symbol),
+        }
+
+    def _record_tick(self, record: dict, snapshot: dict, header: dict | None = None) -> None:
+        # Replay icin tick'in tum dis girdileri (mumlar, rules, bakiye, depth, karar, snapshot fiyati) kaydedilir.
+        price, sync_bal = self._snapshot_inputs or (self._fallback_price(), None)
+        record.update(
+            price=price,
+            snapshot_balances=list(sync_bal) if sync_bal is not None else None,
+            order_result=snapshot["order_result"],
+            timings=snapshot["stage_timings_ms"],
+            error=snapshot["error"],
+        )
+        try:
+            if header is None and self.recorder.needs_header():
+                header = self._record_header()
+            self.recorder.record(record, header)
+        except Exception:
+            self.logger.exception("recorder.write_failed")
+
+    async def _stage(self, name: str, timeout: float, make: Callable[[], Awaitable]):
+        # wait_for sadece await'i iptal eder; asyncio.to_thread'deki thread iptal edilemez ve calismaya devam eder.
+        # Bu yuzden asamanin task'lari deadline context'inde olusturulur: thread'deki HTTP/LLM cagrisi timeout'unu
+        # kalan sureyle sinirlar ve asama suresi dolunca kendisi doner (sonraki tick'e tasmaz).
+        started = time.perf_counter()
+        with deadline.deadline(timeout):
+            task = asyncio.ensure_future(make())
+        try:
+            return await asyncio.wait_for(task, timeout=timeout)
+        except TimeoutError:
+            self.logger.warning("tick.stage_timeout", extra={"extra_data": {"stage": name, "timeout_s": timeout}})
+            raise TimeoutError(f"{name} stage timeout ({timeout}s)") from None
+        finally:
+            self.stage_timings_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    @staticmethod
+    async def _optional(awaitable):
+        try:
+            return await awaitable
+        except Exception:
+            return None
+
+    async def _fetch_depth(self, symbol: str) -> dict | None:
+        # Paper depth fill aciksa her tick REST depth snapshot'i ile defter tazelenir.
+        if self.cfg.bot_mode != "paper" or not self.cfg.paper_depth_fill:
+            return None
+        return await asyncio.to_thread(self.exchange.get_order_book, symbol, self.cfg.depth_limit)
+
+    async def _prefetch_rules(self, symbol: str) -> dict | None:
+        if self.execution.cached_symbol_rules(symbol) is not None:
+            return None
+        return await asyncio.to_thread(self.exchange.get_symbol_rules, symbol)
 
     def close_all_positions(self) -> dict:
-        price = self.exchange.get_latest_price(self.cfg.default_symbol)
+        self._settle_orders()
+        with rate_limit.request_priority(rate_limit.PRIORITY_ORDER):
+            price = self.exchange.get_latest_price(self.cfg.default_symbol)
         result = self.execution.close_all(self.cfg.default_symbol, price)
+        self._book_fill(self.cfg.default_symbol, result, price)
         if "realized_pnl" in result:
             self.portfolio.session_realized_pnl += float(result["realized_pnl"])
+        self._journal_fill(self.cfg.default_symbol, result, register_trade=False)
         return self._snapshot(order_result=result, error=None)
 
 
@@ -99,44 +546,139 @@ class BotService:
             return self.cfg.binance_test_api_key or self.cfg.binance_api_key, self.cfg.binance_test_api_secret or self.cfg.binance_api_secret
         return self.cfg.binance_api_key, self.cfg.binance_api_secret
 
-    def _sync_external_balances(self) -> tuple[float, float] | None:
+    def _ensure_user_stream(self, api_key: str, api_secret: str) -> UserDataStream | None:
+        # Futures ACCOUNT_UPDATE/ORDER_TRADE_UPDATE olaylari henuz islenmiyor; stream sadece spot'ta acilir.
+        if not self.cfg.user_stream_enabled or self.cfg.market_type != "spot":
+            return None
+        if self.user_stream is None:
+            self.user_stream = UserDataStream(
+                self.exchange,
+                api_key,
+                api_secret,
+                keepalive_seconds=self.cfg.user_stream_keepalive_seconds,
+                reconcile_seconds=self.cfg.user_stream_reconcile_seconds,
+            )
+            self.execution.account_state = self.user_stream.state
+            self.user_stream.state.listeners.append(self.execution.orders.on_execution_report)
+            self.user_stream.start()
+        return self.user_stream
+
+    def stop_user_stream(self) -> None:
+        if self.user_stream is not None:
+            self.user_stream.stop()
+            self.user_stream = None
+            self.execution.account_state = None
+
+    def _fetch_external_balances(self) -> dict[str, float] | None:
         if self.cfg.bot_mode == "paper":
             return None
         api_key, api_secret = self._active_api_credentials()
         if not api_key or not api_secret:
             return None
+        stream = self._ensure_user_stream(api_key, api_secret)
+        if stream is not None and stream.healthy():
+            return stream.state.quote_balances()
+        return self.exchange.get_account_balances(api_key, api_secret)
+
+    def _sync_external_balances(self) -> tuple[float, float] | None:
         try:
-            bal = self.exchange.get_account_balances(api_key, api_secret)
-            return bal["wallet_balance"], bal["available_balance"]
+            bal = self._fetch_external_balances()
         except Exception:
             return None
+        if bal is None:
+            return None
+        return bal["wallet_balance"], bal["available_balance"]
+
+    def _fallback_price(self) -> float:
+        return self.last_price if self.last_price > 0 else self.wallet.entry_price
 
     def _snapshot(self, order_result: dict | None = None, error: str | None = None) -> dict:
         try:
             price = self.exchange.get_latest_price(self.cfg.default_symbol)
         except Exception:
-            price = self.last_price if self.last_price > 0 else self.wallet.entry_price
+            price = self._fallback_price()
+        return self._build_snapshot(price, self._sync_external_balances(), order_result, error)
+
+    async def _snapshot_async(self, order_result: dict | None = None, error: str | None = None, balances: dict[str, float] | None = None) -> dict:
+        # Emir yoksa tick basinda cekilen bakiye yeniden kullanilir; fiyat ve bakiye ayni anda istenir.
+        sync_bal = (balances["wallet_balance"], balances["available_balance"]) if balances is not None else None
+        try:
+            price, fetched = await self._stage(
+                "snapshot",
+                self.cfg.snapshot_timeout_seconds,
+                lambda: asyncio.gather(
+                    self._optional(asyncio.to_thread(self.exchange.get_latest_price, self.cfg.default_symbol)),
+                    asyncio.sleep(0) if sync_bal is not None else asyncio.to_thread(self._sync_external_balances),
+                ),
+            )
+        except TimeoutError:
+            price, fetched = None, None
+        if sync_bal is None:
+            sync_bal = fetched
+        return self._build_snapshot(price if price is not None else self._fallback_price(), sync_bal, order_result, error)
 
+    def _build_snapshot(self, price: float, sync_bal: tuple[float, float] | None, order_result: dict | None, error: str | None) -> dict:
+        self._snapshot_inputs = (price, sync_bal)
         wallet_balance = self.wallet.wallet_balance
         available_balance = self.wallet.available_balance
-        sync_bal = self._sync_external_balances()
         if sync_bal is not None:
             wallet_balance, available_balance = sync_bal
+            known = self.journal.state.external_balances if self.journal is not None else None
+            if known is None or (known.get("wallet_balance"), known.get("available_balance")) != (wallet_balance, available_balance):
+                self._journal("balance", {"wallet_balance": wallet_balance, "available_balance": available_balance})
 
-        positions = []
-        if self.wallet.base_qty > 0:
-            positions.append(self.portfolio.build_position(self.cfg.default_symbol, self.wallet.base_qty, self.wallet.entry_price, price))
-        cards = self.portfolio.account_cards(wallet_balance, available_balance, positions)
-        return {
+        if sync_bal is None:
+            ledger = self.ledger
+        else:
+            # Demo/live: bakiye borsadan, pozisyonlar botun kendi dolumlarindan; ayni defter hesabiyla gosterilir.
+            own = self.execution.positions
+            ledger = type(self.ledger).from_columns(
+                list(own),
+                qty=[row[0] for row in own.values()],
+                avg_entry=[row[1] for row in own.values()],
+                wallet_balance=wallet_balance,
+                available_balance=available_balance,
+            )
+        ledger.revalue({self.cfg.default_symbol: price})
+        cards = ledger.account_cards(realized_pnl=self.portfolio.session_realized_pnl)
+        analytics = self.history.analytics
+        analytics.update_equity(cards["equity"])
+        self.charts.append(time.time(), cards["equity"], price)
+        snapshot = {
             "symbol": self.cfg.default_symbol,
             "mode": self.cfg.bot_mode,
             "market_type": self.cfg.market_type,
             "account_cards": cards,
-            "positions": self.portfolio.position_table(positions),
+            "positions": ledger.position_table(),
             "recent_orders": self.history.list_orders(20),
             "last_decision": self.last_decision,
             "order_result": order_result or {"status": "hold"},
             "emergency_stop": self.emergency_stop,
+            "stage_timings_ms": dict(self.stage_timings_ms),
+            "prompt": self.last_prompt,
+            "rate_limit": self._rate_limit_metrics(),
+            "shadow_leaderboard": self.shadow.leaderboard(price),
+            "analytics": analytics.summary(),
             "logs": get_recent_logs(80),
             "error": error,
         }
+        snapshot["versions"] = {
+            "cards": self._section_version("cards", cards),
+            "positions": self._section_version("positions", snapshot["positions"]),
+            "orders": self.history.version,
+            "analytics": analytics.version,
+            "charts": self.charts.version,
+            "decision": self._section_version(
+                "decision", (snapshot["last_decision"], snapshot["order_result"], error, self.emergency_stop, snapshot["shadow_leaderboard"])
+            ),
+            "logs": get_log_version(),
+        }
+        return snapshot
+
+    def _section_version(self, name: str, value) -> int:
+        # UI fragment'leri sadece versiyonu degisen paneli yeniden hazirlar.
+        version, previous = self._section_state.get(name, (0, None))
+        if value != previous:
+            version += 1
+            self._section_state[name] = (version, value)
+        return version
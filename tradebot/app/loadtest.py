@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import gc
+import html
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+from pathlib import Path
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+import zlib
+
+from tradebot.app.memory import rss_mb
+from tradebot.app.replay import _percentile
+
+INTERVAL_MS = {"1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000}
+
+
+def _stub_price(symbol: str, index: float) -> float:
+    phase = zlib.crc32(symbol.encode()) % 1000 / 100
+    return 1.0 + 0.02 * math.sin(index / 7 + phase) + 0.005 * math.sin(index / 1.3 + phase)
+
+
+def _klines(symbol: str, interval: str, limit: int) -> list[list]:
+    step = INTERVAL_MS.get(interval, 60_000)
+    now = time.time() * 1000
+    last = int(now // step)
+    rows = []
+    for k in range(last - limit + 1, last + 1):
+        open_, close = _stub_price(symbol, k), _stub_price(symbol, k + 1)
+        if k == last:
+            # Acik mum her istekte biraz oynar; botun gordugu fiyat sabit kalmaz.
+            close = open_ + (close - open_) * ((now % step) / step)
+        high, low = max(open_, close) * 1.001, min(open_, close) * 0.999
+        rows.append([k * step, f"{open_:.6f}", f"{high:.6f}", f"{low:.6f}", f"{close:.6f}", "1000.0", k * step + step - 1, "0", 10, "0", "0", "0"])
+    return rows
+
+
+def _stub_decision(context: dict) -> dict:
+    roll = random.random()
+    action = "buy" if roll < 0.1 else "close" if roll < 0.15 else "hold"
+    return {"symbol": context.get("s"), "action": action, "confidence": 0.6, "reason": "stub", "position_size_pct": 5.0 if action == "buy" else 100.0}
+
+
+def _stub_handler(exchange_latency_ms: float, llm_latency_ms: float):
+    from http.server import BaseHTTPRequestHandler
+
+    def pause(ms: float) -> None:
+        if ms > 0:
+            time.sleep(ms * random.uniform(0.5, 1.5) / 1000)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, payload: Any) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            endpoint = url.path.rsplit("/v3/", 1)[-1].rsplit("/v1/", 1)[-1]
+            symbol = query.get("symbol", "LT000USDT")
+            pause(exchange_latency_ms)
+            if endpoint == "klines":
+                self._send(_klines(symbol, query.get("interval", "1m"), int(query.get("limit", 200))))
+            elif endpoint == "exchangeInfo":
+                filters = [
+                    {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001"},
+                    {"filterType": "NOTIONAL", "minNotional": "1"},
+                    {"filterType": "PRICE_FILTER", "tickSize": "0.000001"},
+                ]
+                self._send({"symbols": [{"symbol": symbol, "baseAsset": symbol[:-4], "quoteAsset": "USDT", "filters": filters}]})
+            elif endpoint == "ticker/price":
+                self._send({"symbol": symbol, "price": _klines(symbol, "1m", 1)[-1][4]})
+            elif endpoint == "depth":
+                price = _stub_price(symbol, time.time() / 60)
+                levels = int(query.get("limit", 100))
+                self._send(
+                    {
+                        "lastUpdateId": int(time.time() * 1000),
+                        "bids": [[f"{price * (1 - 0.0005 * (i + 1)):.6f}", "500"] for i in range(levels)],
+                        "asks": [[f"{price * (1 + 0.0005 * (i + 1)):.6f}", "500"] for i in range(levels)],
+                    }
+                )
+            else:
+                self.send_error(404)
+
+        def do_POST(self) -> None:
+            # Ollama /api/generate uyumlu stub LLM; decide_many icin dizi gelirse dizi doner.
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            pause(llm_latency_ms)
+            try:
+                contexts = json.loads(request.get("prompt", "{}"))
+            except json.JSONDecodeError:
+                contexts = {}
+            if isinstance(contexts, list):
+                response = [_stub_decision(c) for c in contexts]
+            else:
+                response = _stub_decision(contexts)
+            self._send({"response": json.dumps(response), "prompt_eval_count": len(request.get("prompt", "")) // 4})
+
+        def log_message(self, format: str, *args) -> None:
+            return
+
+    return Handler
+
+
+def serve_stubs(conn, exchange_latency_ms: float, llm_latency_ms: float) -> None:
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _stub_handler(exchange_latency_ms, llm_latency_ms))
+    server.daemon_threads = True
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+@dataclass(slots=True)
+class LoadStep:
+    symbols: int
+    interval: float
+    sessions: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.symbols}x{self.interval:g}s/{self.sessions}ui"
+
+
+@dataclass
+class StepStats:
+    tick_ms: list[float] = field(default_factory=list)
+    refresh_ms: list[float] = field(default_factory=list)
+    stage_ms: dict[str, list[float]] = field(default_factory=dict)
+    missed: int = 0
+    errors: int = 0
+    rss_peak: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    return {
+        "p50": round(_percentile(values, 0.5), 2),
+        "p95": round(_percentile(values, 0.95), 2),
+        "p99": round(_percentile(values, 0.99), 2),
+        "max": round(max(values, default=0.0), 2),
+    }
+
+
+class LoadTest:
+    def __init__(
+        self,
+        steps: list[LoadStep],
+        duration: float = 10.0,
+        exchange_latency_ms: float = 20.0,
+        llm_latency_ms: float = 200.0,
+        ui_refresh_seconds: float = 2.0,
+        headroom: float = 0.8,
+        label: str = "",
+    ) -> None:
+        self.steps = steps
+        self.duration = duration
+        self.exchange_latency_ms = exchange_latency_ms
+        self.llm_latency_ms = llm_latency_ms
+        self.ui_refresh_seconds = ui_refresh_seconds
+        self.headroom = headroom
+        self.label = label
+
+    def run(self) -> dict:
+        ctx = mp.get_context("spawn")
+        parent, child = ctx.Pipe()
+        # Stub'lar ayri process'te: olculen CPU/RSS sadece botun.
+        server = ctx.Process(target=serve_stubs, args=(child, self.exchange_latency_ms, self.llm_latency_ms), daemon=True)
+        server.start()
+        try:
+            base_url = f"http://127.0.0.1:{parent.recv()}"
+            with tempfile.TemporaryDirectory() as tmp:
+                results = [self.run_step(step, base_url, Path(tmp) / f"step{i}") for i, step in enumerate(self.steps)]
+        finally:
+            server.terminate()
+            server.join(timeout=5)
+        return {
+            "label": self.label,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {
+                "duration_s": self.duration,
+                "exchange_latency_ms": self.exchange_latency_ms,
+                "llm_latency_ms": self.llm_latency_ms,
+                "ui_refresh_seconds": self.ui_refresh_seconds,
+                "rate_limit_headroom": self.headroom,
+            },
+            "steps": results,
+        }
+
+    def _bots(self, step: LoadStep, base_url: str, workdir: Path) -> list:
+        from tradebot.app.bot_service import BotService
+        from tradebot.app.registry import BotRunner, SnapshotBus, bot_key
+        from tradebot.config.settings import BotConfig
+
+        workdir.mkdir(parents=True, exist_ok=True)
+        bus = SnapshotBus()
+        runners = []
+        for i in range(step.symbols):
+            cfg = BotConfig(
+                default_symbol=f"LT{i:03d}USDT",
+                state_file=str(workdir / f"LT{i:03d}.json"),
+                decider_provider="Ollama",
+                decider_model="stub",
+                ollama_base_url=base_url,
+                cooldown_seconds=0,
+                rate_limit_headroom=self.headroom,
+            )
+            bot = BotService(cfg)
+            bot.exchange.base_url = base_url
+            # Dashboard'daki gibi: tick ve refresh ayni runner kilidinden gecer.
+            runners.append(BotRunner(bot_key(cfg), bot, bus))
+        return runners
+
+    def run_step(self, step: LoadStep, base_url: str, workdir: Path) -> dict:
+        from tradebot.app import memory, metrics
+        from tradebot.exchange import rate_limit
+
+        runners = self._bots(step, base_url, workdir)
+        stats = StepStats()
+        limiter = rate_limit.get_limiter(base_url, "spot")
+        waited_before = limiter.waited_s
+        cpu_before, wall_before = os.times(), time.perf_counter()
+        stop_at = wall_before + self.duration
+        threads = [threading.Thread(target=self._ticker, args=(r, step.interval, stop_at, stats), daemon=True) for r in runners]
+        threads += [
+            threading.Thread(target=self._session, args=(runners[i % len(runners)], stop_at, stats, i), daemon=True) for i in range(step.sessions)
+        ]
+        sampler = threading.Thread(target=self._sample, args=(stop_at, stats), daemon=True)
+        for thread in [*threads, sampler]:
+            thread.start()
+        for thread in [*threads, sampler]:
+            thread.join()
+        wall = time.perf_counter() - wall_before
+        cpu_after = os.times()
+        cpu_s = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+        expected = step.symbols * max(1, int(self.duration / step.interval))
+        report = {
+            "key": step.key,
+            "symbols": step.symbols,
+            "interval_s": step.interval,
+            "sessions": step.sessions,
+            "ticks": len(stats.tick_ms),
+            "expected_ticks": expected,
+            "errors": stats.errors,
+            "missed_deadlines": stats.missed,
+            "missed_pct": round(stats.missed / expected * 100, 2) if expected else 0.0,
+            "tick_ms": _summary(stats.tick_ms),
+            "stage_p95_ms": {stage: round(_percentile(values, 0.95), 2) for stage, values in sorted(stats.stage_ms.items())},
+            "refreshes": len(stats.refresh_ms),
+            "refresh_ms": _summary(stats.refresh_ms),
+            "cpu_pct": round(cpu_s / wall * 100, 1) if wall else 0.0,
+            "rss_mb_peak": round(stats.rss_peak, 1),
+            "rss_mb_end": round(rss_mb(), 1),
+            "rate_limit_waited_s": round(limiter.waited_s - waited_before, 3),
+        }
+        for runner in runners:
+            runner.shutdown()
+            metrics.unregister_source(runner.bot.metrics_name)
+            memory.untrack_buffers(runner.bot.metrics_name)
+        del runners
+        gc.collect()
+        return report
+
+    @staticmethod
+    def _ticker(runner, interval: float, stop_at: float, stats: StepStats) -> None:
+        next_at = time.perf_counter()
+        while next_at < stop_at:
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            started = time.perf_counter()
+            snapshot = runner.run_once()
+            finished = time.perf_counter()
+            next_at += interval
+            with stats.lock:
+                stats.tick_ms.append((finished - started) * 1000)
+                stats.errors += 1 if snapshot.get("error") else 0
+                for stage, value in snapshot.get("stage_timings_ms", {}).items():
+                    stats.stage_ms.setdefault(stage, []).append(value)
+                if finished > next_at:
+                    # Tick bir sonraki karar zamanini gecti: kacan slotlar atlanir ve sayilir.
+                    skipped = int((finished - next_at) // interval) + 1
+                    stats.missed += skipped
+                    next_at += (skipped - 1) * interval
+
+    def _session(self, runner, stop_at: float, stats: StepStats, index: int) -> None:
+        # Session'lar ayni anda vurmasin diye baslangic kaydirilir.
+        time.sleep(self.ui_refresh_seconds * (index % 8) / 8)
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            runner.refresh()
+            elapsed = time.perf_counter() - started
+            with stats.lock:
+                stats.refresh_ms.append(elapsed * 1000)
+            time.sleep(max(0.0, self.ui_refresh_seconds - elapsed))
+
+    @staticmethod
+    def _sample(stop_at: float, stats: StepStats) -> None:
+        while time.perf_counter() < stop_at:
+            stats.rss_peak = max(stats.rss_peak, rss_mb())
+            time.sleep(0.25)
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    # Ayni (sembol, interval, session) adimi eslestirilir; pozitif fark = bu surum daha kotu.
+    previous = {step["key"]: step for step in baseline.get("steps", [])}
+    for step in report["steps"]:
+        old = previous.get(step["key"])
+        if old is None:
+            continue
+        base_p95 = old["tick_ms"]["p95"]
+        step["vs_baseline"] = {
+            "tick_p95_pct": round((step["tick_ms"]["p95"] - base_p95) / base_p95 * 100, 1) if base_p95 else None,
+            "missed_pct_delta": round(step["missed_pct"] - old["missed_pct"], 2),
+            "cpu_pct_delta": round(step["cpu_pct"] - old["cpu_pct"], 1),
+            "rss_mb_delta": round(step["rss_mb_peak"] - old["rss_mb_peak"], 1),
+        }
+    report["baseline"] = {"label": baseline.get("label", ""), "created_at": baseline.get("created_at")}
+    report["baseline_steps"] = baseline.get("steps", [])
+    return report
+
+
+def _svg_chart(title: str, keys: list[str], series: dict[str, list[float | None]], width: int = 640, height: int = 220) -> str:
+    colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]
+    values = [v for line in series.values() for v in line if v is not None]
+    top = max(values, default=1.0) or 1.0
+    pad = 40
+    step_x = (width - 2 * pad) / max(1, len(keys) - 1)
+    parts = [f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg" font-size="10">']
+    parts.append(f'<text x="{pad}" y="14" font-size="12">{html.escape(title)} (max {top:.1f})</text>')
+    parts.append(f'<line x1="{pad}" y1="{height - pad}" x2="{width - pad}" y2="{height - pad}" stroke="#999"/>')
+    for (name, line), color in zip(series.items(), itertools.cycle(colors)):
+        points = [
+            f"{pad + i * step_x:.1f},{height - pad - (v / top) * (height - 2 * pad - 10):.1f}" for i, v in enumerate(line) if v is not None
+        ]
+        parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{" ".join(points)}"/>')
+        parts.append(f'<text x="{width - pad}" y="{20 + 12 * list(series).index(name)}" fill="{color}" text-anchor="end">{html.escape(name)}</text>')
+    for i, key in enumerate(keys):
+        parts.append(f'<text x="{pad + i * step_x:.1f}" y="{height - pad + 14}" text-anchor="middle">{html.escape(key)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def render_html(report: dict) -> str:
+    steps = report["steps"]
+    keys = [s["key"] for s in steps]
+    baseline = {s["key"]: s for s in report.get("baseline_steps", [])}
+    current_label = report.get("label") or "current"
+    base_label = (report.get("baseline") or {}).get("label") or "baseline"
+
+    def with_baseline(metric) -> dict[str, list[float | None]]:
+        series = {current_label: [metric(s) for s in steps]}
+        if baseline:
+            series[base_label] = [metric(baseline[k]) if k in baseline else None for k in keys]
+        return series
+
+    charts = [
+        _svg_chart("tick p95 ms", keys, with_baseline(lambda s: s["tick_ms"]["p95"])),
+        _svg_chart("missed deadlines %", keys, with_baseline(lambda s: s["missed_pct"])),
+        _svg_chart("refresh p95 ms", keys, with_baseline(lambda s: s["refresh_ms"]["p95"])),
+        _svg_chart("CPU % / RSS MB", keys, {"cpu %": [s["cpu_pct"] for s in steps], "rss MB": [s["rss_mb_peak"] for s in steps]}),
+    ]
+    columns = ["key", "ticks", "errors", "missed_pct", "tick p50", "tick p95", "tick p99", "refresh p95", "cpu_pct", "rss_mb_peak", "rate_limit_waited_s", "vs baseline p95 %"]
+    rows = []
+    for s in steps:
+        cells = [
+            s["key"], s["ticks"], s["errors"], s["missed_pct"], s["tick_ms"]["p50"], s["tick_ms"]["p95"], s["tick_ms"]["p99"],
+            s["refresh_ms"]["p95"], s["cpu_pct"], s["rss_mb_peak"], s["rate_limit_waited_s"], (s.get("vs_baseline") or {}).get("tick_p95_pct", ""),
+        ]
+        rows.append("<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in cells) + "</tr>")
+    settings = ", ".join(f"{k}={v}" for k, v in report["settings"].items())
+    return (
+        "<!doctype html><html><head><meta charset='utf-8'><title>TradeBot load test</title>"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:2px 6px;text-align:right}</style>"
+        f"</head><body><h2>TradeBot load test {html.escape(current_label)}</h2>"
+        f"<p>{html.escape(report['created_at'])} | Python {html.escape(report['python'])} | {report['cpu_count']} CPU | {html.escape(settings)}"
+        + (f" | baseline: {html.escape(base_label)}" if baseline else "")
+        + "</p>"
+        + "".join(f"<div>{chart}</div>" for chart in charts)
+        + "<table><tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in columns) + "</tr>" + "".join(rows) + "</table>"
+        + f"<script type='application/json' id='report'>{html.escape(json.dumps(report))}</script></body></html>"
+    )
+
+
+def _floats(text: str) -> list[float]:
+    return [float(part) for part in text.split(",") if part.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test BotService against a local stub exchange and stub LLM")
+    parser.add_argument("--symbols", default="1,4,16", help="virgulle ayrilmis sembol sayilari")
+    parser.add_argument("--intervals", default="2,1", help="karar araliklari (saniye)")
+    parser.add_argument("--sessions", default="0,8", help="refresh_only cagiran dashboard session sayilari")
+    parser.add_argument("--duration", type=float, default=10.0, help="adim basina sure (saniye)")
+    parser.add_argument("--exchange-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--ui-refresh-seconds", type=float, default=2.0)
+    parser.add_argument("--headroom", type=float, default=0.8)
+    parser.add_argument("--label", default="", help="surum etiketi (rapor ve karsilastirmada gorunur)")
+    parser.add_argument("--baseline", help="onceki surumun JSON raporu")
+    parser.add_argument("--out", default="loadtest-report", help="cikti dosya on eki (.json ve .html yazilir)")
+    args = parser.parse_args(argv)
+
+    steps = [
+        LoadStep(int(symbols), interval, int(sessions))
+        for symbols, interval, sessions in itertools.product(_floats(args.symbols), _floats(args.intervals), _floats(args.sessions))
+    ]
+    report = LoadTest(
+        steps,
+        duration=args.duration,
+        exchange_latency_ms=args.exchange_latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        ui_refresh_seconds=args.ui_refresh_seconds,
+        headroom=args.headroom,
+        label=args.label,
+    ).run()
+    if args.baseline:
+        report = compare(report, json.loads(Path(args.baseline).read_text()))
+    out = Path(args.out)
+    out.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    out.with_suffix(".html").write_text(render_html(report))
+    for step in report["steps"]:
+        delta = (step.get("vs_baseline") or {}).get("tick_p95_pct")
+        print(
+            f"{step['key']:>16}  ticks {step['ticks']:5d}  p50 {step['tick_ms']['p50']:8.1f}  p95 {step['tick_ms']['p95']:8.1f} ms  "
+            f"missed {step['missed_pct']:5.1f}%  refresh p95 {step['refresh_ms']['p95']:7.1f} ms  cpu {step['cpu_pct']:5.1f}%  "
+            f"rss {step['rss_mb_peak']:6.1f} MB" + (f"  vs baseline p95 {delta:+.1f}%" if delta is not None else "")
+        )
+    print(f"report: {out.with_suffix('.json')} {out.with_suffix('.html')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from collections import deque
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any
+import weakref
+
+from tradebot.loggingx.logger import get_logger
+
+# tradebot disindaki allocation'lar kutuphane adina atanir.
+LIBRARIES = ("pandas", "numpy", "streamlit", "altair", "asyncio", "json", "logging", "requests", "urllib3", "websockets", "concurrent")
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # /proc yoksa (macOS) sadece tepe deger bilinir.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def subsystem_of(filename: str) -> str:
+    path = filename.replace("\\", "/")
+    if "/tradebot/" in path:
+        package = path.rsplit("/tradebot/", 1)[1].split("/", 1)
+        return f"tradebot.{package[0]}" if len(package) > 1 else "tradebot"
+    for library in LIBRARIES:
+        if f"/{library}/" in path or path.endswith(f"/{library}.py"):
+            return library
+    return "other"
+
+
+def _attribute(traceback: tracemalloc.Traceback) -> str:
+    # En yeni frame'den geriye: allocation'i tetikleyen ilk tradebot modulu sahibidir (pandas cagrisi dahil).
+    for frame in reversed(traceback):
+        name = subsystem_of(frame.filename)
+        if name.startswith("tradebot"):
+            return name
+    return subsystem_of(traceback[-1].filename) if len(traceback) else "other"
+
+
+# name -> (weakref(buffer), cap); bufferin sahibi silinince kayit kendiliginden duser.
+_BUFFERS: dict[str, tuple[weakref.ref, int | None]] = {}
+_BUFFERS_LOCK = threading.Lock()
+
+
+def track_buffer(name: str, buffer: Any, cap: int | None = None) -> None:
+    with _BUFFERS_LOCK:
+        _BUFFERS[name] = (weakref.ref(buffer), cap)
+
+
+def untrack_buffers(prefix: str) -> None:
+    with _BUFFERS_LOCK:
+        for name in [name for name in _BUFFERS if name.startswith(prefix)]:
+            del _BUFFERS[name]
+
+
+def buffer_sizes() -> dict[str, dict[str, int | None]]:
+    out = {}
+    with _BUFFERS_LOCK:
+        items = list(_BUFFERS.items())
+    for name, (ref, cap) in items:
+        buffer = ref()
+        if buffer is None:
+            with _BUFFERS_LOCK:
+                _BUFFERS.pop(name, None)
+            continue
+        out[name] = {"size": len(buffer), "cap": cap}
+    return out
+
+
+class MemoryProfiler:
+    # Periyodik RSS + (acik ise) tracemalloc ornegi: alt sistem basina bayt, en cok ayiran satirlar, buffer doluluklari.
+    # tracemalloc maliyetli oldugu icin frames=0 iken sadece RSS ve buffer boyutlari toplanir.
+    def __init__(self, interval: float = 60.0, frames: int = 0, top: int = 10, history: int = 120) -> None:
+        self.interval = interval
+        self.frames = frames
+        self.top = top
+        self.samples: deque[dict[str, Any]] = deque(maxlen=history)
+        self.top_allocators: list[dict[str, Any]] = []
+        self.logger = get_logger("tradebot.memory")
+        self._owns_tracing = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._owns_tracing = True
+        if self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="memory-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                sample = self.sample()
+                self.logger.info("memory.sample", extra={"extra_data": {"rss_mb": sample["rss_mb"], "traced_mb": sample.get("traced_mb")}})
+            except Exception:
+                self.logger.exception("memory.sample_failed")
+
+    def sample(self) -> dict[str, Any]:
+        sample: dict[str, Any] = {"ts": time.time(), "rss_mb": round(rss_mb(), 2), "gc_counts": list(gc.get_count()), "buffers": buffer_sizes()}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+            )
+            sizes: dict[str, int] = {}
+            owners: dict[tracemalloc.Traceback, str] = {}
+            for trace in snapshot.traces:
+                owner = owners.get(trace.traceback)
+                if owner is None:
+                    owner = owners[trace.traceback] = _attribute(trace.traceback)
+                sizes[owner] = sizes.get(owner, 0) + trace.size
+            sample["traced_mb"] = round(current / 2**20, 3)
+            sample["traced_peak_mb"] = round(peak / 2**20, 3)
+            sample["subsystems_mb"] = {name: round(size / 2**20, 3) for name, size in sorted(sizes.items(), key=lambda kv: -kv[1])}
+            # Snapshot'in kendisi saklanmaz; sadece ozet satirlar tutulur.
+            self.top_allocators = [
+                {
+                    "where": f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}",
+                    "subsystem": _attribute(stat.traceback),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("traceback" if self.frames > 1 else "lineno")[: self.top]
+            ]
+        self.samples.append(sample)
+        return sample
+
+    def growth_mb_per_hour(self) -> float | None:
+        if len(self.samples) < 2:
+            return None
+        first, last = self.samples[0], self.samples[-1]
+        hours = (last["ts"] - first["ts"]) / 3600
+        return round((last["rss_mb"] - first["rss_mb"]) / hours, 3) if hours > 0 else None
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "latest": self.samples[-1] if self.samples else self.sample(),
+            "growth_rss_mb_per_hour": self.growth_mb_per_hour(),
+            "samples": len(self.samples),
+            "top_allocators": list(self.top_allocators),
+        }
+
+    def metrics(self) -> dict[str, Any]:
+        latest = self.samples[-1] if self.samples else {"rss_mb": round(rss_mb(), 2), "buffers": buffer_sizes()}
+        out: dict[str, Any] = {
+            "rss_mb": latest["rss_mb"],
+            "growth_rss_mb_per_hour": self.growth_mb_per_hour(),
+            "buffers": {name: info["size"] for name, info in latest["buffers"].items()},
+            "tracing": tracemalloc.is_tracing(),
+        }
+        if "traced_mb" in latest:
+            out.update(traced_mb=latest["traced_mb"], subsystems_mb=latest["subsystems_mb"], top_allocators=list(self.top_allocators))
+        return out
+
+
+_PROFILER: MemoryProfiler | None = None
+_PROFILER_LOCK = threading.Lock()
+
+
+def configure(interval: float, frames: int = 0, top: int = 10) -> MemoryProfiler:
+    # Process basina tek profiler; ayarlar degisirse eskisi durdurulup yenisi baslatilir.
+    global _PROFILER
+    with _PROFILER_LOCK:
+        current = _PROFILER
+        if current is not None and (current.interval, current.frames, current.top) == (interval, frames, top):
+            return current
+        if current is not None:
+            current.stop()
+        _PROFILER = MemoryProfiler(interval, frames, top)
+        _PROFILER.start()
+        return _PROFILER
+
+
+def get_profiler() -> MemoryProfiler | None:
+    return _PROFILER
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import TYPE_CHECKING, Any, Callable
+
+from tradebot.loggingx.logger import get_logger
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+MetricsSource = Callable[[], dict[str, Any]]
+
+_SOURCES: dict[str, MetricsSource] = {}
+_SERVER: ThreadingHTTPServer | None = None
+_LOCK = threading.Lock()
+
+
+def register_source(name: str, source: MetricsSource) -> None:
+    # Her bot/alt sistem kendi metriklerini isimli bir kaynak olarak ekler; endpoint istek aninda toplar.
+    with _LOCK:
+        _SOURCES[name] = source
+
+
+def unregister_source(name: str) -> None:
+    with _LOCK:
+        _SOURCES.pop(name, None)
+
+
+def collect() -> dict[str, dict[str, Any]]:
+    with _LOCK:
+        sources = dict(_SOURCES)
+    out = {}
+    for name, source in sources.items():
+        try:
+            out[name] = source()
+        except Exception as exc:
+            out[name] = {"error": str(exc)}
+    return out
+
+
+def _flatten(prefix: str, value: Any, out: list[tuple[str, float]]) -> None:
+    if isinstance(value, bool):
+        out.append((prefix, float(value)))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, float(value)))
+    elif isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}_{key}", inner, out)
+
+
+def prometheus_text(metrics: dict[str, dict[str, Any]] | None = None) -> str:
+    # Sayisal alanlar duzlestirilir: tradebot_<alan>{source="..."} <deger>; liste/metin alanlari atlanir.
+    metrics = collect() if metrics is None else metrics
+    lines = []
+    for source, values in sorted(metrics.items()):
+        flat: list[tuple[str, float]] = []
+        _flatten("tradebot", values, flat)
+        for name, value in flat:
+            name = "".join(ch if ch.isalnum() or ch == "_" else "_" for ch in name)
+            lines.append(f'{name}{{source="{source}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def _handler_class():
+    # http.server sadece endpoint acilinca yuklenir; bot_service importu hafif kalir.
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.startswith("/metrics.json"):
+                body, content_type = json.dumps(collect(), default=str).encode(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            return
+
+    return Handler
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    global _SERVER
+    from http.server import ThreadingHTTPServer
+
+    with _LOCK:
+        if _SERVER is None:
+            try:
+                _SERVER = ThreadingHTTPServer((host, port), _handler_class())
+            except OSError as exc:
+                # Port baska process'te (shard worker, replay, canli bot) aciksa bot metrics'siz calismaya devam eder.
+                get_logger("tradebot.metrics").warning("metrics.bind_failed", extra={"extra_data": {"host": host, "port": port, "error": str(exc)}})
+                return None
+            threading.Thread(target=_SERVER.serve_forever, name="metrics-http", daemon=True).start()
+            get_logger("tradebot.metrics").info("metrics.serving", extra={"extra_data": {"host": host, "port": _SERVER.server_address[1]}})
+        return _SERVER
+
+
+def shutdown() -> None:
+    global _SERVER
+    with _LOCK:
+        server, _SERVER = _SERVER, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
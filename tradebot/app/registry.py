@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+import threading
+import time
+from typing import Any
+
+from tradebot.app.bot_service import BotService
+from tradebot.config.settings import BotConfig
+from tradebot.loggingx.logger import get_logger
+
+BotKey = tuple[Any, ...]
+
+
+def bot_key(cfg: BotConfig) -> BotKey:
+    # Ayni hesap/sembol/decider kombinasyonu icin process genelinde tek bot.
+    return (cfg.bot_mode, cfg.market_type, cfg.binance_testnet, cfg.default_symbol, cfg.decider_provider, cfg.decider_model, cfg.state_file)
+
+
+@dataclass(slots=True)
+class Published:
+    version: int
+    ts: float
+    snapshot: dict
+
+
+class SnapshotBus:
+    def __init__(self) -> None:
+        self._latest: dict[BotKey, Published] = {}
+        self._cond = threading.Condition()
+
+    def publish(self, key: BotKey, snapshot: dict) -> int:
+        with self._cond:
+            prev = self._latest.get(key)
+            version = prev.version + 1 if prev else 1
+            self._latest[key] = Published(version, time.time(), snapshot)
+            self._cond.notify_all()
+            return version
+
+    def latest(self, key: BotKey) -> Published | None:
+        return self._latest.get(key)
+
+    def wait_for(self, key: BotKey, after_version: int, timeout: float | None = None) -> Published | None:
+        with self._cond:
+            self._cond.wait_for(lambda: (p := self._latest.get(key)) is not None and p.version > after_version, timeout=timeout)
+            return self._latest.get(key)
+
+    def drop(self, key: BotKey) -> None:
+        with self._cond:
+            self._latest.pop(key, None)
+
+
+class BotRunner:
+    def __init__(self, key: BotKey, bot: BotService, bus: SnapshotBus, idle_after_seconds: float = 30.0) -> None:
+        self.key = key
+        self.bot = bot
+        self.bus = bus
+        self.logger = get_logger("tradebot.registry")
+        self.running = False
+        self.last_decision_ts = 0.0
+        self.last_refresh_ts = 0.0
+        self.last_read_ts = time.time()
+        self.idle_after_seconds = idle_after_seconds
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.recovery_check: dict | None = None
+
+    @property
+    def cfg(self) -> BotConfig:
+        return self.bot.cfg
+
+    def _publish(self, snapshot: dict) -> dict:
+        self.bus.publish(self.key, snapshot)
+        return snapshot
+
+    def run_once(self) -> dict:
+        with self._lock:
+            self.last_decision_ts = time.time()
+            return self._publish(self.bot.run_once())
+
+    def refresh(self) -> dict:
+        with self._lock:
+            self.last_refresh_ts = time.time()
+            return self._publish(self.bot.refresh_only())
+
+    def close_all(self) -> dict:
+        with self._lock:
+            return self._publish(self.bot.close_all_positions())
+
+    def apply_config(self, cfg: BotConfig) -> dict:
+        with self._lock:
+            return self.bot.apply_config(cfg)
+
+    def set_emergency_stop(self, enabled: bool) -> None:
+        with self._lock:
+            self.bot.set_emergency_stop(enabled)
+
+    def read(self) -> Published | None:
+        # Viewer'lar sadece son yayinlanan snapshot'i okur; ilk okumada bir kez refresh yapilir.
+        self.last_read_ts = time.time()
+        self.ensure_thread()
+        published = self.bus.latest(self.key)
+        if published is None:
+            self.refresh()
+            published = self.bus.latest(self.key)
+        return published
+
+    def start(self) -> None:
+        self.running = True
+        self.last_decision_ts = 0.0
+        self.ensure_thread()
+
+    def stop(self) -> None:
+        self.running = False
+
+    def ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"bot-runner-{self.cfg.default_symbol}", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self.running = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.bot.stop_user_stream()
+
+    def _loop(self) -> None:
+        try:
+            self.recovery_check = self.bot.verify_recovery()
+        except Exception:
+            self.logger.exception("registry.recovery_check_failed")
+        while not self._stop.wait(0.2):
+            now = time.time()
+            try:
+                if self.running and now - self.last_decision_ts >= self.cfg.decision_interval_seconds:
+                    self.run_once()
+                elif now - self.last_refresh_ts >= self.cfg.ui_refresh_interval_seconds and (
+                    self.running or now - self.last_read_ts < self.idle_after_seconds
+                ):
+                    # Izleyen yoksa ve bot durmussa Binance'e refresh istegi atilmaz.
+                    self.refresh()
+            except Exception:
+                self.logger.exception("registry.loop_failed")
+
+
+class BotRegistry:
+    def __init__(self) -> None:
+        self.bus = SnapshotBus()
+        self._runners: dict[BotKey, BotRunner] = {}
+        # Yerinde yeniden yapilandirilan botun eski anahtari yeni anahtarina yonlenir; eski config'i izleyen session'lar ayni botu izlemeye devam eder.
+        self._aliases: dict[BotKey, BotKey] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, key: BotKey) -> BotKey:
+        seen = set()
+        while key in self._aliases and key not in self._runners and key not in seen:
+            seen.add(key)
+            key = self._aliases[key]
+        return key
+
+    def get(self, cfg: BotConfig) -> BotRunner:
+        with self._lock:
+            key = self._resolve(bot_key(cfg))
+            runner = self._runners.get(key)
+            if runner is None:
+                runner = BotRunner(key, BotService(replace(cfg)), self.bus)
+                self._runners[key] = runner
+            return runner
+
+    def reconfigure(self, runner: BotRunner, cfg: BotConfig) -> tuple[BotRunner, dict]:
+        with self._lock:
+            old_key = runner.key
+            target = self._runners.get(self._resolve(bot_key(cfg)))
+            if target is not None and target is not runner:
+                # Bu config icin zaten calisan bir bot var; session ona gecer.
+                return target, target.apply_config(cfg)
+            report = runner.apply_config(cfg)
+            new_key = bot_key(runner.cfg)
+            if new_key != old_key:
+                self._runners.pop(old_key, None)
+                self._runners[new_key] = runner
+                self._aliases[old_key] = new_key
+                self._aliases.pop(new_key, None)
+                runner.key = new_key
+                self.bus.drop(old_key)
+            return runner, report
+
+    def runners(self) -> list[BotRunner]:
+        with self._lock:
+            return list(self._runners.values())
+
+    def remove(self, cfg: BotConfig) -> None:
+        with self._lock:
+            key = self._resolve(bot_key(cfg))
+            runner = self._runners.pop(key, None)
+            for alias in [alias for alias, target in self._aliases.items() if target == key]:
+                del self._aliases[alias]
+        if runner is not None:
+            runner.shutdown()
+            self.bus.drop(key)
+
+    def shutdown(self) -> None:
+        for runner in self.runners():
+            runner.shutdown()
+
+
+_REGISTRY: BotRegistry | None = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry() -> BotRegistry:
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = BotRegistry()
+        return _REGISTRY
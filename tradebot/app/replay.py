@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import io
+import json
+from pathlib import Path
+import pstats
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from tradebot.config.settings import BotConfig
+from tradebot.deciders.base import BaseDecider, DEFAULT_DECISION
+from tradebot.history.recorder import KLINE_COLUMNS, iter_ticks
+from tradebot.risk.portfolio import ExposureBook
+
+# Borsanin dondugu emir durumlari; kayittaki bu sonuclar replay'de borsa cevabi olarak kullanilir.
+REPLAYED_ORDER_STATUSES = {"new", "partially_filled", "filled", "canceled", "rejected", "expired", "unknown"}
+
+
+class RecordedDecider(BaseDecider):
+    # Kayittaki ham decider cevabini geri verir; LLM cagrisi olmadan deterministik replay.
+    def __init__(self) -> None:
+        self.current: dict | None = None
+
+    def decide(self, context) -> dict:
+        return dict(self.current) if self.current is not None else dict(DEFAULT_DECISION)
+
+
+def _frame(rows: list[list]):
+    import pandas as pd
+
+    frame = pd.DataFrame(rows, columns=KLINE_COLUMNS)
+    frame["open_time"] = frame["open_time"].astype("int64")
+    return frame
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class TickReplayer:
+    def __init__(self, path: str | Path, decider: str = "recorded", cfg: BotConfig | None = None) -> None:
+        self.path = Path(path)
+        self.decider_mode = decider
+        self.cfg = cfg
+        self._tmp: tempfile.TemporaryDirectory | None = None
+
+    def _build_bot(self, header: dict):
+        from tradebot.app.bot_service import BotService
+
+        self._tmp = self._tmp or tempfile.TemporaryDirectory()
+        recorded = {k: v for k, v in header.get("cfg", {}).items() if k in BotConfig.__dataclass_fields__}
+        base = self.cfg or BotConfig(**recorded)
+        # Replay bot'u journal/kayit/disk log yazmaz, metrics portu acmaz, shadow decider ve user data stream calistirmaz.
+        cfg = BotConfig(
+            **{
+                **{name: getattr(base, name) for name in BotConfig.__dataclass_fields__},
+                "state_file": str(Path(self._tmp.name) / "replay_state.json"),
+                "journal_enabled": False,
+                "record_ticks_dir": "",
+                "log_dir": "",
+                "metrics_port": 0,
+                "shadow_deciders": [],
+                "user_stream_enabled": False,
+            }
+        )
+        bot = BotService(cfg)
+        for name, value in (header.get("wallet") or {}).items():
+            setattr(bot.wallet, name, float(value))
+        for symbol, row in (header.get("positions") or {}).items():
+            bot.execution.positions[symbol] = [float(v) for v in row]
+        bot.portfolio.session_realized_pnl = float(header.get("session_realized_pnl", 0.0))
+        bot.risk.last_trade_ts.update(header.get("last_trade_ts") or {})
+        # Replay kendi portfoy defterini kayit saatine gore kurar; process defterine karismaz.
+        book = bot.risk.book = ExposureBook(clock=lambda: bot.risk.clock())
+        book.set_position(bot.account, cfg.default_symbol, *bot.execution.position(cfg.default_symbol))
+        book.day = int(header.get("day", book.day))
+        book.realized_today = float(header.get("day_realized_pnl", 0.0))
+        if header.get("rules"):
+            bot.execution.store_symbol_rules(cfg.default_symbol, header["rules"])
+        if self.decider_mode == "recorded":
+            bot.decider = RecordedDecider()
+        if cfg.bot_mode != "paper":
+            # Kayitta API key yok; borsa cagrilari _stub_exchange ile kayittan cevaplanir, istek gitmez.
+            bot.execution._active_api_credentials = lambda: ("replay", "replay")
+        return bot
+
+    def _stub_io(self, bot, tick: dict) -> None:
+        frames = {"fast": tick["klines"].get("fast"), "slow": tick["klines"].get("slow")}
+
+        def fetch(base_url, market_type, symbol, interval, limit=200):
+            rows = frames["fast" if interval == bot.cfg.timeframe_fast else "slow"]
+            if rows is None:
+                raise RuntimeError(tick.get("error") or "no recorded klines")
+            return _frame(rows)
+
+        def rules(symbol):
+            if tick.get("rules") is None:
+                raise RuntimeError("rules not recorded")
+            return tick["rules"]
+
+        def depth(symbol, limit=100):
+            if tick.get("depth") is None:
+                raise RuntimeError("depth not recorded")
+            return tick["depth"]
+
+        snap_bal = tick.get("snapshot_balances")
+        balances = iter([tick.get("balances")])
+        bot.fetch_ohlcv = fetch
+        bot.exchange.get_symbol_rules = rules
+        bot.exchange.get_order_book = depth
+        bot.exchange.get_latest_price = lambda symbol: tick["price"]
+        bot._fetch_external_balances = lambda: next(
+            balances, {"wallet_balance": snap_bal[0], "available_balance": snap_bal[1]} if snap_bal else None
+        )
+        bot.risk.clock = lambda: float(tick["ts"])
+        if isinstance(bot.decider, RecordedDecider):
+            bot.decider.current = tick.get("decision_raw")
+        if bot.cfg.bot_mode != "paper":
+            self._stub_exchange(bot, tick)
+
+    def _stub_exchange(self, bot, tick: dict) -> None:
+        # Demo/live kaydi: emir yolu (boyutlandirma, bakiye/pozisyon kontrolleri, order tablosu) aynen calisir,
+        # borsanin cevabi kayittaki order_result'tan gelir.
+        recorded = dict(tick.get("order_result") or {})
+        status = recorded.get("status")
+        execution = bot.execution
+        client = execution.exchange_client
+        snap_bal = tick.get("snapshot_balances")
+
+        def place(api_key, api_secret, symbol, side, quantity, client_order_id=None):
+            if status == "pending":
+                return {"status": "new", "side": side, "qty": 0.0}
+            if status not in REPLAYED_ORDER_STATUSES:
+                # Kayitta bu tick'te emir borsaya gitmemis; replay'in gonderdigi emir sapma olarak gorunur.
+                return {"status": "rejected", "side": side, "qty": 0.0}
+            return recorded
+
+        def assets(api_key, api_secret):
+            # Hesap bakiyesi kaydedilmez; hesapta botun kendi pozisyonu kadar serbest base oldugu varsayilir.
+            symbol = bot.cfg.default_symbol
+            base = execution._base_asset(symbol, execution.symbol_rules(symbol))
+            return {base: {"free": execution.position(symbol)[0], "locked": 0.0}}, 0
+
+        def order(api_key, api_secret, symbol, client_order_id):
+            raise RuntimeError("order status not recorded")
+
+        wait = type(execution.orders).wait
+        client.place_market_order = place
+        client.get_account_assets = assets
+        client.get_order = order
+        client.get_account_balances = lambda api_key, api_secret: tick.get("balances") or {
+            "wallet_balance": snap_bal[0] if snap_bal else 0.0,
+            "available_balance": snap_bal[1] if snap_bal else 0.0,
+        }
+        # Kayitta ack tick beklemesine yetismemisse replay de beklemez.
+        execution.orders.wait = lambda future, timeout: None if status == "pending" else wait(execution.orders, future, timeout)
+
+    def run(self, profile: str | None = None, top: int = 20, limit: int | None = None) -> dict:
+        profiler = cProfile.Profile() if profile == "cpu" else None
+        if profile == "memory":
+            tracemalloc.start()
+        bot = None
+        header_id = None
+        tick_ms: list[float] = []
+        stage_ms: dict[str, list[float]] = {}
+        divergences = []
+        started = time.perf_counter()
+        try:
+            for tick in iter_ticks(self.path):
+                if limit is not None and len(tick_ms) >= limit:
+                    break
+                if bot is None or id(tick["header"]) != header_id:
+                    # Yeni segment: bot segment basindaki wallet/risk durumundan kurulur.
+                    bot = self._build_bot(tick["header"])
+                    header_id = id(tick["header"])
+                self._stub_io(bot, tick)
+                if profiler is not None:
+                    profiler.enable()
+                t0 = time.perf_counter()
+                snapshot = bot.run_once()
+                tick_ms.append((time.perf_counter() - t0) * 1000)
+                if profiler is not None:
+                    profiler.disable()
+                for stage, value in snapshot["stage_timings_ms"].items():
+                    stage_ms.setdefault(stage, []).append(value)
+                recorded = tick.get("decision") or {}
+                replayed = {"action": snapshot["last_decision"].get("action"), "status": snapshot["order_result"].get("status")}
+                expected = {"action": recorded.get("action", replayed["action"]), "status": (tick.get("order_result") or {}).get("status")}
+                if replayed != expected:
+                    divergences.append({"ts": tick["ts"], "recorded": expected, "replayed": replayed})
+            report = {
+                "path": str(self.path),
+                "decider": self.decider_mode,
+                "ticks": len(tick_ms),
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+                "tick_ms": {
+                    "p50": round(_percentile(tick_ms, 0.5), 3),
+                    "p95": round(_percentile(tick_ms, 0.95), 3),
+                    "max": round(max(tick_ms, default=0.0), 3),
+                },
+                "stage_ms": {stage: round(statistics.fmean(values), 3) for stage, values in stage_ms.items()},
+                "divergences": divergences,
+            }
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+                report["profile"] = out.getvalue()
+            if profile == "memory":
+                snapshot = tracemalloc.take_snapshot()
+                report["profile"] = [
+                    {"where": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:top]
+                ]
+            return report
+        finally:
+            if profile == "memory":
+                tracemalloc.stop()
+            if self._tmp is not None:
+                self._tmp.cleanup()
+                self._tmp = None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded ticks through BotService with stubbed I/O")
+    parser.add_argument("path", help="RECORD_TICKS_DIR dizini ya da tek bir ticks-*.jsonl.gz segmenti")
+    parser.add_argument("--decider", choices=["recorded", "live"], default="recorded")
+    parser.add_argument("--profile", choices=["cpu", "memory"])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = TickReplayer(args.path, decider=args.decider).run(args.profile, args.top, args.limit)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{report['ticks']} ticks in {report['total_ms']:.1f} ms  tick p50 {report['tick_ms']['p50']:.2f} / p95 {report['tick_ms']['p95']:.2f} / max {report['tick_ms']['max']:.2f} ms")
+    print("stages: " + ", ".join(f"{stage} {value:.2f} ms" for stage, value in report["stage_ms"].items()))
+    print(f"divergences: {len(report['divergences'])}")
+    for row in report["divergences"][:10]:
+        print(f"  {row['ts']:.3f} recorded={row['recorded']} replayed={row['replayed']}")
+    if isinstance(report.get("profile"), str):
+        print(report["profile"])
+    elif report.get("profile"):
+        for row in report["profile"]:
+            print(f"  {row['size_kb']:10.1f} KiB  {row['count']:7d}  {row['where']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
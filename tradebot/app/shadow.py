@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+import time
+
+from tradebot.config.settings import BotConfig
+from tradebot.deciders.base import BaseDecider, DEFAULT_DECISION, normalize_decision
+from tradebot.deciders.factory import create_decider
+from tradebot.execution.paper import PaperWallet
+from tradebot.loggingx.logger import get_logger
+from tradebot.models.context import BotContext
+from tradebot.risk.manager import RiskManager
+from tradebot.risk.portfolio import ExposureBook
+
+
+def parse_shadow_spec(spec: str) -> tuple[str, str]:
+    # "Ollama:llama3.1:8b" -> ("Ollama", "llama3.1:8b"); model isimleri ":" icerebilir.
+    provider, _, model = spec.strip().partition(":")
+    return provider.strip(), model.strip()
+
+
+@dataclass
+class ShadowSlot:
+    name: str
+    decider: BaseDecider
+    wallet: PaperWallet
+    risk: RiskManager
+    realized_pnl: float = 0.0
+    decisions: int = 0
+    trades: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    last_action: str = "hold"
+    last_latency_ms: float = 0.0
+    total_latency_ms: float = 0.0
+
+    def equity(self, price: float) -> float:
+        return self.wallet.wallet_balance + (price - self.wallet.entry_price) * self.wallet.base_qty
+
+    def row(self, price: float, starting_balance: float) -> dict:
+        equity = self.equity(price)
+        return {
+            "name": self.name,
+            "equity": equity,
+            "total_pnl": equity - starting_balance,
+            "realized_pnl": self.realized_pnl,
+            "position_qty": self.wallet.base_qty,
+            "decisions": self.decisions,
+            "trades": self.trades,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "last_action": self.last_action,
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "avg_latency_ms": round(self.total_latency_ms / self.decisions, 2) if self.decisions else 0.0,
+        }
+
+
+class ShadowRunner:
+    def __init__(self, cfg: BotConfig, specs: list[str] | None = None) -> None:
+        self.cfg = cfg
+        self.logger = get_logger("tradebot.shadow")
+        self.slots: list[ShadowSlot] = []
+        for spec in specs if specs is not None else cfg.shadow_deciders:
+            provider, model = parse_shadow_spec(spec)
+            if not provider:
+                continue
+            slot_cfg = replace(cfg, decider_provider=provider, decider_model=model or cfg.decider_model)
+            self.add_slot(spec.strip(), create_decider(slot_cfg))
+        self._pool: ThreadPoolExecutor | None = None
+        # Sonuclar tek thread'de, tick sirasiyla islenir; tick gercek emir icin shadow'lari beklemez.
+        self._collector: ThreadPoolExecutor | None = None
+        self._inflight: dict[str, Future] = {}
+
+    def add_slot(self, name: str, decider: BaseDecider) -> ShadowSlot:
+        taken = {s.name for s in self.slots}
+        unique, n = name, 2
+        while unique in taken:
+            unique, n = f"{name}#{n}", n + 1
+        start = self.cfg.paper_starting_balance
+        slot = ShadowSlot(unique, decider, PaperWallet(wallet_balance=start, available_balance=start), RiskManager(self.cfg, book=ExposureBook()))
+        self.slots.append(slot)
+        return slot
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.slots)
+
+    def submit(self, context: BotContext) -> list[tuple[ShadowSlot, Future]]:
+        if not self.slots:
+            return []
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.slots), thread_name_prefix="shadow")
+        jobs = []
+        for slot in self.slots:
+            previous = self._inflight.get(slot.name)
+            if previous is not None and not previous.done():
+                # Onceki karari hala suren (takilmis) decider'a yeni is verilmez; worker'i tek basina tutar.
+                slot.skipped += 1
+                continue
+            future = self._pool.submit(self._timed_decide, slot.decider, context)
+            self._inflight[slot.name] = future
+            jobs.append((slot, future))
+        return jobs
+
+    @staticmethod
+    def _timed_decide(decider: BaseDecider, context: BotContext) -> tuple[dict, float]:
+        started = time.perf_counter()
+        decision = normalize_decision(decider.decide(context))
+        return decision, (time.perf_counter() - started) * 1000
+
+    def collect(self, jobs: list[tuple[ShadowSlot, Future]], context: BotContext) -> None:
+        if not jobs:
+            return
+        wait([f for _, f in jobs], timeout=self.cfg.shadow_timeout_seconds)
+        for slot, future in jobs:
+            if not future.done():
+                future.cancel()
+                slot.timeouts += 1
+                decision = {**DEFAULT_DECISION, "fallback_reason": "shadow timeout"}
+                latency_ms = self.cfg.shadow_timeout_seconds * 1000
+            else:
+                try:
+                    decision, latency_ms = future.result()
+                except Exception as exc:
+                    decision, latency_ms = {**DEFAULT_DECISION, "fallback_reason": f"shadow error: {exc}"}, 0.0
+            slot.decisions += 1
+            slot.last_action = decision["action"]
+            slot.last_latency_ms = latency_ms
+            slot.total_latency_ms += latency_ms
+            self._apply(slot, decision, context)
+
+    def collect_async(self, jobs: list[tuple[ShadowSlot, Future]], context: BotContext) -> Future | None:
+        if not jobs:
+            return None
+        if self._collector is None:
+            self._collector = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-collect")
+        return self._collector.submit(self._collect_logged, jobs, context)
+
+    def _collect_logged(self, jobs: list[tuple[ShadowSlot, Future]], context: BotContext) -> None:
+        try:
+            self.collect(jobs, context)
+        except Exception:
+            self.logger.exception("shadow.collect_failed")
+
+    def _apply(self, slot: ShadowSlot, decision: dict, context: BotContext) -> None:
+        action = decision["action"]
+        if action == "hold":
+            return
+        price = context.latest_price
+        size_pct = decision.get("position_size_pct", 0.0) / 100.0
+        # Shadow slotlarinin sanal pozisyonlari kendi defterinde tutulur, process portfoyune karismaz.
+        slot.risk.book.mark(context.symbol, price)
+        ok, _ = slot.risk.validate(
+            context.symbol,
+            decision,
+            slot.wallet.available_balance,
+            open_positions=1 if slot.wallet.base_qty > 0 else 0,
+            session_realized_pnl=slot.realized_pnl,
+            notional=slot.wallet.available_balance * size_pct,
+        )
+        if not ok:
+            return
+        if action == "buy":
+            filled = slot.wallet.buy(price, slot.wallet.available_balance * size_pct)
+            realized = None
+        else:
+            qty = slot.wallet.base_qty if action == "close" else slot.wallet.base_qty * size_pct
+            filled, realized = slot.wallet.sell(price, qty)
+            slot.realized_pnl += realized
+        if filled > 0:
+            slot.risk.book.fill(slot.name, context.symbol, "BUY" if action == "buy" else "SELL", filled, price, realized)
+            slot.trades += 1
+            slot.risk.register_trade(context.symbol)
+            self.logger.info("shadow.fill", extra={"extra_data": {"shadow": slot.name, "action": action, "qty": filled, "price": price}})
+
+    def leaderboard(self, price: float) -> list[dict]:
+        rows = [slot.row(price, self.cfg.paper_starting_balance) for slot in self.slots]
+        return sorted(rows, key=lambda r: r["total_pnl"], reverse=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._collector is not None:
+            self._collector.shutdown(wait=False, cancel_futures=True)
+            self._collector = None
+        self._inflight.clear()
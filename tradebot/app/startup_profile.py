@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+# Soguk process'te import + BotService kurulumu + ilk karar (stub I/O ile) icin hedef sure.
+TIME_TO_FIRST_DECISION_BUDGET_MS = 2500.0
+HEAVY_MODULES = ("pandas", "numpy", "requests", "openai", "google.generativeai", "binance", "streamlit")
+
+
+def import_profile(module: str = "tradebot.app.bot_service", top: int = 15) -> dict:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == module), 0.0)
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return {"module": module, "total_ms": total, "top": rows[:top]}
+
+
+def _synthetic_candles(rows: int = 200):
+    import pandas as pd
+
+    closes = [1 + i * 0.001 + (0.004 if i % 2 else 0.0) for i in range(rows)]
+    return pd.DataFrame({"open_time": range(rows), "open": closes, "high": closes, "low": closes, "close": closes, "volume": [1.0] * rows})
+
+
+def time_to_first_decision() -> dict:
+    started = time.perf_counter()
+    from tradebot.app.bot_service import BotService
+    from tradebot.config.settings import BotConfig
+
+    imported = time.perf_counter()
+    eager = [m for m in HEAVY_MODULES if m in sys.modules]
+    with tempfile.TemporaryDirectory() as tmp:
+        bot = BotService(BotConfig(state_file=str(Path(tmp) / "state.json")))
+        constructed = time.perf_counter()
+        bot.fetch_ohlcv = lambda *args, **kwargs: _synthetic_candles()
+        bot.exchange.get_symbol_rules = lambda symbol: {"step_size": 0.001, "min_qty": 0.001, "min_notional": 1.0, "tick_size": 0.0001}
+        bot.exchange.get_latest_price = lambda symbol: bot.last_price
+        snapshot = bot.run_once()
+        finished = time.perf_counter()
+    return {
+        "import_ms": round((imported - started) * 1000, 2),
+        "construct_ms": round((constructed - imported) * 1000, 2),
+        "first_tick_ms": round((finished - constructed) * 1000, 2),
+        "total_ms": round((finished - started) * 1000, 2),
+        "stage_timings_ms": snapshot["stage_timings_ms"],
+        "decision": snapshot["last_decision"]["action"],
+        "error": snapshot["error"],
+        "eager_heavy_modules": eager,
+    }
+
+
+def cold_time_to_first_decision() -> dict:
+    # Olcum ayri bir interpreter'da yapilir; mevcut process'te import cache'i sonucu bozar.
+    proc = subprocess.run([sys.executable, "-m", "tradebot.app.startup_profile", "--ttfd-only"], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time and time-to-first-decision profile")
+    parser.add_argument("--module", default="tradebot.app.bot_service")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=TIME_TO_FIRST_DECISION_BUDGET_MS)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--ttfd-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.ttfd_only:
+        print(json.dumps(time_to_first_decision()))
+        return 0
+
+    report = {"imports": import_profile(args.module, args.top), "first_decision": cold_time_to_first_decision(), "budget_ms": args.budget_ms}
+    over_budget = report["first_decision"]["total_ms"] > args.budget_ms
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        imports = report["imports"]
+        print(f"import {imports['module']}: {imports['total_ms']:.1f} ms")
+        for row in imports["top"]:
+            print(f"  {row['cumulative_ms']:9.1f} ms cum  {row['self_ms']:8.1f} ms self  {row['module']}")
+        ttfd = report["first_decision"]
+        print(
+            f"time-to-first-decision: {ttfd['total_ms']:.1f} ms (import {ttfd['import_ms']:.1f}, construct {ttfd['construct_ms']:.1f}, "
+            f"first tick {ttfd['first_tick_ms']:.1f}) budget {args.budget_ms:.0f} ms -> {'OVER' if over_budget else 'ok'}"
+        )
+        if ttfd["eager_heavy_modules"]:
+            print(f"eager heavy imports: {', '.join(ttfd['eager_heavy_modules'])}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
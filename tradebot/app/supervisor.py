@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+import multiprocessing as mp
+from pathlib import Path
+import time
+from typing import Callable
+
+import numpy as np
+
+from tradebot.config.settings import BotConfig, load_config
+from tradebot.data.shared_buffer import ACCOUNT_COLUMNS, SharedMarketBuffer
+from tradebot.loggingx.logger import get_logger
+from tradebot.portfolio.ledger import PaperLedger
+
+
+def shard_symbols(symbols: list[str], workers: int) -> list[list[str]]:
+    shards: list[list[str]] = [[] for _ in range(max(1, min(workers, len(symbols))))]
+    for i, symbol in enumerate(symbols):
+        shards[i % len(shards)].append(symbol)
+    return shards
+
+
+def symbol_state_file(state_file: str, symbol: str) -> str:
+    path = Path(state_file)
+    return str(path.with_name(f"{path.stem}.{symbol.lower()}{path.suffix}"))
+
+
+def _tick_runner(bots: list) -> asyncio.Runner:
+    # Worker basina tek event loop ve thread havuzu; Runner.close() havuzu da kapatir.
+    # Her bot data asamasinda 5 istegi thread'de calistirir; karar bekleyen thread'ler digerlerini bloklamasin.
+    runner = asyncio.Runner()
+    runner.get_loop().set_default_executor(ThreadPoolExecutor(max_workers=6 * len(bots) + 4, thread_name_prefix="shard-tick"))
+    return runner
+
+
+async def _tick_all(bots: list) -> None:
+    await asyncio.gather(*(bot.run_once_async() for bot in bots))
+
+
+def run_shard_worker(worker_id: int, cfg: BotConfig, symbols: list[str], shm_name: str, all_symbols: list[str], workers: int, stop_event) -> None:
+    from tradebot.app.bot_service import BotService
+
+    logger = get_logger("tradebot.shard")
+    buffer = SharedMarketBuffer.attach(shm_name, all_symbols, cfg.lookback, workers)
+    runner = None
+    try:
+        bots = {}
+        for symbol in symbols:
+            buffer.release_row(symbol)
+            # Shard'daki semboller tek portfoy: hepsi ana state dosyasinin adindaki defteri paylasir.
+            bots[symbol] = BotService(
+                replace(cfg, default_symbol=symbol, state_file=symbol_state_file(cfg.state_file, symbol), risk_book=cfg.risk_book or Path(cfg.state_file).stem)
+            )
+        batcher = None
+        if cfg.decider_batch_size > 1 and len(bots) > 1:
+            from tradebot.deciders.batching import BatchingDecider
+            from tradebot.deciders.factory import create_decider
+
+            # Shard'daki botlar ayni anda tick atar; kararlari tek decide_many istegine toplanir.
+            batcher = BatchingDecider(create_decider(cfg), min(cfg.decider_batch_size, len(bots)), cfg.decider_batch_wait_ms)
+            for bot in bots.values():
+                bot.decider = batcher
+            runner = _tick_runner(list(bots.values()))
+        logger.info("shard.started", extra={"extra_data": {"worker": worker_id, "symbols": symbols, "batched": batcher is not None}})
+        while not stop_event.is_set():
+            started = time.time()
+            if runner is not None:
+                runner.run(_tick_all(list(bots.values())))
+            for symbol, bot in bots.items():
+                if stop_event.is_set():
+                    break
+                if batcher is None:
+                    bot.run_once()
+                base_qty, entry_price = bot.execution.position(symbol)
+                buffer.publish(
+                    symbol,
+                    candles=bot.last_candles,
+                    price=bot.last_price,
+                    account={
+                        "wallet_balance": bot.wallet.wallet_balance,
+                        "available_balance": bot.wallet.available_balance,
+                        "base_qty": base_qty,
+                        "entry_price": entry_price,
+                        "realized_pnl": bot.portfolio.session_realized_pnl,
+                    },
+                )
+                buffer.beat(worker_id)
+            buffer.beat(worker_id)
+            stop_event.wait(max(0.0, cfg.decision_interval_seconds - (time.time() - started)))
+    finally:
+        if runner is not None:
+            runner.close()
+        buffer.close()
+
+
+class ShardSupervisor:
+    def __init__(
+        self,
+        cfg: BotConfig,
+        symbols: list[str] | None = None,
+        workers: int | None = None,
+        target: Callable[..., None] = run_shard_worker,
+        mp_context: str = "spawn",
+        heartbeat_timeout: float | None = None,
+        restart_backoff: float = 1.0,
+    ) -> None:
+        self.cfg = cfg
+        self.logger = get_logger("tradebot.supervisor")
+        self.symbols = [s.upper() for s in (symbols or cfg.symbols or [cfg.default_symbol])]
+        self.shards = shard_symbols(self.symbols, workers or cfg.shard_workers)
+        self.target = target
+        self.heartbeat_timeout = heartbeat_timeout or max(60.0, cfg.decision_interval_seconds * 6.0)
+        self.restart_backoff = restart_backoff
+        self.buffer: SharedMarketBuffer | None = None
+        self.procs: list = [None] * len(self.shards)
+        self.restarts = [0] * len(self.shards)
+        self._next_restart_at = [0.0] * len(self.shards)
+        self._ctx = mp.get_context(mp_context)
+        self._stop = self._ctx.Event()
+
+    def start(self) -> None:
+        self.buffer = SharedMarketBuffer.create(self.symbols, self.cfg.lookback, len(self.shards))
+        for i in range(len(self.shards)):
+            self._spawn(i)
+
+    def _spawn(self, i: int) -> None:
+        assert self.buffer is not None
+        proc = self._ctx.Process(
+            target=self.target,
+            args=(i, self.cfg, self.shards[i], self.buffer.name, self.symbols, len(self.shards), self._stop),
+            name=f"tradebot-shard-{i}",
+            daemon=True,
+        )
+        proc.start()
+        self.buffer.beat(i)
+        self.procs[i] = proc
+
+    def monitor(self) -> list[int]:
+        assert self.buffer is not None
+        restarted = []
+        now = time.time()
+        for i, proc in enumerate(self.procs):
+            if self._stop.is_set():
+                break
+            stale = now - float(self.buffer.heartbeats[i]) > self.heartbeat_timeout
+            if proc is not None and proc.is_alive() and not stale:
+                continue
+            if now < self._next_restart_at[i]:
+                continue
+            if proc is not None:
+                if proc.is_alive():
+                    proc.terminate()
+                proc.join(timeout=5)
+            self.restarts[i] += 1
+            self._next_restart_at[i] = now + min(30.0, self.restart_backoff * 2 ** min(self.restarts[i] - 1, 5))
+            self.logger.warning(
+                "supervisor.restart",
+                extra={"extra_data": {"worker": i, "symbols": self.shards[i], "exitcode": getattr(proc, "exitcode", None), "stale": stale, "restarts": self.restarts[i]}},
+            )
+            self._spawn(i)
+            restarted.append(i)
+        return restarted
+
+    def combined_view(self) -> dict:
+        assert self.buffer is not None
+        accounts = np.array([[self.buffer.read_account(symbol)[col] for col in ACCOUNT_COLUMNS] for symbol in self.symbols])
+        prices = np.array([self.buffer.read_price(symbol) for symbol in self.symbols])
+        balances = accounts[:, [ACCOUNT_COLUMNS.index("wallet_balance"), ACCOUNT_COLUMNS.index("available_balance")]]
+        # Paper: her shard kendi cuzdanini tutar, toplanir. Demo/live: tum botlar ayni hesabi gorur, toplamak cift sayar.
+        wallet_balance, available_balance = balances.sum(axis=0) if self.cfg.bot_mode == "paper" else balances.max(axis=0, initial=0.0)
+        ledger = PaperLedger.from_columns(
+            self.symbols,
+            qty=accounts[:, ACCOUNT_COLUMNS.index("base_qty")],
+            avg_entry=accounts[:, ACCOUNT_COLUMNS.index("entry_price")],
+            realized_pnl=accounts[:, ACCOUNT_COLUMNS.index("realized_pnl")],
+            wallet_balance=float(wallet_balance),
+            available_balance=float(available_balance),
+        )
+        ledger.revalue(prices)
+        now = time.time()
+        return {
+            "symbols": self.symbols,
+            "account_cards": ledger.account_cards(),
+            "positions": ledger.position_table(),
+            "workers": [
+                {
+                    "worker": i,
+                    "symbols": shard,
+                    "pid": getattr(self.procs[i], "pid", None),
+                    "alive": bool(self.procs[i] is not None and self.procs[i].is_alive()),
+                    "restarts": self.restarts[i],
+                    "heartbeat_age_s": round(now - float(self.buffer.heartbeats[i]), 2),
+                }
+                for i, shard in enumerate(self.shards)
+            ],
+        }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for proc in self.procs:
+            if proc is None:
+                continue
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout=timeout)
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def run_forever(self, poll_seconds: float = 2.0) -> None:
+        self.start()
+        try:
+            while True:
+                self.monitor()
+                self.logger.info("supervisor.view", extra={"extra_data": self.combined_view()})
+                time.sleep(poll_seconds)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def main() -> None:
+    ShardSupervisor(load_config()).run_forever()
+
+
+if __name__ == "__main__":
+    main()
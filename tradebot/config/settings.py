@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import os
 from typing import Literal
@@ -28,6 +28,8 @@ class BotConfig:
     openai_api_key: str | None = None
     gemini_api_key: str | None = None
     ollama_base_url: str = "http://localhost:11434"
+    prompt_token_budget: int = 800
+    prompt_candles: int = 20
 
     binance_api_key: str | None = None
     binance_api_secret: str | None = None
@@ -39,20 +41,91 @@ class BotConfig:
     max_daily_loss_usdt: float = 5.0
     cooldown_seconds: int = 30
     allow_pyramiding: bool = False
+    # Portfoy limitleri (process'teki tum botlar toplami, USDT); 0 = kapali.
+    max_gross_exposure_usdt: float = 0.0
+    max_net_exposure_usdt: float = 0.0
+    max_symbol_notional_usdt: float = 0.0
+    max_group_notional_usdt: float = 0.0
+    risk_groups: list[str] = field(default_factory=list)
+    risk_book: str = ""
     emergency_stop: bool = False
     paper_starting_balance: float = 1000.0
+    paper_fee_rate: float = 0.0
 
     timeframe_fast: str = "1m"
     timeframe_slow: str = "5m"
     lookback: int = 200
 
+    data_timeout_seconds: float = 20.0
+    decide_timeout_seconds: float = 60.0
+    snapshot_timeout_seconds: float = 10.0
+    symbol_rules_ttl_seconds: float = 300.0
+
+    journal_enabled: bool = True
+    journal_snapshot_every: int = 200
+    recovery_balance_tolerance: float = 0.01
+
+    paper_depth_fill: bool = False
+    depth_limit: int = 100
+    depth_max_age_seconds: float = 30.0
+
     state_file: str = "tradebot_state.json"
 
+    symbols: list[str] = field(default_factory=list)
+    shard_workers: int = 2
+    decider_batch_size: int = 1
+    decider_batch_wait_ms: float = 250.0
+
+    shadow_deciders: list[str] = field(default_factory=list)
+    shadow_timeout_seconds: float = 30.0
+
+    record_ticks_dir: str = ""
+    record_segment_ticks: int = 500
+    record_max_segments: int = 20
+
+    log_dir: str = ""
+    log_segment_records: int = 5000
+    log_max_segments: int = 50
+
+    metrics_port: int = 0
+
+    chart_points: int = 600
+    chart_level_capacity: int = 1024
+    chart_max_markers: int = 2000
+
+    # Bellek: periyodik RSS/tracemalloc ornegi (0 = kapali) ve buffer sinirlari.
+    memory_sample_seconds: float = 60.0
+    memory_tracemalloc_frames: int = 0
+    memory_top_allocators: int = 10
+    log_recent_max: int = 300
+    history_max_orders: int = 200
+
+    rate_limit_headroom: float = 0.8
+    http_retries: int = 3
+    http_backoff_base_seconds: float = 0.25
+    http_backoff_cap_seconds: float = 4.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+    hedge_requests: bool = False
+    hedge_after_ms: float = 300.0
+
+    user_stream_enabled: bool = True
+    user_stream_keepalive_seconds: float = 1800.0
+    user_stream_reconcile_seconds: float = 300.0
+
+    order_wait_seconds: float = 10.0
+    order_max_retries: int = 3
+    order_table_size: int = 500
+
 
 def _getenv_bool(name: str, default: bool) -> bool:
     return os.getenv(name, str(default).lower()).lower() == "true"
 
 
+def _getenv_list(name: str) -> list[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
 def load_config(env_path: str | Path = ".env") -> BotConfig:
     load_dotenv(dotenv_path=env_path, override=False)
     mode = os.getenv("BOT_MODE", "paper").lower()
@@ -81,6 +154,8 @@ def load_config(env_path: str | Path = ".env") -> BotConfig:
         openai_api_key=os.getenv("OPENAI_API_KEY"),
         gemini_api_key=os.getenv("GEMINI_API_KEY"),
         ollama_base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+        prompt_token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "800")),
+        prompt_candles=int(os.getenv("PROMPT_CANDLES", "20")),
         binance_api_key=os.getenv("BINANCE_API_KEY"),
         binance_api_secret=os.getenv("BINANCE_API_SECRET"),
         binance_test_api_key=os.getenv("BINANCE_TEST_API_KEY"),
@@ -90,7 +165,59 @@ def load_config(env_path: str | Path = ".env") -> BotConfig:
         max_daily_loss_usdt=float(os.getenv("MAX_DAILY_LOSS_USDT", "5")),
         cooldown_seconds=int(os.getenv("COOLDOWN_SECONDS", "30")),
         allow_pyramiding=_getenv_bool("ALLOW_PYRAMIDING", False),
+        max_gross_exposure_usdt=float(os.getenv("MAX_GROSS_EXPOSURE_USDT", "0")),
+        max_net_exposure_usdt=float(os.getenv("MAX_NET_EXPOSURE_USDT", "0")),
+        max_symbol_notional_usdt=float(os.getenv("MAX_SYMBOL_NOTIONAL_USDT", "0")),
+        max_group_notional_usdt=float(os.getenv("MAX_GROUP_NOTIONAL_USDT", "0")),
+        risk_groups=_getenv_list("RISK_GROUPS"),
+        risk_book=os.getenv("RISK_BOOK", ""),
         emergency_stop=_getenv_bool("EMERGENCY_STOP", False),
         paper_starting_balance=float(os.getenv("PAPER_STARTING_BALANCE", "1000")),
+        paper_fee_rate=float(os.getenv("PAPER_FEE_RATE", "0")),
         state_file=os.getenv("STATE_FILE", "tradebot_state.json"),
+        data_timeout_seconds=float(os.getenv("DATA_TIMEOUT_SECONDS", "20")),
+        decide_timeout_seconds=float(os.getenv("DECIDE_TIMEOUT_SECONDS", "60")),
+        snapshot_timeout_seconds=float(os.getenv("SNAPSHOT_TIMEOUT_SECONDS", "10")),
+        symbol_rules_ttl_seconds=float(os.getenv("SYMBOL_RULES_TTL_SECONDS", "300")),
+        journal_enabled=_getenv_bool("JOURNAL_ENABLED", True),
+        journal_snapshot_every=int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "200")),
+        recovery_balance_tolerance=float(os.getenv("RECOVERY_BALANCE_TOLERANCE", "0.01")),
+        paper_depth_fill=_getenv_bool("PAPER_DEPTH_FILL", False),
+        depth_limit=int(os.getenv("DEPTH_LIMIT", "100")),
+        depth_max_age_seconds=float(os.getenv("DEPTH_MAX_AGE_SECONDS", "30")),
+        symbols=[s.upper() for s in _getenv_list("SYMBOLS")],
+        shard_workers=int(os.getenv("SHARD_WORKERS", "2")),
+        decider_batch_size=int(os.getenv("DECIDER_BATCH_SIZE", "1")),
+        decider_batch_wait_ms=float(os.getenv("DECIDER_BATCH_WAIT_MS", "250")),
+        shadow_deciders=_getenv_list("SHADOW_DECIDERS"),
+        shadow_timeout_seconds=float(os.getenv("SHADOW_TIMEOUT_SECONDS", "30")),
+        record_ticks_dir=os.getenv("RECORD_TICKS_DIR", ""),
+        record_segment_ticks=int(os.getenv("RECORD_SEGMENT_TICKS", "500")),
+        record_max_segments=int(os.getenv("RECORD_MAX_SEGMENTS", "20")),
+        log_dir=os.getenv("LOG_DIR", ""),
+        log_segment_records=int(os.getenv("LOG_SEGMENT_RECORDS", "5000")),
+        log_max_segments=int(os.getenv("LOG_MAX_SEGMENTS", "50")),
+        metrics_port=int(os.getenv("METRICS_PORT", "0")),
+        chart_points=int(os.getenv("CHART_POINTS", "600")),
+        chart_level_capacity=int(os.getenv("CHART_LEVEL_CAPACITY", "1024")),
+        chart_max_markers=int(os.getenv("CHART_MAX_MARKERS", "2000")),
+        memory_sample_seconds=float(os.getenv("MEMORY_SAMPLE_SECONDS", "60")),
+        memory_tracemalloc_frames=int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", "0")),
+        memory_top_allocators=int(os.getenv("MEMORY_TOP_ALLOCATORS", "10")),
+        log_recent_max=int(os.getenv("LOG_RECENT_MAX", "300")),
+        history_max_orders=int(os.getenv("HISTORY_MAX_ORDERS", "200")),
+        rate_limit_headroom=float(os.getenv("RATE_LIMIT_HEADROOM", "0.8")),
+        http_retries=int(os.getenv("HTTP_RETRIES", "3")),
+        http_backoff_base_seconds=float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.25")),
+        http_backoff_cap_seconds=float(os.getenv("HTTP_BACKOFF_CAP_SECONDS", "4")),
+        circuit_failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+        circuit_reset_seconds=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+        hedge_requests=_getenv_bool("HEDGE_REQUESTS", False),
+        hedge_after_ms=float(os.getenv("HEDGE_AFTER_MS", "300")),
+        user_stream_enabled=_getenv_bool("USER_STREAM_ENABLED", True),
+        user_stream_keepalive_seconds=float(os.getenv("USER_STREAM_KEEPALIVE_SECONDS", "1800")),
+        user_stream_reconcile_seconds=float(os.getenv("USER_STREAM_RECONCILE_SECONDS", "300")),
+        order_wait_seconds=float(os.getenv("ORDER_WAIT_SECONDS", "10")),
+        order_max_retries=int(os.getenv("ORDER_MAX_RETRIES", "3")),
+        order_table_size=int(os.getenv("ORDER_TABLE_SIZE", "500")),
     )
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import random
+import time
+from typing import Iterable, Iterator
+
+
+class SequenceGapError(RuntimeError):
+    pass
+
+
+class _BookSide:
+    # price -> qty dict'i + siralı anahtar listesi; bid tarafında anahtar -price tutulur ki en iyi seviye hep index 0 olsun.
+    def __init__(self, is_bid: bool, max_levels: int) -> None:
+        self.is_bid = is_bid
+        self.max_levels = max_levels
+        self.levels: dict[float, float] = {}
+        self.keys: list[float] = []
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def clear(self) -> None:
+        self.levels.clear()
+        self.keys.clear()
+
+    def set(self, price: float, qty: float) -> None:
+        key = self._key(price)
+        if qty <= 0:
+            if self.levels.pop(price, None) is not None:
+                i = bisect_left(self.keys, key)
+                if i < len(self.keys) and self.keys[i] == key:
+                    del self.keys[i]
+            return
+        if price not in self.levels:
+            i = bisect_left(self.keys, key)
+            if i >= self.max_levels:
+                # Derinlik sınırının dışında kalan seviye tutulmaz (bounded memory).
+                return
+            self.keys.insert(i, key)
+            if len(self.keys) > self.max_levels:
+                worst = self.keys.pop()
+                self.levels.pop(-worst if self.is_bid else worst, None)
+        self.levels[price] = qty
+
+    def best(self) -> tuple[float, float] | None:
+        if not self.keys:
+            return None
+        price = -self.keys[0] if self.is_bid else self.keys[0]
+        return price, self.levels[price]
+
+    def iter_levels(self) -> Iterator[tuple[float, float]]:
+        for key in self.keys:
+            price = -key if self.is_bid else key
+            yield price, self.levels[price]
+
+    def top(self, n: int) -> list[tuple[float, float]]:
+        out = []
+        for level in self.iter_levels():
+            if len(out) >= n:
+                break
+            out.append(level)
+        return out
+
+
+@dataclass(slots=True)
+class FillEstimate:
+    side: str
+    requested_qty: float
+    filled_qty: float
+    avg_price: float
+    reference_price: float
+    slippage_bps: float
+    levels_used: int
+    partial: bool
+    fills: list[tuple[float, float]] = field(default_factory=list)
+
+
+class OrderBook:
+    def __init__(self, symbol: str, max_levels: int = 1000) -> None:
+        self.symbol = symbol.upper()
+        self.bids = _BookSide(True, max_levels)
+        self.asks = _BookSide(False, max_levels)
+        self.last_update_id = 0
+        self.synced = False
+        self.needs_resync = True
+        self.updated_at = 0.0
+        self.updates_applied = 0
+        self.gaps = 0
+
+    def apply_snapshot(self, last_update_id: int, bids: Iterable, asks: Iterable) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in bids:
+            self.bids.set(float(price), float(qty))
+        for price, qty in asks:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = int(last_update_id)
+        self.synced = False
+        self.needs_resync = False
+        self.updated_at = time.time()
+
+    def apply_diff(self, event: dict) -> bool:
+        # Binance diff-depth: U=ilk, u=son update id; futures ayrıca pu (önceki u) gönderir.
+        if self.needs_resync:
+            return False
+        first, final = int(event["U"]), int(event["u"])
+        if final <= self.last_update_id:
+            return False
+        if not self.synced:
+            if not first <= self.last_update_id + 1 <= final:
+                return self._gap(event)
+        elif "pu" in event:
+            if int(event["pu"]) != self.last_update_id:
+                return self._gap(event)
+        elif first != self.last_update_id + 1:
+            return self._gap(event)
+        for price, qty in event.get("b", []):
+            self.bids.set(float(price), float(qty))
+        for price, qty in event.get("a", []):
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = final
+        self.synced = True
+        self.updated_at = time.time()
+        self.updates_applied += 1
+        return True
+
+    def _gap(self, event: dict) -> bool:
+        self.gaps += 1
+        self.needs_resync = True
+        self.synced = False
+        raise SequenceGapError(f"{self.symbol} depth gap: last_update_id={self.last_update_id} event U={event.get('U')} u={event.get('u')}")
+
+    def best_bid(self) -> tuple[float, float] | None:
+        return self.bids.best()
+
+    def best_ask(self) -> tuple[float, float] | None:
+        return self.asks.best()
+
+    def mid(self) -> float | None:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def is_usable(self, max_age_seconds: float) -> bool:
+        return not self.needs_resync and self.best_bid() is not None and self.best_ask() is not None and time.time() - self.updated_at <= max_age_seconds
+
+    def depth(self, n: int = 10) -> dict:
+        return {"symbol": self.symbol, "last_update_id": self.last_update_id, "bids": self.bids.top(n), "asks": self.asks.top(n)}
+
+    def walk(self, side: str, qty: float | None = None, quote: float | None = None) -> FillEstimate:
+        # BUY asks'i, SELL bids'i tüketir; qty ya da quote (USDT) bütçesi kadar seviye gezilir.
+        side = side.upper()
+        book = self.asks if side == "BUY" else self.bids
+        best = book.best()
+        reference = best[0] if best else 0.0
+        remaining_qty = qty if qty is not None else float("inf")
+        remaining_quote = quote if quote is not None else float("inf")
+        filled = cost = 0.0
+        fills = []
+        for price, level_qty in book.iter_levels():
+            if remaining_qty <= 0 or remaining_quote <= 0:
+                break
+            take = min(level_qty, remaining_qty, remaining_quote / price)
+            if take <= 0:
+                break
+            fills.append((price, take))
+            filled += take
+            cost += take * price
+            remaining_qty -= take
+            remaining_quote -= take * price
+        avg = cost / filled if filled > 0 else 0.0
+        slippage = ((avg - reference) / reference * 10_000 if side == "BUY" else (reference - avg) / reference * 10_000) if filled > 0 and reference > 0 else 0.0
+        requested = qty if qty is not None else (quote / reference if reference > 0 and quote is not None else 0.0)
+        partial = (qty is not None and filled + 1e-12 < qty) or (quote is not None and qty is None and cost + 1e-9 < quote)
+        return FillEstimate(side, requested, filled, avg, reference, slippage, len(fills), partial, fills)
+
+
+class DepthReplayFeed:
+    # Kaydedilmiş (JSONL) ya da sentetik snapshot+diff akışı; canlı diff-depth stream'i yerine offline test/replay için.
+    def __init__(self, events: list[dict]) -> None:
+        self.events = events
+
+    @classmethod
+    def from_jsonl(cls, path: str | Path) -> DepthReplayFeed:
+        with open(path, encoding="utf-8") as fh:
+            return cls([json.loads(line) for line in fh if line.strip()])
+
+    def to_jsonl(self, path: str | Path) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            for event in self.events:
+                fh.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+    @classmethod
+    def synthetic(cls, symbol: str = "DOGEUSDT", mid: float = 0.1, tick: float = 0.0001, levels: int = 50, updates: int = 1000, seed: int = 0) -> DepthReplayFeed:
+        rng = random.Random(seed)
+        last_id = 1000
+        snapshot = {
+            "type": "snapshot",
+            "symbol": symbol,
+            "lastUpdateId": last_id,
+            "bids": [[round(mid - tick * (i + 1), 8), round(rng.uniform(100, 5000), 2)] for i in range(levels)],
+            "asks": [[round(mid + tick * (i + 1), 8), round(rng.uniform(100, 5000), 2)] for i in range(levels)],
+        }
+        events: list[dict] = [snapshot]
+        for _ in range(updates):
+            first = last_id + 1
+            last_id = first + rng.randint(0, 3)
+            side = "b" if rng.random() < 0.5 else "a"
+            sign = -1 if side == "b" else 1
+            price = round(mid + sign * tick * rng.randint(1, levels), 8)
+            qty = 0.0 if rng.random() < 0.2 else round(rng.uniform(100, 5000), 2)
+            events.append({"type": "diff", "e": "depthUpdate", "s": symbol, "U": first, "u": last_id, side: [[price, qty]]})
+        return cls(events)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.events)
+
+    def apply_to(self, book: OrderBook) -> int:
+        applied = 0
+        for event in self.events:
+            if event.get("type") == "snapshot":
+                book.apply_snapshot(event["lastUpdateId"], event["bids"], event["asks"])
+            elif book.apply_diff(event):
+                applied += 1
+        return applied
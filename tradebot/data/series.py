@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections import deque
+import math
+import threading
+from typing import Any
+
+# Bucket: [start, t_min, min, t_max, max, last]
+_START, _TMIN, _MIN, _TMAX, _MAX, _LAST = range(6)
+
+
+class MinMaxSeries:
+    # Cok cozunurluklu min/max piramidi: seviye i'nin kova genisligi base_width * factor**i.
+    # Her nokta tum seviyeleri O(levels) gunceller; her seviye en fazla `capacity` kova tutar (bounded memory).
+    def __init__(self, base_width: float = 10.0, factor: int = 4, levels: int = 8, capacity: int = 1024) -> None:
+        self.widths = [base_width * factor**i for i in range(levels)]
+        self.levels: list[deque[list[float]]] = [deque(maxlen=capacity) for _ in range(levels)]
+        self.count = 0
+
+    def append(self, t: float, value: float) -> None:
+        if value is None or not math.isfinite(value):
+            return
+        for width, buckets in zip(self.widths, self.levels):
+            start = math.floor(t / width) * width
+            if buckets and buckets[-1][_START] == start:
+                bucket = buckets[-1]
+                if value < bucket[_MIN]:
+                    bucket[_TMIN], bucket[_MIN] = t, value
+                if value > bucket[_MAX]:
+                    bucket[_TMAX], bucket[_MAX] = t, value
+                bucket[_LAST] = value
+            elif not buckets or start > buckets[-1][_START]:
+                buckets.append([start, t, value, t, value, value])
+        self.count += 1
+
+    def span(self) -> tuple[float, float] | None:
+        finest = next((b for b in self.levels if b), None)
+        if finest is None:
+            return None
+        coarsest = self.levels[-1]
+        return coarsest[0][_START], finest[-1][_START] + self.widths[0]
+
+    def query(self, start: float | None = None, end: float | None = None, max_points: int = 600) -> list[tuple[float, float]]:
+        # Pencereyi max_points/2 kovadan az kovayla kapsayan en ince seviye secilir; kova basina min ve max noktasi doner.
+        span = self.span()
+        if span is None:
+            return []
+        start = span[0] if start is None else start
+        end = span[1] if end is None else end
+        budget = max(1, max_points // 2)
+        chosen = len(self.levels) - 1
+        for i, (width, buckets) in enumerate(zip(self.widths, self.levels)):
+            if not buckets:
+                continue
+            covers = buckets[0][_START] <= start or len(buckets) < buckets.maxlen
+            if covers and (end - start) / width <= budget:
+                chosen = i
+                break
+        points: list[tuple[float, float]] = []
+        for bucket in self.levels[chosen]:
+            if bucket[_START] + self.widths[chosen] < start or bucket[_START] > end:
+                continue
+            low, high = (bucket[_TMIN], bucket[_MIN]), (bucket[_TMAX], bucket[_MAX])
+            if low == high:
+                points.append(low)
+            else:
+                points.extend(sorted((low, high)))
+        if len(points) > max_points:
+            # Pencere seviyenin tam kova sinirina oturmadiysa fazlalik bastan kirpilir.
+            points = points[-max_points:]
+        return points
+
+
+class ChartBuffer:
+    def __init__(self, max_markers: int = 2000, **series_kwargs: Any) -> None:
+        self.equity = MinMaxSeries(**series_kwargs)
+        self.price = MinMaxSeries(**series_kwargs)
+        self.markers: deque[dict[str, Any]] = deque(maxlen=max_markers)
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        # Tutulan toplam kova + isaret sayisi (bellek izleme icin).
+        return sum(len(level) for series in (self.equity, self.price) for level in series.levels) + len(self.markers)
+
+    def append(self, t: float, equity: float, price: float) -> None:
+        with self._lock:
+            self.equity.append(t, equity)
+            self.price.append(t, price)
+            self.version += 1
+
+    def mark(self, t: float, action: str, price: float, status: str | None = None) -> None:
+        with self._lock:
+            self.markers.append({"t": t, "action": action, "price": price, "status": status})
+            self.version += 1
+
+    def payload(self, window_seconds: float | None = None, max_points: int = 600, max_markers: int = 200) -> dict[str, Any]:
+        with self._lock:
+            span = self.price.span()
+            end = span[1] if span else None
+            start = end - window_seconds if window_seconds and end is not None else None
+            markers = [m for m in self.markers if start is None or m["t"] >= start]
+            if len(markers) > max_markers:
+                step = math.ceil(len(markers) / max_markers)
+                markers = markers[::-step][::-1]
+            return {
+                "version": self.version,
+                "equity": self.equity.query(start, end, max_points),
+                "price": self.price.query(start, end, max_points),
+                "markers": markers,
+            }
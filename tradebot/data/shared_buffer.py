@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from multiprocessing import resource_tracker, shared_memory
+import time
+
+import numpy as np
+import pandas as pd
+
+CANDLE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume"]
+ACCOUNT_COLUMNS = ["wallet_balance", "available_balance", "base_qty", "entry_price", "realized_pnl"]
+
+
+# Sembol basina candle/price/account bloklari tek SharedMemory segmenti uzerinde numpy view'lardir.
+# Her sembol satiri seqlock ile korunur: yazar version'i tek sayiya cekip yazar, bitince cift sayiya cevirir;
+# okuyucu version tek ise ya da okuma sirasinda degistiyse tekrar dener.
+class SharedMarketBuffer:
+    def __init__(self, symbols: list[str], lookback: int, workers: int, name: str | None = None, create: bool = False, track: bool = True) -> None:
+        self.symbols = [s.upper() for s in symbols]
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.lookback = lookback
+        self.workers = workers
+        n = len(self.symbols)
+        shapes = [
+            ("candles", (n, lookback, len(CANDLE_COLUMNS)), np.float64),
+            ("candle_count", (n,), np.int64),
+            ("prices", (n,), np.float64),
+            ("accounts", (n, len(ACCOUNT_COLUMNS)), np.float64),
+            ("versions", (n,), np.int64),
+            ("heartbeats", (max(1, workers),), np.float64),
+        ]
+        size = sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in shapes)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.owner = create
+        if not create and not track:
+            # 3.11'de attach eden process de resource_tracker'a kaydolur; supervisor'dan bagimsiz bir process
+            # (or. dashboard) kendi tracker'i ile cikarken segmenti unlink etmesin (3.13 track=False karsiligi).
+            try:
+                resource_tracker.unregister(self.shm._name, "shared_memory")  # type: ignore[attr-defined]
+            except Exception:
+                pass
+        offset = 0
+        for attr, shape, dtype in shapes:
+            arr = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            if create:
+                arr.fill(0)
+            setattr(self, attr, arr)
+            offset += arr.nbytes
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def create(cls, symbols: list[str], lookback: int, workers: int) -> SharedMarketBuffer:
+        return cls(symbols, lookback, workers, create=True)
+
+    @classmethod
+    def attach(cls, name: str, symbols: list[str], lookback: int, workers: int, track: bool = True) -> SharedMarketBuffer:
+        return cls(symbols, lookback, workers, name=name, create=False, track=track)
+
+    def release_row(self, symbol: str) -> None:
+        # Yazma sirasinda olen worker'dan kalan tek (kilitli) version'i serbest birak.
+        i = self.index[symbol.upper()]
+        if self.versions[i] % 2:
+            self.versions[i] += 1
+
+    def _begin(self, i: int) -> None:
+        self.versions[i] += 1
+
+    def _end(self, i: int) -> None:
+        self.versions[i] += 1
+
+    def publish(self, symbol: str, candles: pd.DataFrame | None = None, price: float | None = None, account: dict | None = None) -> None:
+        i = self.index[symbol.upper()]
+        self._begin(i)
+        try:
+            if candles is not None and len(candles):
+                rows = candles[CANDLE_COLUMNS].to_numpy(dtype=np.float64)[-self.lookback :]
+                self.candles[i, : len(rows)] = rows
+                self.candle_count[i] = len(rows)
+            if price is not None:
+                self.prices[i] = price
+            if account is not None:
+                self.accounts[i] = [float(account.get(col, 0.0)) for col in ACCOUNT_COLUMNS]
+        finally:
+            self._end(i)
+
+    def _consistent_read(self, i: int, reader):
+        for _ in range(100):
+            before = int(self.versions[i])
+            if before % 2:
+                time.sleep(0)
+                continue
+            out = reader()
+            if int(self.versions[i]) == before:
+                return out
+        raise TimeoutError(f"shared buffer row {i} busy")
+
+    def read_candles(self, symbol: str) -> pd.DataFrame:
+        i = self.index[symbol.upper()]
+        rows = self._consistent_read(i, lambda: self.candles[i, : int(self.candle_count[i])].copy())
+        return pd.DataFrame(rows, columns=CANDLE_COLUMNS)
+
+    def read_price(self, symbol: str) -> float:
+        i = self.index[symbol.upper()]
+        return float(self._consistent_read(i, lambda: self.prices[i]))
+
+    def read_account(self, symbol: str) -> dict[str, float]:
+        i = self.index[symbol.upper()]
+        row = self._consistent_read(i, lambda: self.accounts[i].copy())
+        return dict(zip(ACCOUNT_COLUMNS, (float(v) for v in row)))
+
+    def beat(self, worker_id: int) -> None:
+        self.heartbeats[worker_id] = time.time()
+
+    def close(self) -> None:
+        # numpy view'lari birakilmadan SharedMemory.close() BufferError verir.
+        for attr in ("candles", "candle_count", "prices", "accounts", "versions", "heartbeats"):
+            setattr(self, attr, None)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
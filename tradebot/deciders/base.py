@@ -8,10 +8,17 @@ from tradebot.models.context import BotContext, Decision
 
 
 class BaseDecider(ABC):
+    # LLM adapter'lari son tick'in prompt boyutunu (karakter/token/kirpilan alanlar) burada raporlar.
+    last_prompt: dict[str, Any] | None = None
+
     @abstractmethod
     def decide(self, context: BotContext) -> dict[str, Any]:
         raise NotImplementedError
 
+    def decide_many(self, contexts: list[BotContext]) -> dict[str, dict[str, Any]]:
+        # Sembol anahtarli kararlar; LLM adapter'lari tum context'leri tek istekte gonderir.
+        return {context.symbol: self.decide(context) for context in contexts}
+
 
 DEFAULT_DECISION = asdict(Decision())
 
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+import threading
+import time
+from typing import Any
+
+from tradebot.deciders.base import BaseDecider, DEFAULT_DECISION
+from tradebot.models.context import BotContext
+
+
+class BatchingDecider(BaseDecider):
+    # Farkli botlardan ayni pencerede gelen decide() cagrilari toplanir ve tek decide_many istegiyle gonderilir.
+    # Batch max_batch'e ulasinca hemen, ulasmazsa ilk cagridan max_wait_ms sonra gonderilir.
+    def __init__(self, inner: BaseDecider, max_batch: int, max_wait_ms: float = 250.0) -> None:
+        self.inner = inner
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched = 0
+        self._batch: list[tuple[BotContext, Future]] = []
+        self._deadline = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def last_prompt(self) -> dict[str, Any] | None:
+        return self.inner.last_prompt
+
+    def decide(self, context: BotContext) -> dict[str, Any]:
+        future: Future = Future()
+        with self._cond:
+            if not self._batch:
+                self._deadline = time.monotonic() + self.max_wait
+            mine = self._batch
+            mine.append((context, future))
+            self._cond.notify_all()
+            while True:
+                if future.done():
+                    return future.result()
+                now = time.monotonic()
+                if self._batch is mine and (len(mine) >= self.max_batch or now >= self._deadline):
+                    self._batch = []
+                    break
+                # Batch'i baska thread aldiysa sonucu bekleriz; almadiysa pencere dolana kadar.
+                self._cond.wait(self._deadline - now if self._batch is mine else None)
+        self._flush(mine)
+        return future.result()
+
+    def _flush(self, batch: list[tuple[BotContext, Future]]) -> None:
+        # decide_many sembol anahtarli doner; ayni sembolde iki bot (farkli hesap) ayni istege girerse biri
+        # digerinin kararini alir. Batch, her turda bir sembol bir kez olacak sekilde turlara bolunur.
+        rounds: list[list[tuple[BotContext, Future]]] = []
+        seen: dict[str, int] = {}
+        for item in batch:
+            n = seen.get(item[0].symbol, 0)
+            seen[item[0].symbol] = n + 1
+            if n == len(rounds):
+                rounds.append([])
+            rounds[n].append(item)
+        for items in rounds:
+            decisions = self._decide_round([context for context, _ in items])
+            for (_, future), decision in zip(items, decisions):
+                future.set_result(decision)
+        with self._cond:
+            self._cond.notify_all()
+
+    def _decide_round(self, contexts: list[BotContext]) -> list[dict[str, Any]]:
+        try:
+            if len(contexts) == 1:
+                results = {contexts[0].symbol: self.inner.decide(contexts[0])}
+            else:
+                results = self.inner.decide_many(contexts)
+        except Exception as exc:
+            results = {context.symbol: {**DEFAULT_DECISION, "fallback_reason": f"batch decider error: {exc}"} for context in contexts}
+        self.batches += 1
+        self.batched += len(contexts)
+        # Sonuclar batch sirasiyla eslenir; tur icinde semboller tekil oldugu icin her bot kendi kararini alir.
+        return [results.get(context.symbol) or {**DEFAULT_DECISION, "fallback_reason": "batch decider returned no decision"} for context in contexts]
+
+    def decide_many(self, contexts: list[BotContext]) -> dict[str, dict[str, Any]]:
+        return self.inner.decide_many(contexts)
@@ -2,9 +2,7 @@ from __future__ import annotations
 
 from tradebot.config.settings import BotConfig
 from tradebot.deciders.base import BaseDecider
-from tradebot.deciders.gemini_decider import GeminiDecider
-from tradebot.deciders.ollama_decider import OllamaDecider
-from tradebot.deciders.openai_decider import OpenAIDecider
+from tradebot.deciders.llm_utils import PromptEncoder
 from tradebot.deciders.rule_based import RuleBasedDecider
 from tradebot.loggingx.logger import get_logger
 
@@ -12,16 +10,24 @@ from tradebot.loggingx.logger import get_logger
 def create_decider(cfg: BotConfig) -> BaseDecider:
     logger = get_logger("tradebot.decider")
     provider = cfg.decider_provider
+    encoder = PromptEncoder(cfg.prompt_token_budget, cfg.prompt_candles)
     if provider == "OpenAI":
         if not cfg.openai_api_key:
             logger.warning("OpenAI key missing -> RuleBased fallback")
             return RuleBasedDecider()
-        return OpenAIDecider(cfg.openai_api_key, cfg.decider_model)
+        # Provider adapter'lari sadece secildiginde import edilir.
+        from tradebot.deciders.openai_decider import OpenAIDecider
+
+        return OpenAIDecider(cfg.openai_api_key, cfg.decider_model, encoder)
     if provider == "Gemini":
         if not cfg.gemini_api_key:
             logger.warning("Gemini key missing -> RuleBased fallback")
             return RuleBasedDecider()
-        return GeminiDecider(cfg.gemini_api_key, cfg.decider_model)
+        from tradebot.deciders.gemini_decider import GeminiDecider
+
+        return GeminiDecider(cfg.gemini_api_key, cfg.decider_model, encoder)
     if provider == "Ollama":
-        return OllamaDecider(cfg.ollama_base_url, cfg.decider_model)
+        from tradebot.deciders.ollama_decider import OllamaDecider
+
+        return OllamaDecider(cfg.ollama_base_url, cfg.decider_model, encoder)
     return RuleBasedDecider()
@@ -1,23 +1,43 @@
 from __future__ import annotations
 
 from tradebot.deciders.base import BaseDecider, DEFAULT_DECISION
-from tradebot.deciders.llm_utils import build_prompt, parse_decision_json
+from tradebot.deciders.llm_utils import LLM_TIMEOUT_SECONDS, EncodedPrompt, PromptEncoder, fallback_many, parse_decision_json, parse_decisions_json
 from tradebot.models.context import BotContext
+from tradebot.utils import deadline
 
 
 class GeminiDecider(BaseDecider):
-    def __init__(self, api_key: str | None, model: str = "gemini-1.5-flash") -> None:
+    def __init__(self, api_key: str | None, model: str = "gemini-1.5-flash", encoder: PromptEncoder | None = None) -> None:
         self.api_key = api_key
         self.model = model
+        self.encoder = encoder or PromptEncoder()
+
+    def _complete(self, prompt: EncodedPrompt) -> str:
+        import google.generativeai as genai
+
+        self.last_prompt = prompt.stats()
+        genai.configure(api_key=self.api_key)
+        model = genai.GenerativeModel(self.model, system_instruction=prompt.prefix)
+        response = model.generate_content(prompt.body, request_options={"timeout": deadline.cap_timeout(LLM_TIMEOUT_SECONDS)})
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.last_prompt.update(
+                provider_tokens=getattr(usage, "prompt_token_count", None), cached_tokens=getattr(usage, "cached_content_token_count", None)
+            )
+        return response.text or ""
 
     def decide(self, context: BotContext) -> dict:
         if not self.api_key:
             return {**DEFAULT_DECISION, "fallback_reason": "GEMINI_API_KEY missing"}
         try:
-            import google.generativeai as genai
-
-            genai.configure(api_key=self.api_key)
-            response = genai.GenerativeModel(self.model).generate_content(build_prompt(context))
-            return parse_decision_json(response.text or "")
+            return parse_decision_json(self._complete(self.encoder.encode(context)))
         except Exception as exc:
             return {**DEFAULT_DECISION, "fallback_reason": f"Gemini error: {exc}"}
+
+    def decide_many(self, contexts: list[BotContext]) -> dict[str, dict]:
+        if not self.api_key:
+            return fallback_many(contexts, "GEMINI_API_KEY missing")
+        try:
+            return parse_decisions_json(self._complete(self.encoder.encode_many(contexts)), [c.symbol for c in contexts])
+        except Exception as exc:
+            return fallback_many(contexts, f"Gemini error: {exc}")
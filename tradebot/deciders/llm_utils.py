@@ -1,17 +1,157 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 import json
+import math
+from typing import Any
 
 from tradebot.deciders.base import DEFAULT_DECISION, normalize_decision
 from tradebot.models.context import BotContext
 
+# Tick disinda (deadline yokken) LLM isteginin ust siniri; tick icinde decide asamasinin kalan suresi kullanilir.
+LLM_TIMEOUT_SECONDS = 60.0
+
+_SCHEMA = (
+    '{"action":"buy|sell|hold|close","confidence":0..1,"reason":"short text","position_size_pct":0..100,'
+    '"stop_loss":price|null,"take_profit":price|null}\n'
+)
+_LEGEND = (
+    "s=symbol, m=market, p=last price, ind=indicators, bal=[wallet, available] in quote asset, "
+    "pos=open positions [side, qty, entry, pnl_pct], ord=recent orders [side, qty, price, status], "
+    "c1/c5=1m/5m candles oldest first: b=first open, r=[open, high, low, close] in basis points vs previous close, "
+    "v=volume as % of window mean.\n"
+)
+# Her tick'te birebir ayni kalan on ek: provider'larin prompt cache'i bu kismi tekrar islemez.
+# Degisen her sey (fiyat, indikatorler, mumlar) bu on ekten sonra gelir.
+PROMPT_PREFIX = (
+    "You are a crypto trading decider. Reply with ONE strict JSON object and nothing else:\n"
+    + _SCHEMA
+    + "Context is compact JSON: "
+    + _LEGEND
+    + "Context:\n"
+)
+BATCH_PROMPT_PREFIX = (
+    "You are a crypto trading decider. Decide for EVERY context. Reply with ONE strict JSON array and nothing else, "
+    'one object per context with its "symbol" plus:\n'
+    + _SCHEMA
+    + "Contexts are a JSON array of compact objects: "
+    + _LEGEND
+    + "Contexts:\n"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Tokenizer'a bagimli olmamak icin ~4 karakter/token (JSON/sayi agirlikli metinde yeterince yakin).
+    return math.ceil(len(text) / 4)
+
+
+def _num(value: Any, digits: int = 6) -> float | int:
+    value = float(value)
+    if not math.isfinite(value):
+        return 0
+    rounded = float(f"{value:.{digits}g}")
+    return int(rounded) if rounded.is_integer() and abs(rounded) < 1e15 else rounded
+
+
+def _bps(value: float, base: float) -> int:
+    return round((value / base - 1) * 10_000) if base else 0
+
+
+def encode_candles(candles: list[dict[str, Any]]) -> dict[str, Any]:
+    if not candles:
+        return {}
+    volumes = [float(c.get("volume", 0.0)) for c in candles]
+    mean_volume = sum(volumes) / len(volumes) or 1.0
+    prev = float(candles[0]["open"])
+    rows = []
+    for candle in candles:
+        rows.append([_bps(float(candle[k]), prev) for k in ("open", "high", "low", "close")])
+        prev = float(candle["close"])
+    return {"b": _num(candles[0]["open"]), "r": rows, "v": [round(v / mean_volume * 100) for v in volumes]}
+
+
+@dataclass(slots=True)
+class EncodedPrompt:
+    prefix: str
+    body: str
+    tokens: int
+    prefix_tokens: int
+    budget: int
+    candles: int
+    trimmed: list[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.body
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "chars": len(self.prefix) + len(self.body),
+            "tokens": self.tokens,
+            "prefix_tokens": self.prefix_tokens,
+            "budget": self.budget,
+            "candles": self.candles,
+            "trimmed": list(self.trimmed),
+        }
+
+
+class PromptEncoder:
+    def __init__(self, token_budget: int = 800, candles: int = 20) -> None:
+        self.token_budget = token_budget
+        self.candles = candles
+
+    def payload(self, context: BotContext, candles: int, orders: int) -> dict[str, Any]:
+        # Anahtar sirasi sabit; ayni degerler her zaman ayni metni uretir.
+        data: dict[str, Any] = {
+            "s": context.symbol,
+            "m": context.market_type,
+            "p": _num(context.latest_price),
+            "ind": {name: _num(value, 5) for name, value in sorted(context.indicators.items())},
+            "bal": [_num(context.balances.get("wallet", 0.0), 8), _num(context.balances.get("available", 0.0), 8)],
+            "pos": [[p.side, _num(p.qty), _num(p.entry_price), round(p.pnl_pct, 2)] for p in context.positions],
+        }
+        if orders:
+            data["ord"] = [
+                [o.get("side"), _num(o.get("qty", 0.0)), _num(o.get("price", 0.0)), o.get("status")] for o in context.recent_orders[:orders]
+            ]
+        if candles:
+            for key, rows in (("c1", context.candles_1m), ("c5", context.candles_5m)):
+                encoded = encode_candles(rows[-candles:])
+                if encoded:
+                    data[key] = encoded
+        return data
+
+    def _fit(self, prefix: str, contexts: list[BotContext], budget: int, many: bool) -> EncodedPrompt:
+        # Butce asilirsa once emir gecmisi, sonra en eski mumlar atilir; indikator/pozisyon/bakiye her zaman kalir.
+        prefix_tokens = estimate_tokens(prefix)
+        candles, orders = self.candles, 5
+        trimmed: list[str] = []
+        while True:
+            payloads = [self.payload(context, candles, orders) for context in contexts]
+            body = json.dumps(payloads if many else payloads[0], separators=(",", ":"))
+            tokens = prefix_tokens + estimate_tokens(body)
+            if tokens <= budget or (candles == 0 and orders == 0):
+                break
+            if orders:
+                orders = 0
+                trimmed.append("orders")
+            else:
+                candles //= 2
+                trimmed.append(f"candles:{candles}")
+        return EncodedPrompt(prefix, body, tokens, prefix_tokens, budget, candles, trimmed)
+
+    def encode(self, context: BotContext) -> EncodedPrompt:
+        return self._fit(PROMPT_PREFIX, [context], self.token_budget, many=False)
+
+    def encode_many(self, contexts: list[BotContext]) -> EncodedPrompt:
+        # On ek bir kez gonderilir; context basina butce tekli prompt'unkiyle ayni kalir.
+        prefix_tokens = estimate_tokens(BATCH_PROMPT_PREFIX)
+        budget = prefix_tokens + len(contexts) * max(0, self.token_budget - estimate_tokens(PROMPT_PREFIX))
+        return self._fit(BATCH_PROMPT_PREFIX, contexts, budget, many=True)
+
 
 def build_prompt(context: BotContext) -> str:
-    return (
-        "Return only strict JSON: action, confidence, reason, position_size_pct, stop_loss, take_profit. "
-        f"symbol={context.symbol}, market={context.market_type}, price={context.latest_price}, "
-        f"indicators={context.indicators}, balances={context.balances}, positions={len(context.positions)}"
-    )
+    return PromptEncoder().encode(context).text
 
 
 def parse_decision_json(text: str) -> dict:
@@ -25,3 +165,55 @@ def parse_decision_json(text: str) -> dict:
         return normalize_decision(parsed)
     except Exception:
         return DEFAULT_DECISION.copy()
+
+
+def _decision_items(text: str) -> list:
+    for opener, closer in (("[", "]"), ("{", "}")):
+        start, end = text.find(opener), text.rfind(closer)
+        if start == -1 or end <= start:
+            continue
+        try:
+            parsed = json.loads(text[start : end + 1])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, list):
+            return parsed
+        if isinstance(parsed, dict):
+            if isinstance(parsed.get("decisions"), list):
+                return parsed["decisions"]
+            if "symbol" not in parsed:
+                # {"DOGEUSDT": {...}, ...} bicimi de kabul edilir.
+                return [{**value, "symbol": key} for key, value in parsed.items() if isinstance(value, dict)]
+    # Dizi bir butun olarak bozuksa (kesik cevap, fazla virgul) okunabilen nesneler tek tek alinir.
+    decoder = json.JSONDecoder()
+    items, pos = [], text.find("{")
+    while pos != -1:
+        try:
+            item, end = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            pos = text.find("{", pos + 1)
+            continue
+        items.append(item)
+        pos = text.find("{", end)
+    return items
+
+
+def parse_decisions_json(text: str, symbols: list[str]) -> dict[str, dict]:
+    # Bozuk/eksik olan sembol hold fallback'i alir; digerlerinin kararlari yine kullanilir.
+    decisions: dict[str, dict] = {}
+    wanted = set(symbols)
+    for item in _decision_items(text):
+        if not isinstance(item, dict):
+            continue
+        symbol = str(item.get("symbol", "")).upper()
+        if symbol not in wanted or symbol in decisions:
+            continue
+        try:
+            decisions[symbol] = normalize_decision(item)
+        except (TypeError, ValueError):
+            continue
+    return {symbol: decisions.get(symbol) or {**DEFAULT_DECISION, "fallback_reason": "batch response missing or malformed for symbol"} for symbol in symbols}
+
+
+def fallback_many(contexts: list[BotContext], reason: str) -> dict[str, dict]:
+    return {context.symbol: {**DEFAULT_DECISION, "fallback_reason": reason} for context in contexts}
@@ -1,25 +1,43 @@
 from __future__ import annotations
 
-import requests
-
 from tradebot.deciders.base import BaseDecider, DEFAULT_DECISION
-from tradebot.deciders.llm_utils import build_prompt, parse_decision_json
+from tradebot.deciders.llm_utils import EncodedPrompt, PromptEncoder, fallback_many, parse_decision_json, parse_decisions_json
 from tradebot.models.context import BotContext
+from tradebot.utils import deadline
 
 
 class OllamaDecider(BaseDecider):
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3.1") -> None:
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3.1", encoder: PromptEncoder | None = None) -> None:
         self.base_url = base_url.rstrip("/")
         self.model = model
+        self.encoder = encoder or PromptEncoder()
+
+    def _complete(self, prompt: EncodedPrompt, timeout: float = 20) -> str:
+        import requests
+
+        self.last_prompt = prompt.stats()
+        # Ayni system on eki Ollama'nin KV cache'inde tutulur; sadece degisen context islenir.
+        resp = requests.post(
+            f"{self.base_url}/api/generate",
+            json={"model": self.model, "system": prompt.prefix, "prompt": prompt.body, "stream": False},
+            timeout=deadline.cap_timeout(timeout),
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if "prompt_eval_count" in data:
+            self.last_prompt["provider_tokens"] = data["prompt_eval_count"]
+        return data.get("response", "")
 
     def decide(self, context: BotContext) -> dict:
         try:
-            resp = requests.post(
-                f"{self.base_url}/api/generate",
-                json={"model": self.model, "prompt": build_prompt(context), "stream": False},
-                timeout=20,
-            )
-            resp.raise_for_status()
-            return parse_decision_json(resp.json().get("response", ""))
+            return parse_decision_json(self._complete(self.encoder.encode(context)))
         except Exception as exc:
             return {**DEFAULT_DECISION, "fallback_reason": f"Ollama error: {exc}"}
+
+    def decide_many(self, contexts: list[BotContext]) -> dict[str, dict]:
+        try:
+            # Cevap uzunlugu sembol sayisiyla buyur; timeout da olceklenir.
+            text = self._complete(self.encoder.encode_many(contexts), timeout=20 + 5 * len(contexts))
+            return parse_decisions_json(text, [c.symbol for c in contexts])
+        except Exception as exc:
+            return fallback_many(contexts, f"Ollama error: {exc}")
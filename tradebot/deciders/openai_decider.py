@@ -1,27 +1,47 @@
 from __future__ import annotations
 
 from tradebot.deciders.base import BaseDecider, DEFAULT_DECISION
-from tradebot.deciders.llm_utils import build_prompt, parse_decision_json
+from tradebot.deciders.llm_utils import LLM_TIMEOUT_SECONDS, EncodedPrompt, PromptEncoder, fallback_many, parse_decision_json, parse_decisions_json
 from tradebot.models.context import BotContext
+from tradebot.utils import deadline
 
 
 class OpenAIDecider(BaseDecider):
-    def __init__(self, api_key: str | None, model: str = "gpt-4o-mini") -> None:
+    def __init__(self, api_key: str | None, model: str = "gpt-4o-mini", encoder: PromptEncoder | None = None) -> None:
         self.api_key = api_key
         self.model = model
+        self.encoder = encoder or PromptEncoder()
+
+    def _complete(self, prompt: EncodedPrompt) -> str:
+        from openai import OpenAI
+
+        self.last_prompt = prompt.stats()
+        # Istek decide asamasinin kalan suresiyle sinirli; SDK retry'i kapali, tekrar denemeyi sonraki tick yapar.
+        client = OpenAI(api_key=self.api_key, timeout=deadline.cap_timeout(LLM_TIMEOUT_SECONDS), max_retries=0)
+        # Sabit on ek system mesajinda: OpenAI otomatik prefix cache'i bu kismi yeniden hesaplamaz.
+        response = client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": prompt.prefix}, {"role": "user", "content": prompt.body}],
+            temperature=0,
+        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.last_prompt.update(provider_tokens=usage.prompt_tokens, cached_tokens=getattr(details, "cached_tokens", None))
+        return response.choices[0].message.content or ""
 
     def decide(self, context: BotContext) -> dict:
         if not self.api_key:
             return {**DEFAULT_DECISION, "fallback_reason": "OPENAI_API_KEY missing"}
         try:
-            from openai import OpenAI
-
-            client = OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": build_prompt(context)}],
-                temperature=0,
-            )
-            return parse_decision_json(response.choices[0].message.content or "")
+            return parse_decision_json(self._complete(self.encoder.encode(context)))
         except Exception as exc:
             return {**DEFAULT_DECISION, "fallback_reason": f"OpenAI error: {exc}"}
+
+    def decide_many(self, contexts: list[BotContext]) -> dict[str, dict]:
+        if not self.api_key:
+            return fallback_many(contexts, "OPENAI_API_KEY missing")
+        try:
+            return parse_decisions_json(self._complete(self.encoder.encode_many(contexts)), [c.symbol for c in contexts])
+        except Exception as exc:
+            return fallback_many(contexts, f"OpenAI error: {exc}")
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-import requests
+from tradebot.exchange import transport
+from tradebot.exchange.rate_limit import PRIORITY_ACCOUNT, PRIORITY_ORDER, endpoint_weight, get_limiter
+from tradebot.utils import deadline
+
+SIGNED_TIMEOUT_SECONDS = 10.0
 
 
 class BinanceClient:
@@ -9,18 +13,60 @@ class BinanceClient:
         self.testnet = testnet
         if market_type == "futures":
             self.base_url = "https://testnet.binancefuture.com" if testnet else "https://fapi.binance.com"
+            self.stream_url = "wss://stream.binancefuture.com/ws" if testnet else "wss://fstream.binance.com/ws"
         else:
             self.base_url = "https://testnet.binance.vision" if testnet else "https://api.binance.com"
+            self.stream_url = "wss://stream.testnet.binance.vision/ws" if testnet else "wss://stream.binance.com:9443/ws"
 
     def _path(self, endpoint: str) -> str:
         if self.market_type == "futures":
-            return f"{self.base_url}/fapi/v1/{endpoint}"
-        return f"{self.base_url}/api/v3/{endpoint}"
+            return f"/fapi/v1/{endpoint}"
+        return f"/api/v3/{endpoint}"
 
-    def get_symbol_rules(self, symbol: str) -> dict:
-        resp = requests.get(self._path("exchangeInfo"), params={"symbol": symbol}, timeout=15)
+    def _get(self, endpoint: str, params: dict) -> dict:
+        return transport.get_json(self.base_url, self.market_type, self._path(endpoint), endpoint, params)
+
+    def _client(self, api_key: str, api_secret: str):
+        from binance.client import Client
+
+        # Imzali istekler de timeout'lu: tick asamasi icinde kalan sureyle, emir yolunda sabit sureyle sinirli.
+        return Client(api_key, api_secret, testnet=self.testnet, requests_params={"timeout": deadline.cap_timeout(SIGNED_TIMEOUT_SECONDS)})
+
+    def _signed(self, client, endpoint: str, priority: int, call):
+        # python-binance istegi de ayni weight bucket'indan gecer; cevap header'lari limiter'a geri beslenir.
+        limiter = get_limiter(self.base_url, self.market_type)
+        limiter.acquire(endpoint_weight(self.market_type, endpoint), priority, timeout=deadline.remaining())
+        try:
+            return call()
+        finally:
+            response = getattr(client, "response", None)
+            if response is not None:
+                limiter.observe(response.headers, response.status_code)
+
+    def _listen_key(self, method: str, api_key: str, listen_key: str | None = None) -> dict:
+        # listenKey endpoint'leri imza istemez, sadece API key header'i; hesap onceligiyle bucket'tan gecer.
+        import requests
+
+        endpoint = "listenKey" if self.market_type == "futures" else "userDataStream"
+        limiter = get_limiter(self.base_url, self.market_type)
+        limiter.acquire(endpoint_weight(self.market_type, endpoint), PRIORITY_ACCOUNT)
+        params = {"listenKey": listen_key} if listen_key else None
+        resp = requests.request(method, f"{self.base_url}{self._path(endpoint)}", params=params, headers={"X-MBX-APIKEY": api_key}, timeout=deadline.cap_timeout(SIGNED_TIMEOUT_SECONDS))
+        limiter.observe(resp.headers, resp.status_code)
         resp.raise_for_status()
-        symbols = resp.json().get("symbols", [])
+        return resp.json()
+
+    def create_listen_key(self, api_key: str) -> str:
+        return self._listen_key("POST", api_key)["listenKey"]
+
+    def keepalive_listen_key(self, api_key: str, listen_key: str) -> None:
+        self._listen_key("PUT", api_key, listen_key)
+
+    def close_listen_key(self, api_key: str, listen_key: str) -> None:
+        self._listen_key("DELETE", api_key, listen_key)
+
+    def get_symbol_rules(self, symbol: str) -> dict:
+        symbols = self._get("exchangeInfo", {"symbol": symbol}).get("symbols", [])
         if not symbols:
             return {"step_size": 0.001, "min_qty": 0.0, "min_notional": 5.0, "tick_size": 0.0001}
         info = symbols[0]
@@ -33,39 +79,60 @@ class BinanceClient:
             "min_qty": float(lot.get("minQty", 0.0)),
             "min_notional": float(min_notional.get("minNotional", 5.0)),
             "tick_size": float(price_filter.get("tickSize", 0.0001)),
+            "base_asset": info.get("baseAsset"),
+            "quote_asset": info.get("quoteAsset"),
         }
 
     def get_latest_price(self, symbol: str) -> float:
-        resp = requests.get(self._path("ticker/price"), params={"symbol": symbol}, timeout=15)
-        resp.raise_for_status()
-        return float(resp.json()["price"])
+        return float(self._get("ticker/price", {"symbol": symbol})["price"])
 
-    def get_account_balances(self, api_key: str, api_secret: str) -> dict[str, float]:
+    def get_order_book(self, symbol: str, limit: int = 100) -> dict:
+        data = self._get("depth", {"symbol": symbol, "limit": limit})
+        return {"lastUpdateId": int(data["lastUpdateId"]), "bids": data.get("bids", []), "asks": data.get("asks", [])}
+
+    def get_account_assets(self, api_key: str, api_secret: str) -> tuple[dict[str, dict[str, float]], int]:
         if self.market_type != "spot":
             raise NotImplementedError("Futures account sync TODO")
-        from binance.client import Client
+        client = self._client(api_key, api_secret)
+        data = self._signed(client, "account", PRIORITY_ACCOUNT, client.get_account)
+        assets = {b["asset"]: {"free": float(b.get("free", 0)), "locked": float(b.get("locked", 0))} for b in data.get("balances", [])}
+        return assets, int(data.get("updateTime", 0))
 
-        client = Client(api_key, api_secret, testnet=self.testnet)
-        data = client.get_account()
-        by_asset = {b["asset"]: b for b in data.get("balances", [])}
-        usdt = by_asset.get("USDT", {"free": "0", "locked": "0"})
-        free = float(usdt.get("free", 0))
-        locked = float(usdt.get("locked", 0))
+    def get_account_balances(self, api_key: str, api_secret: str) -> dict[str, float]:
+        assets, _ = self.get_account_assets(api_key, api_secret)
+        usdt = assets.get("USDT", {"free": 0.0, "locked": 0.0})
         return {
-            "wallet_balance": free + locked,
-            "available_balance": free,
+            "wallet_balance": usdt["free"] + usdt["locked"],
+            "available_balance": usdt["free"],
         }
 
-    def place_market_order(self, api_key: str, api_secret: str, symbol: str, side: str, quantity: float) -> dict:
-        if self.market_type != "spot":
-            raise NotImplementedError("Futures live/demo order TODO")
-        from binance.client import Client
-
-        client = Client(api_key, api_secret, testnet=self.testnet)
-        result = client.create_order(symbol=symbol, side=side.upper(), type="MARKET", quantity=quantity)
+    @staticmethod
+    def _order_result(result: dict, side: str, quantity: float) -> dict:
+        qty = float(result.get("executedQty", quantity))
+        quote = float(result.get("cummulativeQuoteQty", 0) or 0)
         return {
-            "status": "filled",
-            "side": side.upper(),
-            "qty": float(result.get("executedQty", quantity)),
+            "status": str(result.get("status", "FILLED")).lower(),
+            "side": result.get("side", side).upper(),
+            "qty": qty,
+            "avg_price": quote / qty if qty > 0 and quote > 0 else 0.0,
             "exchange_order_id": result.get("orderId"),
+            "client_order_id": result.get("clientOrderId"),
         }
+
+    def place_market_order(self, api_key: str, api_secret: str, symbol: str, side: str, quantity: float, client_order_id: str | None = None) -> dict:
+        if self.market_type != "spot":
+            raise NotImplementedError("Futures live/demo order TODO")
+        client = self._client(api_key, api_secret)
+        params = {"symbol": symbol, "side": side.upper(), "type": "MARKET", "quantity": quantity}
+        if client_order_id:
+            # Ayni id ile tekrar gonderim borsada ikinci emir acmaz; durum bu id ile sorgulanabilir.
+            params["newClientOrderId"] = client_order_id
+        result = self._signed(client, "order", PRIORITY_ORDER, lambda: client.create_order(**params))
+        return self._order_result(result, side, quantity)
+
+    def get_order(self, api_key: str, api_secret: str, symbol: str, client_order_id: str) -> dict:
+        if self.market_type != "spot":
+            raise NotImplementedError("Futures live/demo order TODO")
+        client = self._client(api_key, api_secret)
+        result = self._signed(client, "queryOrder", PRIORITY_ORDER, lambda: client.get_order(symbol=symbol, origClientOrderId=client_order_id))
+        return self._order_result(result, result.get("side", ""), 0.0)
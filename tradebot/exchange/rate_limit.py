@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Iterator, Mapping
+from urllib.parse import urlparse
+
+from tradebot.utils import deadline
+
+# Dusuk deger once calisir: emir > hesap > market data (tick) > dashboard refresh.
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET = 2
+PRIORITY_UI = 3
+PRIORITY_NAMES = {PRIORITY_ORDER: "order", PRIORITY_ACCOUNT: "account", PRIORITY_MARKET: "market", PRIORITY_UI: "ui"}
+
+# Binance REQUEST_WEIGHT limitleri (dakika basina).
+WEIGHT_LIMITS = {"spot": 6000, "futures": 2400}
+# Dashboard refresh'leri bucket'in bu oranindan asagisina inemez; kalan pay emir/tick icin ayrilir.
+UI_RESERVE = 0.25
+
+_priority: ContextVar[int] = ContextVar("binance_priority", default=PRIORITY_MARKET)
+
+
+class RateLimitedError(RuntimeError):
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitTimeout(TimeoutError):
+    pass
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    # contextvars asyncio.to_thread'e kopyalanir; alt cagrilara parametre tasimaya gerek kalmaz.
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def _by_limit(limit: int, table: list[tuple[int, int]]) -> int:
+    for upper, weight in table:
+        if limit <= upper:
+            return weight
+    return table[-1][1]
+
+
+def endpoint_weight(market_type: str, endpoint: str, params: Mapping[str, Any] | None = None) -> int:
+    params = params or {}
+    limit = int(params.get("limit", 500))
+    if market_type == "futures":
+        if endpoint == "klines":
+            return _by_limit(limit, [(99, 1), (499, 2), (1000, 5), (10**9, 10)])
+        if endpoint == "depth":
+            return _by_limit(limit, [(50, 2), (100, 5), (500, 10), (10**9, 20)])
+        return {"exchangeInfo": 1, "ticker/price": 1 if "symbol" in params else 2, "account": 5, "balance": 5, "order": 1, "queryOrder": 1, "listenKey": 1}.get(endpoint, 1)
+    if endpoint == "depth":
+        return _by_limit(limit, [(100, 5), (500, 25), (1000, 50), (10**9, 250)])
+    return {"klines": 2, "exchangeInfo": 20, "ticker/price": 2 if "symbol" in params else 4, "account": 20, "order": 1, "queryOrder": 4, "userDataStream": 2}.get(endpoint, 1)
+
+
+class WeightLimiter:
+    # Token bucket (dakikalik weight limiti * headroom) + oncelik kuyrugu; sunucunun X-MBX-USED-WEIGHT-1M
+    # degeri bucket'i asagi cekerek yerel tahmini duzeltir, 429/418 Retry-After suresince tum istekler bekler.
+    def __init__(self, limit_per_minute: int, headroom: float = 0.8) -> None:
+        self.limit_per_minute = limit_per_minute
+        self.capacity = float(limit_per_minute) * headroom
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.server_used = 0
+        self.blocked_until = 0.0
+        self.granted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.waited_s = 0.0
+        self.throttled = 0
+        self.bans = 0
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, weight: int, priority: int | None = None, timeout: float | None = None) -> float:
+        priority = current_priority() if priority is None else priority
+        weight = min(float(weight), self.capacity)
+        floor = self.capacity * UI_RESERVE if priority >= PRIORITY_UI else 0.0
+        ticket = (priority, next(self._seq))
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self.blocked_until:
+                        wait = self.blocked_until - now
+                    elif self._waiters[0] != ticket:
+                        wait = 0.5
+                    elif self.tokens - weight >= floor:
+                        self.tokens -= weight
+                        self.granted[PRIORITY_NAMES.get(priority, "market")] += int(weight)
+                        waited = now - started
+                        self.waited_s += waited
+                        return waited
+                    else:
+                        wait = (weight + floor - self.tokens) / self.rate
+                    if deadline is not None:
+                        if now >= deadline:
+                            raise RateLimitTimeout(f"rate limiter: {int(weight)} weight not available within {timeout}s")
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(max(0.001, wait))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def observe(self, headers: Mapping[str, str] | None, status: int | None = None) -> None:
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        used = headers.get("x-mbx-used-weight-1m") or headers.get("x-mbx-used-weight")
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if used is not None:
+                self.server_used = int(used)
+                self.tokens = min(self.tokens, self.capacity - self.server_used)
+            if status in (429, 418):
+                retry_after = float(headers.get("retry-after", 60 if status == 429 else 120))
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.tokens = min(self.tokens, 0.0)
+                if status == 418:
+                    self.bans += 1
+                else:
+                    self.throttled += 1
+            self._cond.notify_all()
+
+    def metrics(self) -> dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "limit_per_minute": self.limit_per_minute,
+                "capacity": self.capacity,
+                "tokens": round(self.tokens, 2),
+                "used_weight_1m": self.server_used,
+                "used_pct": round(self.server_used / self.limit_per_minute * 100, 2) if self.limit_per_minute else 0.0,
+                "waiting": len(self._waiters),
+                "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+                "granted": dict(self.granted),
+                "waited_s": round(self.waited_s, 3),
+                "throttled_total": self.throttled,
+                "bans_total": self.bans,
+            }
+
+
+_LIMITERS: dict[str, WeightLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+_HEADROOM = 0.8
+
+
+def configure(headroom: float) -> None:
+    global _HEADROOM
+    with _LIMITERS_LOCK:
+        _HEADROOM = headroom
+        for limiter in _LIMITERS.values():
+            limiter.capacity = limiter.limit_per_minute * headroom
+            limiter.rate = limiter.capacity / 60.0
+            limiter.tokens = min(limiter.tokens, limiter.capacity)
+
+
+def get_limiter(base_url: str, market_type: str) -> WeightLimiter:
+    # Limit IP + host ailesi basina; ayni process'teki tum botlar/session'lar ayni bucket'i paylasir.
+    host = urlparse(base_url).netloc or base_url
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(host)
+        if limiter is None:
+            limiter = _LIMITERS[host] = WeightLimiter(WEIGHT_LIMITS.get(market_type, WEIGHT_LIMITS["spot"]), _HEADROOM)
+        return limiter
+
+
+def limiter_metrics() -> dict[str, dict[str, Any]]:
+    with _LIMITERS_LOCK:
+        limiters = dict(_LIMITERS)
+    return {host: limiter.metrics() for host, limiter in limiters.items()}
+
+
+def public_get(base_url: str, market_type: str, path: str, endpoint: str, params: dict[str, Any], timeout: float = 15.0, host: str | None = None) -> Any:
+    import requests
+
+    # Alternatif host'a giden istek de base_url'in bucket'ini kullanir (limit IP basinadir).
+    limiter = get_limiter(base_url, market_type)
+    limiter.acquire(endpoint_weight(market_type, endpoint, params), timeout=deadline.remaining())
+    resp = requests.get(f"{host or base_url}{path}", params=params, timeout=timeout)
+    limiter.observe(resp.headers, resp.status_code)
+    if resp.status_code in (429, 418):
+        raise RateLimitedError(f"binance {resp.status_code} on {endpoint}", float(resp.headers.get("Retry-After", 60)))
+    resp.raise_for_status()
+    return resp.json()
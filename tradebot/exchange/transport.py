@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextvars
+import random
+import threading
+import time
+from typing import Any
+
+from tradebot.exchange.rate_limit import RateLimitedError, public_get
+from tradebot.utils import deadline
+
+# Binance'in ayni API'yi sunan alternatif host'lari; testnet/futures icin alternatif yok.
+ALTERNATE_HOSTS = {
+    "https://api.binance.com": [
+        "https://api.binance.com",
+        "https://api1.binance.com",
+        "https://api2.binance.com",
+        "https://api3.binance.com",
+        "https://api-gcp.binance.com",
+    ],
+}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def _is_client_error(exc: Exception) -> bool:
+    # 4xx (429/418 haric) istek hatasidir; endpoint'in coktugu anlamina gelmez.
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status is not None and 400 <= status < 500 and status not in (418, 429)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = "closed"
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before(self) -> None:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    raise CircuitOpenError(f"circuit open ({self.failures} consecutive failures)")
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "half_open":
+                if self._trial:
+                    raise CircuitOpenError("circuit half-open: trial request in flight")
+                self._trial = True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class HostStats:
+    __slots__ = ("ewma_ms", "requests", "errors", "wins")
+
+    def __init__(self) -> None:
+        self.ewma_ms: float | None = None
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+
+    def observe(self, ms: float, ok: bool, alpha: float = 0.2) -> None:
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+            ms = max(ms, 5_000.0)
+        self.ewma_ms = ms if self.ewma_ms is None else (1 - alpha) * self.ewma_ms + alpha * ms
+
+
+class Transport:
+    # GET istekleri: endpoint basina circuit breaker, jitter'li exponential backoff ile retry,
+    # istege bagli hedge (yavas kalan istege paralel ikinci host). Tum denemeler ayni weight bucket'indan gecer.
+    def __init__(
+        self,
+        retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_cap: float = 4.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        hedge_enabled: bool = False,
+        hedge_after_ms: float = 300.0,
+        timeout: float = 15.0,
+    ) -> None:
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_after_ms = hedge_after_ms
+        self.timeout = timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.hosts: dict[str, HostStats] = {}
+        self.hedged = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = self.breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            return breaker
+
+    def _stats(self, host: str) -> HostStats:
+        with self._lock:
+            stats = self.hosts.get(host)
+            if stats is None:
+                stats = self.hosts[host] = HostStats()
+            return stats
+
+    def ranked_hosts(self, base_url: str) -> list[str]:
+        hosts = ALTERNATE_HOSTS.get(base_url, [base_url])
+        # Olculmemis host'lar once (sirayla) denenir; hepsi olculunce EWMA gecikmesi en dusuk olan one gecer.
+        return sorted(hosts, key=lambda h: (self._stats(h).ewma_ms is not None, self._stats(h).ewma_ms or 0.0, hosts.index(h)))
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    def _attempt(self, host: str, base_url: str, market_type: str, path: str, endpoint: str, params: dict) -> Any:
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = public_get(base_url, market_type, path, endpoint, params, deadline.cap_timeout(self.timeout), host=host)
+            ok = True
+            return result
+        finally:
+            self._stats(host).observe((time.perf_counter() - started) * 1000, ok)
+
+    def _pool_get(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="binance-hedge")
+            return self._pool
+
+    def _hedged(self, hosts: list[str], *args) -> Any:
+        pool = self._pool_get()
+        # Hedge thread'leri de tick asamasinin deadline'ini gorur.
+        primary = pool.submit(contextvars.copy_context().run, self._attempt, hosts[0], *args)
+        done, _ = wait([primary], timeout=self.hedge_after_ms / 1000)
+        if done:
+            result = primary.result()
+            self._stats(hosts[0]).wins += 1
+            return result
+        self.hedged += 1
+        pending = {primary: hosts[0], pool.submit(contextvars.copy_context().run, self._attempt, hosts[1], *args): hosts[1]}
+        error: Exception | None = None
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                host = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    error = exc
+                    continue
+                # Kaybeden istek iptal edilemez (requests); sonucu yok sayilir, gecikmesi yine olculur.
+                self._stats(host).wins += 1
+                return result
+        raise error  # type: ignore[misc]
+
+    def get_json(self, base_url: str, market_type: str, path: str, endpoint: str, params: dict) -> Any:
+        breaker = self.breaker(f"{base_url}{path}")
+        last_error: Exception | None = None
+        for attempt in range(max(1, self.retries)):
+            # Asama suresi bittiyse breaker'a dokunmadan cikilir; bu bir endpoint hatasi degildir.
+            deadline.cap_timeout(self.timeout)
+            breaker.before()
+            hosts = self.ranked_hosts(base_url)
+            # Her retry bir sonraki en hizli host'a gider.
+            hosts = hosts[attempt % len(hosts) :] + hosts[: attempt % len(hosts)]
+            args = (base_url, market_type, path, endpoint, params)
+            try:
+                if self.hedge_enabled and len(hosts) > 1:
+                    result = self._hedged(hosts, *args)
+                else:
+                    result = self._attempt(hosts[0], *args)
+                breaker.success()
+                return result
+            except RateLimitedError:
+                breaker.success()
+                raise
+            except Exception as exc:
+                if _is_client_error(exc):
+                    breaker.success()
+                    raise
+                breaker.failure()
+                last_error = exc
+            if attempt + 1 < self.retries:
+                pause = self.backoff(attempt)
+                left = deadline.remaining()
+                if left is not None and left <= pause:
+                    break
+                self.retried += 1
+                # Sadece bu istegin worker thread'i bekler; tick'in diger istekleri ve UI etkilenmez.
+                time.sleep(pause)
+        raise last_error  # type: ignore[misc]
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            hosts = dict(self.hosts)
+            breakers = dict(self.breakers)
+        return {
+            "hedged_total": self.hedged,
+            "retried_total": self.retried,
+            "hosts": {
+                host: {"ewma_ms": round(s.ewma_ms or 0.0, 2), "requests": s.requests, "errors": s.errors, "wins": s.wins}
+                for host, s in hosts.items()
+            },
+            "breakers": {key: {"state": b.state, "failures": b.failures, "trips": b.trips} for key, b in breakers.items()},
+        }
+
+
+_TRANSPORT = Transport()
+
+
+def configure(**settings: Any) -> Transport:
+    for name, value in settings.items():
+        setattr(_TRANSPORT, name, value)
+    with _TRANSPORT._lock:
+        for breaker in _TRANSPORT.breakers.values():
+            breaker.failure_threshold = _TRANSPORT.failure_threshold
+            breaker.reset_seconds = _TRANSPORT.reset_seconds
+    return _TRANSPORT
+
+
+def get_transport() -> Transport:
+    return _TRANSPORT
+
+
+def get_json(base_url: str, market_type: str, path: str, endpoint: str, params: dict) -> Any:
+    return _TRANSPORT.get_json(base_url, market_type, path, endpoint, params)
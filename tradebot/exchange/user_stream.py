@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import json
+import random
+import threading
+import time
+from typing import Any, Callable
+
+from tradebot.loggingx.logger import get_logger
+
+QUOTE_ASSET = "USDT"
+
+
+class AccountState:
+    # User data stream olaylariyla guncellenen bakiye/emir durumu. Asset basina son guncelleme
+    # zamani tutulur; gec gelen (daha eski) olay ya da REST cevabi yeni veriyi ezmez.
+    def __init__(self, max_orders: int = 500) -> None:
+        self.balances: dict[str, tuple[float, float]] = {}
+        self.orders: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self.max_orders = max_orders
+        self.live = False
+        self.reconciled_at = 0.0
+        self.last_event_at = 0.0
+        self.events: dict[str, int] = {}
+        self.version = 0
+        self._stamps: dict[str, int] = {}
+        # executionReport dinleyicileri (emir yoneticisi); kilit disinda cagrilir.
+        self.listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def apply_event(self, event: dict[str, Any]) -> str | None:
+        # Ham /ws/<listenKey> akisi: her mesaj dogrudan olay payload'idir ({"e": ..., ...}), sarmalayici yoktur.
+        kind = event.get("e")
+        with self._lock:
+            if kind == "outboundAccountPosition":
+                stamp = int(event.get("u", event.get("E", 0)))
+                for row in event.get("B", []):
+                    asset = row["a"]
+                    # balanceUpdate (deposit/transfer) ardindan gelen bu olay mutlak bakiyeyi tasir.
+                    if stamp >= self._stamps.get(asset, 0):
+                        self.balances[asset] = (float(row["f"]), float(row["l"]))
+                        self._stamps[asset] = stamp
+            elif kind == "executionReport":
+                self._apply_execution(event)
+            elif kind is None:
+                return None
+            self.events[kind] = self.events.get(kind, 0) + 1
+            self.last_event_at = time.time()
+            self.version += 1
+        if kind == "executionReport":
+            for listener in self.listeners:
+                listener(event)
+        return kind
+
+    def _apply_execution(self, event: dict[str, Any]) -> None:
+        key = event.get("c") or str(event.get("i"))
+        executed = float(event.get("z", 0.0))
+        quote = float(event.get("Z", 0.0))
+        self.orders[key] = {
+            "symbol": event.get("s"),
+            "side": event.get("S"),
+            "status": event.get("X"),
+            "order_id": event.get("i"),
+            "executed_qty": executed,
+            "avg_price": quote / executed if executed > 0 else 0.0,
+            "updated": event.get("T", event.get("E")),
+        }
+        self.orders.move_to_end(key)
+        while len(self.orders) > self.max_orders:
+            self.orders.popitem(last=False)
+
+    def reconcile(self, assets: dict[str, dict[str, float]], update_time: int = 0) -> dict[str, float]:
+        # REST hesap cevabi ile durum hizalanir; stream'in kacirdigi degisiklikler drift olarak doner.
+        drift = {}
+        with self._lock:
+            for asset in set(assets) | set(self.balances):
+                if update_time and update_time < self._stamps.get(asset, 0):
+                    continue
+                row = assets.get(asset, {"free": 0.0, "locked": 0.0})
+                new = (float(row["free"]), float(row["locked"]))
+                old = self.balances.get(asset, (0.0, 0.0))
+                if abs(sum(new) - sum(old)) > 1e-12:
+                    drift[asset] = sum(new) - sum(old)
+                self.balances[asset] = new
+                self._stamps[asset] = max(update_time, self._stamps.get(asset, 0))
+            self.reconciled_at = time.time()
+            self.version += 1
+        return drift
+
+    def balance(self, asset: str) -> tuple[float, float]:
+        with self._lock:
+            return self.balances.get(asset, (0.0, 0.0))
+
+    def quote_balances(self, quote: str = QUOTE_ASSET) -> dict[str, float]:
+        free, locked = self.balance(quote)
+        return {"wallet_balance": free + locked, "available_balance": free}
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "live": self.live,
+                "assets": len(self.balances),
+                "orders": len(self.orders),
+                "events": dict(self.events),
+                "event_age_s": round(time.time() - self.last_event_at, 1) if self.last_event_at else None,
+                "reconcile_age_s": round(time.time() - self.reconciled_at, 1) if self.reconciled_at else None,
+            }
+
+
+class UserDataStream:
+    # listenKey yasam dongusu: olustur -> websocket -> REST reconcile -> periyodik keepalive/reconcile;
+    # baglanti koparsa ya da listenKeyExpired gelirse jitter'li backoff ile yeni key alinip yeniden baglanilir.
+    def __init__(
+        self,
+        client,
+        api_key: str,
+        api_secret: str,
+        state: AccountState | None = None,
+        keepalive_seconds: float = 1800.0,
+        reconcile_seconds: float = 300.0,
+        backoff_cap: float = 60.0,
+        connect: Callable[[str], Any] | None = None,
+    ) -> None:
+        self.client = client
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.state = state or AccountState()
+        self.keepalive_seconds = keepalive_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.backoff_cap = backoff_cap
+        self._connect = connect
+        self.connected = False
+        self.connects = 0
+        self.keepalives = 0
+        self.reconciles = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.logger = get_logger("tradebot.user_stream")
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+
+    def healthy(self) -> bool:
+        return self.connected and self.state.live
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="binance-user-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped = True
+        if self._loop is not None and self._task is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self.state.live = False
+
+    def reconcile(self) -> dict[str, float]:
+        assets, update_time = self.client.get_account_assets(self.api_key, self.api_secret)
+        drift = self.state.reconcile(assets, update_time)
+        self.reconciles += 1
+        if drift and self.reconciles > 1:
+            self.logger.warning("user_stream.drift", extra={"extra_data": {"drift": drift}})
+        return drift
+
+    def _open(self, url: str):
+        if self._connect is not None:
+            return self._connect(url)
+        from websockets.asyncio.client import connect
+
+        return connect(url, open_timeout=10, ping_interval=20, ping_timeout=20, max_queue=1024)
+
+    async def _run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        attempt = 0
+        try:
+            while not self._stopped:
+                try:
+                    await self._session()
+                    attempt = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    self.errors += 1
+                    self.last_error = str(exc)
+                    attempt += 1
+                    self.logger.warning("user_stream.disconnected", extra={"extra_data": {"error": str(exc), "attempt": attempt}})
+                if not self._stopped:
+                    await asyncio.sleep(random.uniform(0, min(self.backoff_cap, 2**attempt)) if attempt else 1.0)
+        except asyncio.CancelledError:
+            pass
+
+    async def _session(self) -> None:
+        key = await asyncio.to_thread(self.client.create_listen_key, self.api_key)
+        tasks: list[asyncio.Task] = []
+        try:
+            async with self._open(f"{self.client.stream_url}/{key}") as ws:
+                self.connected = True
+                self.connects += 1
+                # Once abone olunur, sonra REST snapshot alinir; arada gelen olaylar soket kuyrugunda bekler.
+                await asyncio.to_thread(self.reconcile)
+                self.state.live = True
+                self.logger.info("user_stream.connected", extra={"extra_data": {"connects": self.connects}})
+                tasks.append(asyncio.create_task(self._every(self.keepalive_seconds, self._keepalive, key)))
+                tasks.append(asyncio.create_task(self._every(self.reconcile_seconds, self.reconcile)))
+                async for message in ws:
+                    if self.state.apply_event(json.loads(message)) == "listenKeyExpired":
+                        self.logger.info("user_stream.key_expired")
+                        return
+        finally:
+            self.connected = False
+            self.state.live = False
+            for task in tasks:
+                task.cancel()
+            try:
+                await asyncio.to_thread(self.client.close_listen_key, self.api_key, key)
+            except Exception:
+                pass
+
+    def _keepalive(self, key: str) -> None:
+        self.client.keepalive_listen_key(self.api_key, key)
+        self.keepalives += 1
+
+    async def _every(self, seconds: float, fn, *args) -> None:
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await asyncio.to_thread(fn, *args)
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = str(exc)
+                self.logger.warning("user_stream.maintenance_failed", extra={"extra_data": {"error": str(exc)}})
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            **self.state.metrics(),
+            "connected": self.connected,
+            "connects_total": self.connects,
+            "keepalives_total": self.keepalives,
+            "reconciles_total": self.reconciles,
+            "errors_total": self.errors,
+            "last_error": self.last_error,
+        }
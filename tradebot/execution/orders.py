@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Callable
+
+from tradebot.loggingx.logger import get_logger
+
+# "unknown" terminal degildir: sonucu belirsiz emir acik indekste kalir ve borsa gercek durumu donene kadar sorgulanir.
+TERMINAL_STATUSES = {"filled", "canceled", "rejected", "expired", "expired_in_match"}
+# Gec gelen (eski) rapor ileri gitmis durumu geri almaz; "unknown" sonradan gelen raporla duzelir.
+STATUS_RANK = {"unknown": 0, "pending_new": 0, "new": 1, "partially_filled": 2, "pending_cancel": 2}
+
+# Binance hata kodlari: emir durumu bilinmiyor (-1006/-1007), ayni clientOrderId acik emirde (-2010 Duplicate), emir yok (-2013).
+UNKNOWN_OUTCOME_CODES = {-1006, -1007}
+ORDER_NOT_FOUND_CODE = -2013
+
+
+def client_order_id(account: str, symbol: str, side: str, intent: str) -> str:
+    # Ayni niyet (hesap, sembol, yon, karar) her zaman ayni id'yi uretir; Binance siniri 36 karakter.
+    digest = hashlib.sha1(f"{account}|{symbol}|{side.upper()}|{intent}".encode()).hexdigest()[:24]
+    return f"tb-{digest}"
+
+
+def _error_code(exc: Exception) -> int | None:
+    code = getattr(exc, "code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_duplicate(exc: Exception) -> bool:
+    return _error_code(exc) == -2010 and "duplicate" in str(exc).lower()
+
+
+def _outcome_unknown(exc: Exception) -> bool:
+    # Baglanti/timeout ya da 5xx: istek borsaya ulasmis olabilir, emir durumu sorgulanmadan tekrar gonderilmez.
+    if _error_code(exc) in UNKNOWN_OUTCOME_CODES:
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return int(status) >= 500
+    # requests hatalari da OSError'dur.
+    return isinstance(exc, OSError)
+
+
+@dataclass(slots=True)
+class OrderRecord:
+    client_order_id: str
+    symbol: str
+    side: str
+    qty: float
+    status: str = "pending_new"
+    exchange_order_id: int | None = None
+    executed_qty: float = 0.0
+    cum_quote: float = 0.0
+    attempts: int = 0
+    created_at: float = 0.0
+    submitted_at: float | None = None
+    acked_at: float | None = None
+    filled_at: float | None = None
+    error: str | None = None
+
+    @property
+    def terminal(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    @property
+    def avg_price(self) -> float:
+        return self.cum_quote / self.executed_qty if self.executed_qty > 0 else 0.0
+
+    @property
+    def submit_to_ack_ms(self) -> float | None:
+        if self.submitted_at is None or self.acked_at is None:
+            return None
+        return round((self.acked_at - self.submitted_at) * 1000, 3)
+
+    @property
+    def ack_to_fill_ms(self) -> float | None:
+        if self.acked_at is None or self.filled_at is None:
+            return None
+        return round((self.filled_at - self.acked_at) * 1000, 3)
+
+    def result(self) -> dict[str, Any]:
+        out = {
+            "status": self.status,
+            "side": self.side,
+            "qty": self.executed_qty,
+            "avg_price": self.avg_price,
+            "client_order_id": self.client_order_id,
+            "exchange_order_id": self.exchange_order_id,
+            "attempts": self.attempts,
+            "submit_to_ack_ms": self.submit_to_ack_ms,
+            "ack_to_fill_ms": self.ack_to_fill_ms,
+        }
+        if self.error and self.status in {"rejected", "unknown"}:
+            out["details"] = self.error
+        return out
+
+
+class OrderTable:
+    # clientOrderId ana anahtar; borsa order id ve sembol basina acik emirler ikincil indeks.
+    # Sinir asilinca en eski kapanmis emirler atilir, acik emirler tutulur.
+    def __init__(self, max_orders: int = 500) -> None:
+        self.max_orders = max_orders
+        self._orders: OrderedDict[str, OrderRecord] = OrderedDict()
+        self._by_exchange_id: dict[int, str] = {}
+        self._open: dict[str, set[str]] = {}
+        self._lock = threading.RLock()
+
+    def add(self, record: OrderRecord) -> OrderRecord:
+        with self._lock:
+            existing = self._orders.get(record.client_order_id)
+            if existing is not None:
+                return existing
+            self._orders[record.client_order_id] = record
+            self._open.setdefault(record.symbol, set()).add(record.client_order_id)
+            self._evict()
+            return record
+
+    def _evict(self) -> None:
+        if len(self._orders) <= self.max_orders:
+            return
+        for cid in [cid for cid, record in self._orders.items() if record.terminal][: len(self._orders) - self.max_orders]:
+            record = self._orders.pop(cid)
+            self._by_exchange_id.pop(record.exchange_order_id, None)
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def get(self, cid: str) -> OrderRecord | None:
+        with self._lock:
+            return self._orders.get(cid)
+
+    def by_exchange_id(self, order_id: int) -> OrderRecord | None:
+        with self._lock:
+            cid = self._by_exchange_id.get(order_id)
+            return self._orders.get(cid) if cid is not None else None
+
+    def open_orders(self, symbol: str | None = None) -> list[OrderRecord]:
+        with self._lock:
+            symbols = [symbol] if symbol is not None else list(self._open)
+            return [self._orders[cid] for s in symbols for cid in self._open.get(s, ()) if cid in self._orders]
+
+    def update(
+        self,
+        cid: str,
+        status: str,
+        executed_qty: float | None = None,
+        cum_quote: float | None = None,
+        exchange_order_id: int | None = None,
+        now: float | None = None,
+        error: str | None = None,
+    ) -> OrderRecord | None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            record = self._orders.get(cid)
+            if record is None:
+                return None
+            if record.terminal and status != record.status:
+                return record
+            if STATUS_RANK.get(status, 3) < STATUS_RANK.get(record.status, 3):
+                return record
+            if executed_qty is not None and executed_qty >= record.executed_qty:
+                record.executed_qty = executed_qty
+                if cum_quote is not None:
+                    record.cum_quote = cum_quote
+            if exchange_order_id is not None:
+                record.exchange_order_id = exchange_order_id
+                self._by_exchange_id[exchange_order_id] = cid
+            if status not in {"pending_new", "rejected", "unknown"} and record.acked_at is None:
+                record.acked_at = now
+            if status == "filled" and record.filled_at is None:
+                record.filled_at = now
+            record.status = status
+            if error is not None:
+                record.error = error
+            if record.terminal:
+                self._open.get(record.symbol, set()).discard(cid)
+            else:
+                self._open.setdefault(record.symbol, set()).add(cid)
+            return record
+
+    def records(self) -> list[OrderRecord]:
+        with self._lock:
+            return list(self._orders.values())
+
+    def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for record in self.records():
+            counts[record.status] = counts.get(record.status, 0) + 1
+        return counts
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))], 3)
+
+
+class OrderManager:
+    # Emirler arka plan thread'inde gonderilir; tick sadece ack/fill icin sinirli sure bekler.
+    # Sonucu belirsiz istekten sonra ayni clientOrderId ile sorgulanir, emir borsada yoksa ayni id ile tekrar gonderilir.
+    def __init__(
+        self,
+        client,
+        table: OrderTable | None = None,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.client = client
+        self.table = table if table is not None else OrderTable()
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.clock = clock
+        self.submitted = 0
+        self.retries = 0
+        self.recovered = 0
+        self.deduplicated = 0
+        self.logger = get_logger("tradebot.orders")
+        self._futures: dict[str, Future] = {}
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, api_key: str, api_secret: str, symbol: str, side: str, qty: float, cid: str) -> Future:
+        with self._lock:
+            existing = self._futures.get(cid)
+            if existing is not None:
+                # Ayni niyet ikinci kez gonderilmez; ilk gonderimin sonucu paylasilir.
+                self.deduplicated += 1
+                return existing
+            record = self.table.add(OrderRecord(cid, symbol, side.upper(), qty, created_at=self.clock()))
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="orders")
+            future = self._pool.submit(self._send, record, api_key, api_secret)
+            self._futures[cid] = future
+            while len(self._futures) > self.table.max_orders:
+                self._futures.pop(next(iter(self._futures)))
+            self.submitted += 1
+            return future
+
+    def _send(self, record: OrderRecord, api_key: str, api_secret: str) -> OrderRecord:
+        cid = record.client_order_id
+        needs_send = True
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                time.sleep(random.uniform(0, self.retry_backoff * 2 ** (attempt - 1)))
+            try:
+                if needs_send:
+                    record.attempts += 1
+                    if record.submitted_at is None:
+                        record.submitted_at = self.clock()
+                    self._apply(record, self.client.place_market_order(api_key, api_secret, record.symbol, record.side, record.qty, client_order_id=cid))
+                    return record
+                found = self.client.get_order(api_key, api_secret, record.symbol, cid)
+                self.recovered += 1
+                self._apply(record, found)
+                return record
+            except Exception as exc:
+                record.error = str(exc)
+                if not needs_send and _error_code(exc) == ORDER_NOT_FOUND_CODE:
+                    # Emir borsaya hic ulasmamis: ayni id ile tekrar gonderilebilir.
+                    needs_send = True
+                    continue
+                if needs_send and not (_is_duplicate(exc) or _outcome_unknown(exc)):
+                    self.table.update(cid, "rejected", now=self.clock(), error=str(exc))
+                    self.logger.warning("order.rejected", extra={"extra_data": {"client_order_id": cid, "error": str(exc)}})
+                    return record
+                # Sonuc bilinmiyor: tekrar gondermeden once durum sorgulanir.
+                needs_send = False
+                self.logger.warning("order.outcome_unknown", extra={"extra_data": {"client_order_id": cid, "attempt": attempt + 1, "error": str(exc)}})
+        self.table.update(cid, "unknown", now=self.clock(), error=record.error)
+        return record
+
+    def resolve_unknown(self, api_key: str, api_secret: str) -> int:
+        # Denemeler bitince sonucu belirsiz kalan emirler sonraki tick'lerde ayni id ile sorgulanir;
+        # borsa emri hic gormediyse (-2013) rejected olur, sorgu yine basarisizsa unknown kalir.
+        resolved = 0
+        for record in self.table.open_orders():
+            if record.status != "unknown":
+                continue
+            cid = record.client_order_id
+            try:
+                found = self.client.get_order(api_key, api_secret, record.symbol, cid)
+            except Exception as exc:
+                if _error_code(exc) == ORDER_NOT_FOUND_CODE:
+                    self.table.update(cid, "rejected", now=self.clock(), error=str(exc))
+                    self.logger.warning("order.rejected", extra={"extra_data": {"client_order_id": cid, "error": str(exc)}})
+                    resolved += 1
+                continue
+            self.recovered += 1
+            self._apply(record, found)
+            resolved += 1
+        return resolved
+
+    def _apply(self, record: OrderRecord, result: dict[str, Any]) -> None:
+        status = str(result.get("status") or "new").lower()
+        qty = float(result.get("qty", 0.0) or 0.0)
+        self.table.update(
+            record.client_order_id,
+            status,
+            executed_qty=qty,
+            cum_quote=qty * float(result.get("avg_price", 0.0) or 0.0),
+            exchange_order_id=result.get("exchange_order_id"),
+            now=self.clock(),
+        )
+        self.logger.info("order.update", extra={"extra_data": record.result()})
+
+    def on_execution_report(self, event: dict[str, Any]) -> None:
+        # User data stream executionReport'u: ack sonrasi kismi/tam dolum ve iptaller buradan gelir.
+        cid = event.get("c")
+        if event.get("X") == "CANCELED" and event.get("C"):
+            cid = event["C"]
+        if not cid:
+            return
+        self.table.update(
+            cid,
+            str(event.get("X", "NEW")).lower(),
+            executed_qty=float(event.get("z", 0.0)),
+            cum_quote=float(event.get("Z", 0.0)),
+            exchange_order_id=event.get("i"),
+            now=self.clock(),
+        )
+
+    def wait(self, future: Future, timeout: float) -> OrderRecord | None:
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            return None
+
+    def metrics(self) -> dict[str, Any]:
+        records = self.table.records()
+        ack = [r.submit_to_ack_ms for r in records if r.submit_to_ack_ms is not None]
+        fill = [r.ack_to_fill_ms for r in records if r.ack_to_fill_ms is not None]
+        return {
+            "orders": self.table.counts(),
+            "open": len(self.table.open_orders()),
+            "submitted_total": self.submitted,
+            "retries_total": self.retries,
+            "recovered_total": self.recovered,
+            "deduplicated_total": self.deduplicated,
+            "submit_to_ack_ms": {"p50": _percentile(ack, 0.5), "p95": _percentile(ack, 0.95)},
+            "ack_to_fill_ms": {"p50": _percentile(fill, 0.5), "p95": _percentile(fill, 0.95)},
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 import math
+from pathlib import Path
+import threading
+import time
 
 from tradebot.config.settings import BotConfig
+from tradebot.data.order_book import OrderBook
 from tradebot.exchange.binance_client import BinanceClient
+from tradebot.exchange.user_stream import AccountState
+from tradebot.execution.orders import OrderManager, OrderTable, client_order_id
 from tradebot.execution.paper import PaperWallet
 from tradebot.history.store import InMemoryHistory
 
@@ -14,6 +20,16 @@ class ExecutionService:
         self.history = history
         self.wallet = wallet
         self.exchange_client = exchange_client
+        self._rules_cache: dict[str, tuple[float, dict]] = {}
+        self.order_books: dict[str, OrderBook] = {}
+        self.account_state: AccountState | None = None
+        # Demo/live: bu botun kendi emirlerinin dolumlarindan olusan pozisyon (symbol -> [qty, avg_price]).
+        # Hesaptaki diger bakiye (elle alinan, baska bot) satis miktarina katilmaz.
+        self.positions: dict[str, list[float]] = {}
+        # Tick beklemesi bittiginde dolumu tamamlanmamis emirler: cid -> [islenmis qty, islenmis quote].
+        self._unsettled: dict[str, list[float]] = {}
+        self._settle_lock = threading.Lock()
+        self.orders = OrderManager(exchange_client, OrderTable(cfg.order_table_size), max_retries=cfg.order_max_retries)
 
     @staticmethod
     def _round_step(qty: float, step: float) -> float:
@@ -24,7 +40,54 @@ class ExecutionService:
             return self.cfg.binance_test_api_key or self.cfg.binance_api_key, self.cfg.binance_test_api_secret or self.cfg.binance_api_secret
         return self.cfg.binance_api_key, self.cfg.binance_api_secret
 
-    def execute(self, symbol: str, price: float, decision: dict, emergency_stop: bool = False) -> dict:
+    def cached_symbol_rules(self, symbol: str) -> dict | None:
+        cached = self._rules_cache.get(symbol)
+        if cached is None or time.time() - cached[0] > self.cfg.symbol_rules_ttl_seconds:
+            return None
+        return cached[1]
+
+    def symbol_rules(self, symbol: str) -> dict:
+        rules = self.cached_symbol_rules(symbol)
+        if rules is None:
+            rules = self.exchange_client.get_symbol_rules(symbol)
+            self.store_symbol_rules(symbol, rules)
+        return rules
+
+    def store_symbol_rules(self, symbol: str, rules: dict) -> None:
+        self._rules_cache[symbol] = (time.time(), rules)
+
+    def clear_symbol_rules(self) -> None:
+        self._rules_cache.clear()
+
+    def position(self, symbol: str) -> tuple[float, float]:
+        if self.cfg.bot_mode == "paper":
+            return self.wallet.base_qty, self.wallet.entry_price
+        qty, avg = self.positions.get(symbol, [0.0, 0.0])
+        return qty, avg
+
+    def _own_fill(self, symbol: str, side: str, qty: float, price: float) -> float:
+        position = self.positions.setdefault(symbol, [0.0, 0.0])
+        if side == "BUY":
+            cost = position[0] * position[1] + qty * price
+            position[0] += qty
+            position[1] = cost / position[0] if position[0] > 0 else 0.0
+            return 0.0
+        closed = min(qty, position[0])
+        realized = (price - position[1]) * closed if position[1] > 0 else 0.0
+        position[0] -= closed
+        if position[0] <= 1e-12:
+            del self.positions[symbol]
+        return realized
+
+    def execute(
+        self,
+        symbol: str,
+        price: float,
+        decision: dict,
+        emergency_stop: bool = False,
+        balances: dict[str, float] | None = None,
+        intent: str | None = None,
+    ) -> dict:
         action = decision["action"]
         size_pct = decision.get("position_size_pct", 0.0) / 100.0
         if action == "hold":
@@ -34,17 +97,24 @@ class ExecutionService:
         if self.cfg.bot_mode == "live" and not self.cfg.live_trading_enabled:
             return {"status": "blocked", "details": "Live guard"}
 
-        rules = self.exchange_client.get_symbol_rules(symbol)
+        rules = self.symbol_rules(symbol)
         if self.cfg.bot_mode == "paper":
             result = self._execute_paper(symbol, action, price, size_pct, rules)
         else:
             try:
-                result = self._execute_exchange(symbol, action, price, size_pct, rules)
+                result = self._execute_exchange(symbol, action, price, size_pct, rules, balances, intent)
             except Exception as exc:
                 return {"status": "error", "details": f"exchange execution failed: {exc}"}
         return result
 
+    def _depth_book(self, symbol: str) -> OrderBook | None:
+        book = self.order_books.get(symbol)
+        if book is None or not self.cfg.paper_depth_fill or not book.is_usable(self.cfg.depth_max_age_seconds):
+            return None
+        return book
+
     def _execute_paper(self, symbol: str, action: str, price: float, size_pct: float, rules: dict) -> dict:
+        book = self._depth_book(symbol)
         if action == "buy":
             quote_amount = self.wallet.available_balance * size_pct
             if quote_amount < rules["min_notional"]:
@@ -52,20 +122,64 @@ class ExecutionService:
             qty = self._round_step(quote_amount / price, rules["step_size"])
             if qty < rules["min_qty"]:
                 return {"status": "rejected", "details": "min_qty"}
-            filled = self.wallet.buy(price, qty * price)
-            self.history.add_order(symbol, "BUY", filled, price, self.cfg.bot_mode, "FILLED")
-            return {"status": "filled", "side": "BUY", "qty": filled}
+            depth = None
+            if book is not None:
+                # Emir defteri gezilir: fiyat VWAP olur, derinlik yetmezse kalan kısım dolmaz.
+                depth = book.walk("BUY", qty=qty)
+                qty = self._round_step(depth.filled_qty, rules["step_size"])
+                if qty <= 0 or qty < rules["min_qty"] or depth.avg_price <= 0:
+                    return {"status": "rejected", "details": "insufficient book depth"}
+                price = depth.avg_price
+            fee_rate = self._paper_fee_rate()
+            filled = self.wallet.buy(price, qty * price * (1 + fee_rate))
+            fee = filled * price * fee_rate
+            status = "PARTIALLY_FILLED" if depth is not None and depth.partial else "FILLED"
+            self.history.add_order(symbol, "BUY", filled, price, self.cfg.bot_mode, status, fee=fee)
+            return {**self._paper_result(status, "BUY", filled, price, depth), "fee": fee}
 
         if action in {"sell", "close"}:
             qty = self.wallet.base_qty if action == "close" else self.wallet.base_qty * size_pct
             qty = self._round_step(qty, rules["step_size"])
+            if qty <= 0:
+                return {"status": "noop", "details": "No open position"}
+            depth = None
+            if book is not None:
+                depth = book.walk("SELL", qty=qty)
+                qty = self._round_step(depth.filled_qty, rules["step_size"])
+                # Derinlik adima yuvarlaninca sifir dolum kalirsa gecmise bos emir yazilmaz.
+                if qty <= 0 or depth.avg_price <= 0:
+                    return {"status": "rejected", "details": "insufficient book depth"}
+                price = depth.avg_price
             filled, realized = self.wallet.sell(price, qty)
-            self.history.add_order(symbol, "SELL", filled, price, self.cfg.bot_mode, "FILLED")
-            return {"status": "filled", "side": "SELL", "qty": filled, "realized_pnl": realized}
+            fee = filled * price * self._paper_fee_rate()
+            status = "PARTIALLY_FILLED" if depth is not None and depth.partial else "FILLED"
+            self.history.add_order(symbol, "SELL", filled, price, self.cfg.bot_mode, status, realized_pnl=realized, fee=fee)
+            return {**self._paper_result(status, "SELL", filled, price, depth), "realized_pnl": realized, "fee": fee}
 
         return {"status": "hold", "details": "unsupported"}
 
-    def _execute_exchange(self, symbol: str, action: str, price: float, size_pct: float, rules: dict) -> dict:
+    def _paper_fee_rate(self) -> float:
+        # Ucreti defter keser (LedgerWallet); tek sembollu PaperWallet ucretsizdir.
+        ledger = getattr(self.wallet, "ledger", None)
+        return ledger.fee_rate if ledger is not None else 0.0
+
+    @staticmethod
+    def _paper_result(status: str, side: str, filled: float, price: float, depth) -> dict:
+        result = {"status": status.lower(), "side": side, "qty": filled}
+        if depth is not None:
+            result.update({"avg_price": price, "slippage_bps": round(depth.slippage_bps, 3), "levels": depth.levels_used, "requested_qty": depth.requested_qty})
+        return result
+
+    def _execute_exchange(
+        self,
+        symbol: str,
+        action: str,
+        price: float,
+        size_pct: float,
+        rules: dict,
+        balances: dict[str, float] | None = None,
+        intent: str | None = None,
+    ) -> dict:
         api_key, api_secret = self._active_api_credentials()
         if not api_key or not api_secret:
             return {"status": "blocked", "details": "API key/secret missing for selected testnet/live profile"}
@@ -73,26 +187,126 @@ class ExecutionService:
         if self.cfg.market_type != "spot":
             return {"status": "blocked", "details": "Futures demo/live order integration TODO"}
 
-        balances = self.exchange_client.get_account_balances(api_key, api_secret)
+        side = "BUY" if action == "buy" else "SELL"
+        if any(record.side == side for record in self.orders.table.open_orders(symbol)):
+            # Ayni yonde acik emir varken yenisi acilmaz; dolumu settle_orders ile islenir.
+            return {"status": "blocked", "details": f"open {side} order pending"}
+
         if action == "buy":
+            if balances is None:
+                state = self.account_state
+                if state is not None and state.live:
+                    balances = state.quote_balances(rules.get("quote_asset") or "USDT")
+                else:
+                    balances = self.exchange_client.get_account_balances(api_key, api_secret)
             quote_amount = balances["available_balance"] * size_pct
             if quote_amount < rules["min_notional"]:
                 return {"status": "rejected", "details": "min_notional"}
             qty = self._round_step(quote_amount / price, rules["step_size"])
             if qty < rules["min_qty"]:
                 return {"status": "rejected", "details": "min_qty"}
-            result = self.exchange_client.place_market_order(api_key, api_secret, symbol, "BUY", qty)
-            self.history.add_order(symbol, "BUY", result.get("qty", qty), price, self.cfg.bot_mode, "FILLED")
-            return result
+            return self._place(api_key, api_secret, symbol, "BUY", qty, price, intent)
 
         if action in {"sell", "close"}:
-            return {"status": "blocked", "details": "Demo/live SELL requires base balance sync TODO"}
+            own, _ = self.position(symbol)
+            if own <= 0:
+                return {"status": "noop", "details": "No bot position"}
+            state = self._account(api_key, api_secret)
+            free, _ = state.balance(self._base_asset(symbol, rules))
+            # Sadece botun kendi aldigi miktar satilir; serbest bakiye bundan azsa (elle satilmis) o kadari.
+            qty = self._round_step(min(own if action == "close" else own * size_pct, free), rules["step_size"])
+            if qty <= 0:
+                return {"status": "noop", "details": "No base balance"}
+            if qty < rules["min_qty"]:
+                return {"status": "rejected", "details": "min_qty"}
+            if qty * price < rules["min_notional"]:
+                return {"status": "rejected", "details": "min_notional"}
+            return self._place(api_key, api_secret, symbol, "SELL", qty, price, intent)
 
         return {"status": "hold", "details": "unsupported"}
 
+    def _place(self, api_key: str, api_secret: str, symbol: str, side: str, qty: float, price: float, intent: str | None) -> dict:
+        # Niyet = hesap + sembol + yon + karar (tick'in mum zamani); ayni karar sonraki tick'te tekrar gelirse
+        # id ayni kalir, ikinci emir acilmaz.
+        cid = client_order_id(Path(self.cfg.state_file).stem, symbol, side, intent or str(int(time.time())))
+        if self.orders.table.get(cid) is not None:
+            return {"status": "noop", "side": side, "qty": 0.0, "client_order_id": cid, "details": "order already sent for this decision"}
+        future = self.orders.submit(api_key, api_secret, symbol, side, qty, cid)
+        with self._settle_lock:
+            self._unsettled[cid] = [0.0, 0.0]
+        record = self.orders.wait(future, self.cfg.order_wait_seconds)
+        if record is None:
+            # Emir arka planda takip edilmeye devam eder; dolum user data stream/sorgu ile tabloya, oradan settle_orders ile defterlere islenir.
+            return {"status": "pending", "side": side, "qty": 0.0, "client_order_id": cid, "details": "order not acknowledged yet"}
+        booked = self._settle(cid, price)
+        if booked is None:
+            return record.result()
+        return {**record.result(), **booked}
+
+    def _settle(self, cid: str, price: float = 0.0) -> dict | None:
+        # Emrin son islemeden beri dolan kismi history'ye ve botun pozisyonuna yazilir; ayni dolum iki kez islenmez.
+        with self._settle_lock:
+            booked = self._unsettled.get(cid)
+            record = self.orders.table.get(cid)
+            if booked is None or record is None:
+                self._unsettled.pop(cid, None)
+                return None
+            if record.terminal:
+                del self._unsettled[cid]
+            qty = record.executed_qty - booked[0]
+            if qty <= 1e-12:
+                return None
+            fill_price = (record.cum_quote - booked[1]) / qty if record.cum_quote > booked[1] else price
+            booked[:] = [record.executed_qty, record.cum_quote]
+        status = "filled" if record.status == "filled" else "partially_filled"
+        realized = self._own_fill(record.symbol, record.side, qty, fill_price)
+        result = {"status": status, "side": record.side, "qty": qty, "avg_price": fill_price, "client_order_id": cid}
+        if record.side == "SELL":
+            self.history.add_order(record.symbol, "SELL", qty, fill_price, self.cfg.bot_mode, status.upper(), realized_pnl=realized)
+            result["realized_pnl"] = realized
+        else:
+            self.history.add_order(record.symbol, "BUY", qty, fill_price, self.cfg.bot_mode, status.upper())
+        return result
+
+    def settle_orders(self) -> list[tuple[str, dict]]:
+        # Tick beklemesinden sonra gelen (gec) dolumlar; bot bunlari exposure/journal/cooldown'a isler.
+        if any(record.status == "unknown" for record in self.orders.table.open_orders()):
+            api_key, api_secret = self._active_api_credentials()
+            if api_key and api_secret:
+                self.orders.resolve_unknown(api_key, api_secret)
+        with self._settle_lock:
+            pending = list(self._unsettled)
+        out = []
+        for cid in pending:
+            record = self.orders.table.get(cid)
+            result = self._settle(cid)
+            if result is not None and record is not None:
+                out.append((record.symbol, result))
+        return out
+
+    @staticmethod
+    def _base_asset(symbol: str, rules: dict) -> str:
+        if rules.get("base_asset"):
+            return rules["base_asset"]
+        quote = rules.get("quote_asset") or "USDT"
+        return symbol[: -len(quote)] if symbol.endswith(quote) else symbol
+
+    def _account(self, api_key: str, api_secret: str) -> AccountState:
+        # User data stream canliysa bakiye bellekten okunur; degilse REST hesap cevabi state'e islenir.
+        state = self.account_state
+        if state is not None and state.live:
+            return state
+        state = state or AccountState()
+        assets, update_time = self.exchange_client.get_account_assets(api_key, api_secret)
+        state.reconcile(assets, update_time)
+        return state
+
     def close_all(self, symbol: str, price: float) -> dict:
         if self.cfg.bot_mode == "paper":
             if self.wallet.base_qty <= 0:
                 return {"status": "noop", "details": "No open position"}
-            return self._execute_paper(symbol, "close", price, 1.0, self.exchange_client.get_symbol_rules(symbol))
-        return {"status": "blocked", "details": "Close all for demo/live not implemented safely"}
+            return self._execute_paper(symbol, "close", price, 1.0, self.symbol_rules(symbol))
+        # Demo/live: hesabin tum bakiyesi degil, sadece botun kendi emirleriyle aldigi pozisyon kapatilir.
+        if self.position(symbol)[0] <= 0:
+            return {"status": "noop", "details": "No bot position"}
+        return self.execute(symbol, price, {"action": "close", "position_size_pct": 100.0})
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import time
+from typing import Any
+
+
+@dataclass
+class RecoveredState:
+    wallet: dict[str, float] | None = None
+    session_realized_pnl: float = 0.0
+    day: int = 0
+    day_realized_pnl: float = 0.0
+    last_trade_ts: dict[str, float] = field(default_factory=dict)
+    last_decision: dict[str, Any] | None = None
+    config: dict[str, Any] = field(default_factory=dict)
+    external_balances: dict[str, float] | None = None
+    positions: dict[str, list[float]] = field(default_factory=dict)
+    seq: int = 0
+    snapshot_seq: int = 0
+    replayed_events: int = 0
+    duration_ms: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "wallet": self.wallet,
+            "session_realized_pnl": self.session_realized_pnl,
+            "day": self.day,
+            "day_realized_pnl": self.day_realized_pnl,
+            "last_trade_ts": self.last_trade_ts,
+            "last_decision": self.last_decision,
+            "config": self.config,
+            "external_balances": self.external_balances,
+            "positions": self.positions,
+        }
+
+
+def apply_event(state: RecoveredState, event: dict[str, Any]) -> None:
+    kind, data = event["type"], event["data"]
+    if kind == "fill":
+        state.wallet = data["wallet"]
+        if "positions" in data:
+            state.positions = data["positions"]
+        state.session_realized_pnl += float(data.get("realized_pnl", 0.0))
+        # UTC gunu degisince gunluk PnL sifirdan baslar.
+        day = int(float(event["ts"]) // 86_400)
+        if day != state.day:
+            state.day, state.day_realized_pnl = day, 0.0
+        state.day_realized_pnl += float(data.get("realized_pnl", 0.0))
+        if data.get("register_trade"):
+            state.last_trade_ts[data["symbol"]] = float(event["ts"])
+    elif kind == "decision":
+        state.last_decision = data
+    elif kind == "config":
+        state.config.update(data)
+    elif kind == "balance":
+        state.external_balances = data
+    state.seq = int(event["seq"])
+
+
+class StateJournal:
+    # Append-only olay günlüğü + periyodik kompakt snapshot. Snapshot yazıldıktan sonra journal kesilir;
+    # kesme öncesi çökme olursa replay seq <= snapshot_seq olayları atlar.
+    def __init__(self, state_file: str, snapshot_every: int = 200) -> None:
+        base = Path(state_file)
+        self.journal_path = base.with_name(f"{base.stem}.journal.jsonl")
+        self.snapshot_path = base.with_name(f"{base.stem}.snapshot.json")
+        self.snapshot_every = snapshot_every
+        self.state = RecoveredState()
+        self._since_snapshot = 0
+        self._fh = None
+        self.suspended = False
+
+    def recover(self) -> RecoveredState:
+        started = time.perf_counter()
+        state = RecoveredState()
+        if self.snapshot_path.exists():
+            try:
+                raw = json.loads(self.snapshot_path.read_text())
+                state = RecoveredState(**raw["state"], seq=int(raw["seq"]), snapshot_seq=int(raw["seq"]))
+            except Exception:
+                state = RecoveredState()
+        if self.journal_path.exists():
+            with open(self.journal_path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Çökme anında yarım kalan son satır.
+                        continue
+                    if int(event.get("seq", 0)) <= state.seq:
+                        continue
+                    apply_event(state, event)
+                    state.replayed_events += 1
+        state.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.state = state
+        self._since_snapshot = state.replayed_events
+        return state
+
+    def append(self, kind: str, data: dict[str, Any]) -> dict[str, Any] | None:
+        if self.suspended:
+            return None
+        event = {"seq": self.state.seq + 1, "ts": time.time(), "type": kind, "data": data}
+        if self._fh is None:
+            self._fh = open(self.journal_path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._fh.flush()
+        apply_event(self.state, event)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return event
+
+    def snapshot(self) -> None:
+        payload = {"seq": self.state.seq, "written_at": datetime.now(timezone.utc).isoformat(), "state": self.state.to_dict()}
+        tmp = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False))
+        os.replace(tmp, self.snapshot_path)
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        self.journal_path.write_text("")
+        self.state.snapshot_seq = self.state.seq
+        self._since_snapshot = 0
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+import time
+from typing import Any, Iterator
+
+KLINE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume"]
+
+
+def frame_rows(frame) -> list[list]:
+    if frame is None:
+        return []
+    return [list(row) for row in zip(*(frame[col].tolist() for col in KLINE_COLUMNS))]
+
+
+def encode_rows(rows: list[list], prev: list[list] | None) -> dict:
+    # Ardışık tick'lerde mumların çoğu aynıdır: önceki listenin kaydırılmış ortak kısmı + değişen kuyruk yazılır.
+    if prev:
+        index = {row[0]: i for i, row in enumerate(prev)}
+        shift = index.get(rows[0][0]) if rows else None
+        if shift is not None:
+            keep = 0
+            while keep < len(rows) and shift + keep < len(prev) and rows[keep] == prev[shift + keep]:
+                keep += 1
+            return {"shift": shift, "keep": keep, "tail": rows[keep:]}
+    return {"rows": rows}
+
+
+def decode_rows(entry: dict, prev: list[list] | None) -> list[list]:
+    if "rows" in entry:
+        return entry["rows"]
+    shift, keep = entry["shift"], entry["keep"]
+    return (prev or [])[shift : shift + keep] + entry["tail"]
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def segment_paths(path: str | Path) -> list[Path]:
+    path = Path(path)
+    if path.is_file():
+        return [path]
+    return sorted(path.glob("ticks-*.jsonl.gz"))
+
+
+def _read_lines(path: Path) -> Iterator[dict]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    return
+    except (EOFError, OSError):
+        # Kapanmadan kalan (çökme) segmentin sonu; okunabilen tick'ler kullanılır.
+        return
+
+
+def iter_ticks(path: str | Path) -> Iterator[dict]:
+    # Her segment kendi header'ı ve ilk tam mum listesiyle başlar; tek başına da replay edilebilir.
+    for segment in segment_paths(path):
+        header: dict = {}
+        prev: dict[str, list[list]] = {}
+        for record in _read_lines(segment):
+            if record.get("type") == "header":
+                header, prev = record, {}
+                continue
+            klines = {}
+            for name, entry in record.get("klines", {}).items():
+                klines[name] = prev[name] = decode_rows(entry, prev.get(name))
+            yield {**record, "klines": klines, "header": header}
+
+
+class TickRecorder:
+    def __init__(self, directory: str | Path, segment_ticks: int = 500, max_segments: int = 20) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_ticks = max(1, segment_ticks)
+        self.max_segments = max(1, max_segments)
+        self.path: Path | None = None
+        self.ticks_in_segment = 0
+        self.bytes_written = 0
+        self._fh = None
+        self._prev: dict[str, list[list]] = {}
+
+    def _open(self, header: dict) -> None:
+        self.close()
+        stamp = int(time.time() * 1000)
+        while (self.directory / f"ticks-{stamp:013d}.jsonl.gz").exists():
+            stamp += 1
+        self.path = self.directory / f"ticks-{stamp:013d}.jsonl.gz"
+        self._fh = gzip.open(self.path, "at", encoding="utf-8")
+        self._prev = {}
+        self.ticks_in_segment = 0
+        self._write({"type": "header", "created_at": time.time(), **header})
+        for old in segment_paths(self.directory)[: -self.max_segments]:
+            old.unlink(missing_ok=True)
+
+    def _write(self, record: dict) -> None:
+        line = json.dumps(record, separators=(",", ":"), default=_json_default) + "\n"
+        self._fh.write(line)
+        self._fh.flush()
+        self.bytes_written += len(line)
+
+    def needs_header(self) -> bool:
+        return self._fh is None or self.ticks_in_segment >= self.segment_ticks
+
+    def record(self, tick: dict, header: dict | None = None) -> None:
+        if self.needs_header():
+            self._open(header or {})
+        klines = {}
+        for name, frame in tick.pop("klines", {}).items():
+            rows = frame_rows(frame)
+            klines[name] = encode_rows(rows, self._prev.get(name))
+            self._prev[name] = rows
+        self.ticks_in_segment += 1
+        self._write({"type": "tick", "seq": self.ticks_in_segment, **tick, "klines": klines})
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
@@ -3,9 +3,12 @@ from __future__ import annotations
 from collections import deque
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
+from itertools import islice
 import json
 from pathlib import Path
 
+from tradebot.portfolio.analytics import TradeAnalytics
+
 
 @dataclass(slots=True)
 class OrderRecord:
@@ -22,17 +25,25 @@ class InMemoryHistory:
     def __init__(self, state_file: str = "tradebot_state.json", maxlen: int = 200) -> None:
         self._orders: deque[OrderRecord] = deque(maxlen=maxlen)
         self.state_path = Path(state_file)
+        self.version = 0
+        self.analytics = TradeAnalytics()
         self.load_state()
 
-    def add_order(self, symbol: str, side: str, qty: float, price: float, mode: str, status: str) -> None:
+    def add_order(self, symbol: str, side: str, qty: float, price: float, mode: str, status: str, realized_pnl: float = 0.0, fee: float = 0.0) -> None:
         self._orders.appendleft(OrderRecord(symbol, side, qty, price, mode, status, datetime.now(timezone.utc).isoformat()))
+        if status in {"FILLED", "PARTIALLY_FILLED"}:
+            self.analytics.record_fill(symbol, side, qty, price, realized_pnl, fee)
+        self.version += 1
         self.save_state()
 
+    def __len__(self) -> int:
+        return len(self._orders)
+
     def list_orders(self, limit: int = 20) -> list[dict]:
-        return [asdict(order) for order in list(self._orders)[:limit]]
+        return [asdict(order) for order in islice(self._orders, limit)]
 
     def save_state(self) -> None:
-        payload = {"orders": [asdict(x) for x in self._orders]}
+        payload = {"orders": [asdict(x) for x in self._orders], "analytics": self.analytics.to_state()}
         self.state_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2))
 
     def load_state(self) -> None:
@@ -42,5 +53,7 @@ class InMemoryHistory:
             raw = json.loads(self.state_path.read_text())
             for item in raw.get("orders", []):
                 self._orders.append(OrderRecord(**item))
+            if raw.get("analytics"):
+                self.analytics.load_state(raw["analytics"])
         except Exception:
             return
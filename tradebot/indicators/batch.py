@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+OHLCV_FIELDS = ["open", "high", "low", "close", "volume"]
+SNAPSHOT_COLUMNS = [
+    "close", "ema_9", "ema_21", "rsi_14", "atr_14", "bb_mid", "bb_upper", "bb_lower", "bb_pct_b",
+    "macd", "macd_signal", "macd_hist", "vwap", "ema_spread_pct", "atr_pct",
+]
+
+
+def ema_2d(values: np.ndarray, periods: list[int]) -> np.ndarray:
+    # (symbols x candles) -> (len(periods) x symbols x candles); pandas ewm(span, adjust=False) ile ayni recursion.
+    # Kisa seriler basta NaN ile doldurulur; EMA her sembolun ilk gecerli mumundan baslar.
+    alphas = (2.0 / (np.asarray(periods, dtype=np.float64) + 1.0))[:, None]
+    out = np.empty((len(periods),) + values.shape, dtype=np.float64)
+    if values.shape[1] == 0:
+        return out
+    out[:, :, 0] = values[:, 0]
+    for t in range(1, values.shape[1]):
+        prev = out[:, :, t - 1]
+        out[:, :, t] = np.where(np.isnan(prev), values[:, t], alphas * values[:, t] + (1.0 - alphas) * prev)
+    return out
+
+
+def rsi_last(close: np.ndarray, period: int = 14) -> np.ndarray:
+    if close.shape[1] <= period:
+        return np.full(close.shape[0], np.nan)
+    delta = np.diff(close[:, -(period + 1) :], axis=1)
+    avg_gain = np.clip(delta, 0, None).mean(axis=1)
+    avg_loss = (-np.clip(delta, None, 0)).mean(axis=1)
+    rs = avg_gain / np.where(avg_loss == 0, 1e-9, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+def atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    if close.shape[1] < period:
+        return np.full(close.shape[0], np.nan)
+    h, lo = high[:, -period:], low[:, -period:]
+    tr = h - lo
+    if close.shape[1] > period:
+        prev_close = close[:, -(period + 1) : -1]
+        tr = np.maximum(tr, np.maximum(np.abs(h - prev_close), np.abs(lo - prev_close)))
+    else:
+        prev_close = close[:, :-1]
+        tr[:, 1:] = np.maximum(tr[:, 1:], np.maximum(np.abs(h[:, 1:] - prev_close), np.abs(lo[:, 1:] - prev_close)))
+    return tr.mean(axis=1)
+
+
+def bollinger_last(close: np.ndarray, period: int = 20, width: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    window = close[:, -period:]
+    mid = window.mean(axis=1)
+    std = window.std(axis=1)
+    return mid, mid + width * std, mid - width * std
+
+
+def vwap_window(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    typical = (high + low + close) / 3.0
+    vol = np.nansum(volume, axis=1)
+    return np.nansum(typical * volume, axis=1) / np.where(vol == 0, np.nan, vol)
+
+
+def compute_batch_snapshot(symbols: list[str], ohlcv: dict[str, np.ndarray]) -> pd.DataFrame:
+    close = np.asarray(ohlcv["close"], dtype=np.float64)
+    high = np.asarray(ohlcv["high"], dtype=np.float64)
+    low = np.asarray(ohlcv["low"], dtype=np.float64)
+    volume = np.asarray(ohlcv["volume"], dtype=np.float64)
+    if close.ndim != 2 or close.shape[0] != len(symbols):
+        raise ValueError("ohlcv arrays must be shaped (symbols x candles)")
+    if not symbols or close.shape[1] == 0:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS, index=pd.Index(symbols, name="symbol"), dtype=np.float64)
+
+    ema_9, ema_21, ema_12, ema_26 = ema_2d(close, [9, 21, 12, 26])
+    macd_line = ema_12 - ema_26
+    macd_signal = ema_2d(macd_line, [9])[0]
+    bb_mid, bb_upper, bb_lower = bollinger_last(close, 20)
+    last = close[:, -1]
+    band = bb_upper - bb_lower
+    table = pd.DataFrame(
+        {
+            "close": last,
+            "ema_9": ema_9[:, -1],
+            "ema_21": ema_21[:, -1],
+            "rsi_14": rsi_last(close, 14),
+            "atr_14": atr_last(high, low, close, 14),
+            "bb_mid": bb_mid,
+            "bb_upper": bb_upper,
+            "bb_lower": bb_lower,
+            "bb_pct_b": (last - bb_lower) / np.where(band == 0, np.nan, band),
+            "macd": macd_line[:, -1],
+            "macd_signal": macd_signal[:, -1],
+            "macd_hist": macd_line[:, -1] - macd_signal[:, -1],
+            "vwap": vwap_window(high, low, close, volume),
+        },
+        index=pd.Index(symbols, name="symbol"),
+    )
+    table["ema_spread_pct"] = (table["ema_9"] - table["ema_21"]) / table["ema_21"].replace(0, np.nan) * 100
+    table["atr_pct"] = table["atr_14"] / table["close"].replace(0, np.nan) * 100
+    return table
+
+
+def stack_frames(frames: dict[str, pd.DataFrame], lookback: int | None = None) -> tuple[list[str], dict[str, np.ndarray]]:
+    # Seriler son mumlarina gore sag hizalanir; en uzun seriden kisa olanlarin basi NaN kalir. Yeni listelenmis
+    # (az mumlu) bir sembol diger sembollerin penceresini kisaltmaz, kendi gostergeleri de yetersiz veride NaN olur.
+    symbols = [s for s, df in frames.items() if len(df)]
+    n = max(len(frames[s]) for s in symbols) if symbols else 0
+    if lookback:
+        n = min(n, lookback)
+    arrays = {f: np.full((len(symbols), n), np.nan, dtype=np.float64) for f in OHLCV_FIELDS}
+    for i, symbol in enumerate(symbols):
+        tail = frames[symbol][OHLCV_FIELDS].to_numpy(dtype=np.float64)[-n:] if n else np.empty((0, len(OHLCV_FIELDS)))
+        for j, f in enumerate(OHLCV_FIELDS):
+            arrays[f][i, n - len(tail) :] = tail[:, j]
+    return symbols, arrays
+
+
+def ohlcv_from_candles(candles: np.ndarray, columns: list[str]) -> dict[str, np.ndarray]:
+    # SharedMarketBuffer.candles gibi (symbols x candles x columns) bloklarini kopyalamadan view'lara ayirir.
+    return {f: candles[:, :, columns.index(f)] for f in OHLCV_FIELDS}
+
+
+def compute_batch_snapshot_from_frames(frames: dict[str, pd.DataFrame], lookback: int | None = None) -> pd.DataFrame:
+    symbols, arrays = stack_frames(frames, lookback)
+    return compute_batch_snapshot(symbols, arrays)
+
+
+def rank_candidates(table: pd.DataFrame, top: int = 20, max_rsi: float = 70.0) -> pd.DataFrame:
+    eligible = table[(table["ema_spread_pct"] > 0) & (table["rsi_14"] < max_rsi)]
+    return eligible.sort_values(["ema_spread_pct", "macd_hist"], ascending=False).head(top)
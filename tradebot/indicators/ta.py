@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-import pandas as pd
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def ema(series: pd.Series, period: int) -> pd.Series:
@@ -18,6 +21,8 @@ def rsi(series: pd.Series, period: int = 14) -> pd.Series:
 
 
 def atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
+    import pandas as pd
+
     high_low = (df["high"] - df["low"]).abs()
     high_close = (df["high"] - df["close"].shift()).abs()
     low_close = (df["low"] - df["close"].shift()).abs()
@@ -26,15 +31,11 @@ def atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
 
 
 def compute_indicator_snapshot(df: pd.DataFrame) -> dict[str, float]:
-    work = df.copy()
-    work["ema_9"] = ema(work["close"], 9)
-    work["ema_21"] = ema(work["close"], 21)
-    work["rsi_14"] = rsi(work["close"], 14)
-    work["atr_14"] = atr(work, 14)
-    latest = work.iloc[-1]
+    # Girdi frame'i kopyalanmaz; sadece gereken seriler hesaplanip son degerleri alinir.
+    close = df["close"]
     return {
-        "ema_9": float(latest["ema_9"]),
-        "ema_21": float(latest["ema_21"]),
-        "rsi_14": float(latest["rsi_14"]),
-        "atr_14": float(latest["atr_14"]),
+        "ema_9": float(ema(close, 9).iloc[-1]),
+        "ema_21": float(ema(close, 21).iloc[-1]),
+        "rsi_14": float(rsi(close, 14).iloc[-1]),
+        "atr_14": float(atr(df, 14).iloc[-1]),
     }
@@ -4,24 +4,34 @@ import json
 import logging
 from collections import deque
 from datetime import datetime, timezone
+from itertools import islice
 from typing import Any
 
 _RECENT_LOGS: deque[str] = deque(maxlen=300)
+_LOG_VERSION = 0
+_LOGGERS: set[str] = set()
+_EXTRA_HANDLERS: list[logging.Handler] = []
+
+
+def log_payload(record: logging.LogRecord) -> dict[str, Any]:
+    payload: dict[str, Any] = {
+        "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+    }
+    extra_data = getattr(record, "extra_data", None)
+    if isinstance(extra_data, dict):
+        payload.update(extra_data)
+    return payload
 
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
-        payload: dict[str, Any] = {
-            "ts": datetime.now(timezone.utc).isoformat(),
-            "level": record.levelname,
-            "logger": record.name,
-            "message": record.getMessage(),
-        }
-        extra_data = getattr(record, "extra_data", None)
-        if isinstance(extra_data, dict):
-            payload.update(extra_data)
-        line = json.dumps(payload, ensure_ascii=False)
+        global _LOG_VERSION
+        line = json.dumps(log_payload(record), ensure_ascii=False)
         _RECENT_LOGS.appendleft(line)
+        _LOG_VERSION += 1
         return line
 
 
@@ -33,12 +43,43 @@ def get_logger(name: str = "tradebot") -> logging.Logger:
     handler = logging.StreamHandler()
     handler.setFormatter(JsonFormatter())
     logger.addHandler(handler)
+    for extra in _EXTRA_HANDLERS:
+        logger.addHandler(extra)
     logger.propagate = False
+    _LOGGERS.add(name)
     return logger
 
 
+def add_handler(handler: logging.Handler) -> None:
+    # Disk log store gibi process geneli sink'ler; mevcut ve sonradan olusan tum tradebot logger'larina eklenir.
+    if handler in _EXTRA_HANDLERS:
+        return
+    _EXTRA_HANDLERS.append(handler)
+    for name in _LOGGERS:
+        logging.getLogger(name).addHandler(handler)
+
+
+def remove_handler(handler: logging.Handler) -> None:
+    if handler in _EXTRA_HANDLERS:
+        _EXTRA_HANDLERS.remove(handler)
+    for name in _LOGGERS:
+        logging.getLogger(name).removeHandler(handler)
+
+
 def get_recent_logs(limit: int = 100) -> list[str]:
-    return list(_RECENT_LOGS)[:limit]
+    return list(islice(_RECENT_LOGS, limit))
+
+
+def configure_recent_logs(maxlen: int) -> deque[str]:
+    # Panel icin tutulan son log satirlari; sinir degisirse en yeni satirlar korunur.
+    global _RECENT_LOGS
+    if _RECENT_LOGS.maxlen != maxlen:
+        _RECENT_LOGS = deque(islice(_RECENT_LOGS, maxlen), maxlen=maxlen)
+    return _RECENT_LOGS
+
+
+def get_log_version() -> int:
+    return _LOG_VERSION
 
 
 def sanitize_secret(value: str | None) -> str:
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from fnmatch import fnmatchcase
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Iterator
+
+from tradebot.loggingx.logger import add_handler, log_payload, remove_handler
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def _new_summary(name: str) -> dict[str, Any]:
+    return {"file": name, "start": None, "end": None, "count": 0, "levels": {}, "loggers": {}, "events": {}, "symbols": {}}
+
+
+def _add_to_summary(summary: dict[str, Any], row: dict[str, Any]) -> None:
+    t = row["t"]
+    summary["start"] = t if summary["start"] is None else min(summary["start"], t)
+    summary["end"] = t if summary["end"] is None else max(summary["end"], t)
+    summary["count"] += 1
+    for key, value in (("levels", row.get("level")), ("loggers", row.get("logger")), ("events", row.get("message")), ("symbols", row.get("symbol"))):
+        if isinstance(value, str):
+            bucket = summary[key]
+            bucket[value] = bucket.get(value, 0) + 1
+
+
+class LogStore:
+    # Rotating gzip JSONL segmentler + segment basina ozet index (zaman araligi, level/logger/event/symbol sayaclari).
+    # Sorgu once index'e bakar; filtreyle kesismeyen segment hic acilmaz.
+    def __init__(self, directory: str | Path, segment_records: int = 5000, max_segments: int = 50, flush_every: int = 20) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_records = max(1, segment_records)
+        self.max_segments = max(1, max_segments)
+        self.flush_every = max(1, flush_every)
+        self.index_path = self.directory / "index.json"
+        self.segments: list[dict[str, Any]] = self._load_index()
+        self.active: dict[str, Any] | None = None
+        self._fh = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> list[dict[str, Any]]:
+        try:
+            known = {s["file"]: s for s in json.loads(self.index_path.read_text())["segments"]}
+        except Exception:
+            known = {}
+        segments = []
+        for path in sorted(self.directory.glob("logs-*.jsonl.gz")):
+            summary = known.get(path.name)
+            if summary is None:
+                # Index'e yazilamadan kalan (crash) segment taranarak ozetlenir.
+                summary = _new_summary(path.name)
+                for row in self._read(path):
+                    _add_to_summary(summary, row)
+            segments.append(summary)
+        return segments
+
+    def _write_index(self) -> None:
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps({"segments": self.segments}, separators=(",", ":")))
+        os.replace(tmp, self.index_path)
+
+    def _open(self) -> None:
+        stamp = int(time.time() * 1000)
+        while (self.directory / f"logs-{stamp:013d}.jsonl.gz").exists():
+            stamp += 1
+        name = f"logs-{stamp:013d}.jsonl.gz"
+        self._fh = gzip.open(self.directory / name, "at", encoding="utf-8")
+        self.active = _new_summary(name)
+
+    def _rotate(self) -> None:
+        self._close_active()
+        while len(self.segments) > self.max_segments:
+            oldest = self.segments.pop(0)
+            (self.directory / oldest["file"]).unlink(missing_ok=True)
+        self._write_index()
+
+    def _close_active(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        self._fh = None
+        if self.active is not None and self.active["count"]:
+            self.segments.append(self.active)
+        self.active = None
+        self._pending = 0
+
+    def write(self, row: dict[str, Any]) -> None:
+        with self._lock:
+            if self._fh is None:
+                self._open()
+            self._fh.write(json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+            _add_to_summary(self.active, row)
+            self._pending += 1
+            if self._pending >= self.flush_every or LEVELS.get(row.get("level"), 0) >= 30:
+                self._fh.flush()
+                self._pending = 0
+            if self.active["count"] >= self.segment_records:
+                self._rotate()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._fh is not None and self._pending:
+                self._fh.flush()
+                self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_active()
+            self._write_index()
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[dict[str, Any]]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        return
+        except (EOFError, OSError):
+            return
+
+    @staticmethod
+    def _segment_matches(summary: dict[str, Any], start, end, min_level: int, event, symbol, logger) -> bool:
+        if not summary["count"]:
+            return False
+        if start is not None and summary["end"] < start:
+            return False
+        if end is not None and summary["start"] > end:
+            return False
+        if min_level and not any(LEVELS.get(level, 0) >= min_level for level in summary["levels"]):
+            return False
+        if event and not any(fnmatchcase(name, event) for name in summary["events"]):
+            return False
+        if symbol and symbol not in summary["symbols"]:
+            return False
+        if logger and logger not in summary["loggers"]:
+            return False
+        return True
+
+    def query(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        level: str | None = None,
+        event: str | None = None,
+        symbol: str | None = None,
+        logger: str | None = None,
+        text: str | None = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> dict[str, Any]:
+        # En yeni kayit once; sayfa dolunca eski segmentler okunmaz.
+        self.flush()
+        with self._lock:
+            segments = list(self.segments) + ([dict(self.active)] if self.active and self.active["count"] else [])
+        min_level = LEVELS.get((level or "").upper(), 0)
+        symbol = symbol.upper() if symbol else None
+        rows: list[dict[str, Any]] = []
+        skipped = scanned = 0
+        has_more = False
+        for summary in reversed(segments):
+            if not self._segment_matches(summary, start, end, min_level, event, symbol, logger):
+                continue
+            scanned += 1
+            matched = []
+            for row in self._read(self.directory / summary["file"]):
+                t = row.get("t", 0.0)
+                if (start is not None and t < start) or (end is not None and t > end):
+                    continue
+                if min_level and LEVELS.get(row.get("level"), 0) < min_level:
+                    continue
+                if event and not fnmatchcase(str(row.get("message", "")), event):
+                    continue
+                if symbol and row.get("symbol") != symbol:
+                    continue
+                if logger and row.get("logger") != logger:
+                    continue
+                if text and text.lower() not in json.dumps(row, ensure_ascii=False).lower():
+                    continue
+                matched.append(row)
+            for row in reversed(matched):
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                if len(rows) >= limit:
+                    has_more = True
+                    break
+                rows.append(row)
+            if has_more:
+                break
+        return {"rows": rows, "offset": offset, "limit": limit, "has_more": has_more, "segments_scanned": scanned, "segments_total": len(segments)}
+
+    def facets(self) -> dict[str, list[str]]:
+        with self._lock:
+            segments = list(self.segments) + ([self.active] if self.active else [])
+            out: dict[str, set[str]] = {"events": set(), "symbols": set(), "loggers": set()}
+            for summary in segments:
+                for key in out:
+                    out[key].update(summary[key])
+        return {key: sorted(values) for key, values in out.items()}
+
+
+class LogStoreHandler(logging.Handler):
+    def __init__(self, store: LogStore) -> None:
+        super().__init__()
+        self.store = store
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.store.write({"t": record.created, **log_payload(record)})
+        except Exception:
+            self.handleError(record)
+
+
+_STORE: LogStore | None = None
+_HANDLER: LogStoreHandler | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def configure_log_store(directory: str | Path, segment_records: int = 5000, max_segments: int = 50) -> LogStore:
+    global _STORE, _HANDLER
+    with _STORE_LOCK:
+        if _STORE is not None and _STORE.directory == Path(directory):
+            return _STORE
+        if _HANDLER is not None:
+            remove_handler(_HANDLER)
+            _STORE.close()
+        _STORE = LogStore(directory, segment_records, max_segments)
+        _HANDLER = LogStoreHandler(_STORE)
+        add_handler(_HANDLER)
+        return _STORE
+
+
+def get_log_store() -> LogStore | None:
+    return _STORE
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+import time
+from typing import Any
+
+
+@dataclass(slots=True)
+class Bucket:
+    fills: int = 0
+    trades: int = 0
+    wins: int = 0
+    losses: int = 0
+    realized_pnl: float = 0.0
+    gross_profit: float = 0.0
+    gross_loss: float = 0.0
+    fees: float = 0.0
+    volume: float = 0.0
+    hold_seconds: float = 0.0
+
+    def add(self, notional: float, realized: float, fee: float, closing: bool, hold: float) -> None:
+        self.fills += 1
+        self.volume += notional
+        self.fees += fee
+        if not closing:
+            return
+        self.trades += 1
+        self.realized_pnl += realized
+        self.hold_seconds += hold
+        if realized > 0:
+            self.wins += 1
+            self.gross_profit += realized
+        elif realized < 0:
+            self.losses += 1
+            self.gross_loss -= realized
+
+    def to_dict(self) -> dict[str, float]:
+        out = asdict(self)
+        out["net_pnl"] = self.realized_pnl - self.fees
+        out["win_rate"] = self.wins / self.trades if self.trades else 0.0
+        out["avg_hold_seconds"] = self.hold_seconds / self.trades if self.trades else 0.0
+        out["profit_factor"] = self.gross_profit / self.gross_loss if self.gross_loss > 0 else None
+        return out
+
+
+def _bucket(raw: dict[str, Any]) -> Bucket:
+    names = {f.name for f in fields(Bucket)}
+    return Bucket(**{k: v for k, v in raw.items() if k in names})
+
+
+class TradeAnalytics:
+    # Her fill'de toplam/gun/saat/sembol/decider kovalari O(1) guncellenir; order listesi yeniden taranmaz.
+    def __init__(self, max_days: int = 90, max_hours: int = 168) -> None:
+        self.max_days = max_days
+        self.max_hours = max_hours
+        self.total = Bucket()
+        self.daily: dict[str, Bucket] = {}
+        self.hourly: dict[str, Bucket] = {}
+        self.by_symbol: dict[str, Bucket] = {}
+        self.by_decider: dict[str, Bucket] = {}
+        self.open_since: dict[str, float] = {}
+        self.open_qty: dict[str, float] = {}
+        self.decider = "unknown"
+        self.realized_equity = 0.0
+        self.realized_peak = 0.0
+        self.realized_max_drawdown = 0.0
+        self.peak_equity: float | None = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+        self.current_drawdown = 0.0
+        self.version = 0
+
+    @staticmethod
+    def _bounded(buckets: dict[str, Bucket], key: str, cap: int) -> Bucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = Bucket()
+            if len(buckets) > cap:
+                # dict ekleme sirasini korur; en eski kova atilir.
+                buckets.pop(next(iter(buckets)))
+        return bucket
+
+    def record_fill(self, symbol: str, side: str, qty: float, price: float, realized_pnl: float = 0.0, fee: float = 0.0, decider: str | None = None, ts: float | None = None) -> None:
+        if qty <= 0:
+            return
+        ts = time.time() if ts is None else ts
+        side = side.upper()
+        closing = side == "SELL"
+        hold = 0.0
+        if closing:
+            hold = max(0.0, ts - self.open_since.get(symbol, ts))
+            remaining = self.open_qty.get(symbol, 0.0) - qty
+            if remaining <= 1e-12:
+                self.open_qty.pop(symbol, None)
+                self.open_since.pop(symbol, None)
+            else:
+                self.open_qty[symbol] = remaining
+        else:
+            self.open_since.setdefault(symbol, ts)
+            self.open_qty[symbol] = self.open_qty.get(symbol, 0.0) + qty
+
+        stamp = datetime.fromtimestamp(ts, timezone.utc)
+        args = (qty * price, realized_pnl if closing else 0.0, fee, closing, hold)
+        self.total.add(*args)
+        self._bounded(self.daily, stamp.strftime("%Y-%m-%d"), self.max_days).add(*args)
+        self._bounded(self.hourly, stamp.strftime("%Y-%m-%dT%H"), self.max_hours).add(*args)
+        self.by_symbol.setdefault(symbol, Bucket()).add(*args)
+        self.by_decider.setdefault(decider or self.decider, Bucket()).add(*args)
+
+        self.realized_equity += args[1] - fee
+        self.realized_peak = max(self.realized_peak, self.realized_equity)
+        self.realized_max_drawdown = max(self.realized_max_drawdown, self.realized_peak - self.realized_equity)
+        self.version += 1
+
+    def update_equity(self, equity: float) -> None:
+        # Mark-to-market drawdown: snapshot basina bir karsilastirma.
+        if self.peak_equity is None or equity > self.peak_equity:
+            self.peak_equity = equity
+        self.current_drawdown = self.peak_equity - equity
+        if self.current_drawdown > self.max_drawdown:
+            self.max_drawdown = self.current_drawdown
+            self.version += 1
+        if self.peak_equity > 0:
+            self.max_drawdown_pct = max(self.max_drawdown_pct, self.current_drawdown / self.peak_equity * 100)
+
+    def summary(self, days: int = 14, hours: int = 24) -> dict[str, Any]:
+        return {
+            "total": self.total.to_dict(),
+            "max_drawdown": self.max_drawdown,
+            "max_drawdown_pct": self.max_drawdown_pct,
+            "current_drawdown": self.current_drawdown,
+            "realized_max_drawdown": self.realized_max_drawdown,
+            "daily": [{"day": k, **b.to_dict()} for k, b in list(self.daily.items())[-days:]],
+            "hourly": [{"hour": k, **b.to_dict()} for k, b in list(self.hourly.items())[-hours:]],
+            "by_symbol": [{"symbol": k, **b.to_dict()} for k, b in self.by_symbol.items()],
+            "by_decider": [{"decider": k, **b.to_dict()} for k, b in self.by_decider.items()],
+        }
+
+    def metrics(self) -> dict[str, Any]:
+        today = self.daily.get(datetime.now(timezone.utc).strftime("%Y-%m-%d"), Bucket())
+        return {
+            "total": self.total.to_dict(),
+            "today": today.to_dict(),
+            "max_drawdown": self.max_drawdown,
+            "current_drawdown": self.current_drawdown,
+            "realized_max_drawdown": self.realized_max_drawdown,
+        }
+
+    def to_state(self) -> dict[str, Any]:
+        return {
+            "total": asdict(self.total),
+            "daily": {k: asdict(b) for k, b in self.daily.items()},
+            "hourly": {k: asdict(b) for k, b in self.hourly.items()},
+            "by_symbol": {k: asdict(b) for k, b in self.by_symbol.items()},
+            "by_decider": {k: asdict(b) for k, b in self.by_decider.items()},
+            "open_since": self.open_since,
+            "open_qty": self.open_qty,
+            "realized_equity": self.realized_equity,
+            "realized_peak": self.realized_peak,
+            "realized_max_drawdown": self.realized_max_drawdown,
+            "peak_equity": self.peak_equity,
+            "max_drawdown": self.max_drawdown,
+            "max_drawdown_pct": self.max_drawdown_pct,
+        }
+
+    def load_state(self, raw: dict[str, Any]) -> None:
+        self.total = _bucket(raw.get("total", {}))
+        for name in ("daily", "hourly", "by_symbol", "by_decider"):
+            setattr(self, name, {k: _bucket(v) for k, v in raw.get(name, {}).items()})
+        self.open_since = dict(raw.get("open_since", {}))
+        self.open_qty = dict(raw.get("open_qty", {}))
+        self.realized_equity = float(raw.get("realized_equity", 0.0))
+        self.realized_peak = float(raw.get("realized_peak", 0.0))
+        self.realized_max_drawdown = float(raw.get("realized_max_drawdown", 0.0))
+        self.peak_equity = raw.get("peak_equity")
+        self.max_drawdown = float(raw.get("max_drawdown", 0.0))
+        self.max_drawdown_pct = float(raw.get("max_drawdown_pct", 0.0))
+        self.version += 1
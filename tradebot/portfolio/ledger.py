@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import fields
+from datetime import datetime, timezone
+
+import numpy as np
+
+from tradebot.models.context import NormalizedPosition
+
+POSITION_COLUMNS = [f.name for f in fields(NormalizedPosition)]
+
+
+class PaperLedger:
+    # Cok sembollu paper defter: pozisyonlar bitisik numpy kolonlarinda tutulur, mark-to-market tek vektor adimidir.
+    # Funding kolonu yok: paper pozisyonlari spot long'dur (funding odenmez) ve bot funding-rate verisi cekmez.
+    def __init__(self, starting_balance: float = 0.0, fee_rate: float = 0.0, capacity: int = 16) -> None:
+        self.wallet_balance = float(starting_balance)
+        self.available_balance = float(starting_balance)
+        self.fee_rate = fee_rate
+        self.symbols: list[str] = []
+        self.index: dict[str, int] = {}
+        self.opened_at: list[str | None] = []
+        self.qty = np.zeros(capacity)
+        self.avg_entry = np.zeros(capacity)
+        self.realized_pnl = np.zeros(capacity)
+        self.fees = np.zeros(capacity)
+        self.marks = np.zeros(capacity)
+
+    @property
+    def size(self) -> int:
+        return len(self.symbols)
+
+    def _grow(self, capacity: int) -> None:
+        for name in ("qty", "avg_entry", "realized_pnl", "fees", "marks"):
+            old = getattr(self, name)
+            new = np.zeros(capacity)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def slot(self, symbol: str) -> int:
+        symbol = symbol.upper()
+        i = self.index.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            if i >= len(self.qty):
+                self._grow(max(16, len(self.qty) * 2))
+            self.symbols.append(symbol)
+            self.index[symbol] = i
+            self.opened_at.append(None)
+        return i
+
+    @classmethod
+    def from_columns(
+        cls,
+        symbols: list[str],
+        qty: np.ndarray,
+        avg_entry: np.ndarray,
+        realized_pnl: np.ndarray | None = None,
+        wallet_balance: float = 0.0,
+        available_balance: float = 0.0,
+    ) -> PaperLedger:
+        ledger = cls(capacity=max(16, len(symbols)))
+        for symbol in symbols:
+            ledger.slot(symbol)
+        n = len(symbols)
+        ledger.qty[:n] = qty
+        ledger.avg_entry[:n] = avg_entry
+        if realized_pnl is not None:
+            ledger.realized_pnl[:n] = realized_pnl
+        ledger.wallet_balance = wallet_balance
+        ledger.available_balance = available_balance
+        return ledger
+
+    def buy(self, symbol: str, price: float, quote_amount: float) -> float:
+        spend = min(self.available_balance, quote_amount)
+        if price <= 0 or spend <= 0:
+            return 0.0
+        i = self.slot(symbol)
+        notional = spend / (1 + self.fee_rate)
+        fee = spend - notional
+        qty = notional / price
+        prev_cost = self.qty[i] * self.avg_entry[i]
+        if self.qty[i] <= 0:
+            self.opened_at[i] = datetime.now(timezone.utc).isoformat()
+        self.qty[i] += qty
+        self.avg_entry[i] = (prev_cost + notional) / self.qty[i]
+        self.fees[i] += fee
+        self.available_balance -= spend
+        self.wallet_balance -= fee
+        self.marks[i] = price
+        return qty
+
+    def sell(self, symbol: str, price: float, qty: float) -> tuple[float, float]:
+        i = self.index.get(symbol.upper())
+        if i is None:
+            return 0.0, 0.0
+        qty = min(float(self.qty[i]), qty)
+        if qty <= 0:
+            return 0.0, 0.0
+        realized = (price - self.avg_entry[i]) * qty
+        proceeds = qty * price
+        fee = proceeds * self.fee_rate
+        self.qty[i] -= qty
+        self.realized_pnl[i] += realized
+        self.fees[i] += fee
+        self.available_balance += proceeds - fee
+        self.wallet_balance += realized - fee
+        self.marks[i] = price
+        if self.qty[i] <= 1e-12:
+            self.qty[i] = 0.0
+            self.avg_entry[i] = 0.0
+            self.opened_at[i] = None
+        return qty, float(realized)
+
+    def revalue(self, prices: dict[str, float] | np.ndarray) -> None:
+        n = self.size
+        if isinstance(prices, dict):
+            vector = np.fromiter((prices.get(s, np.nan) for s in self.symbols), dtype=np.float64, count=n)
+            self.marks[:n] = np.where(np.isnan(vector), self.marks[:n], vector)
+        else:
+            self.marks[:n] = np.asarray(prices, dtype=np.float64)[:n]
+
+    def unrealized(self) -> np.ndarray:
+        n = self.size
+        return (self.marks[:n] - self.avg_entry[:n]) * self.qty[:n]
+
+    def account_cards(self, realized_pnl: float | None = None) -> dict[str, float]:
+        total_unrealized = float(self.unrealized().sum())
+        return {
+            "wallet_balance": self.wallet_balance,
+            "available_balance": self.available_balance,
+            "equity": self.wallet_balance + total_unrealized,
+            "unrealized_pnl": total_unrealized,
+            "realized_pnl": float(self.realized_pnl[: self.size].sum()) if realized_pnl is None else realized_pnl,
+            "fees": float(self.fees[: self.size].sum()),
+        }
+
+    def position_table(self) -> list[dict]:
+        n = self.size
+        qty, entry, marks = self.qty[:n], self.avg_entry[:n], self.marks[:n]
+        unrealized = (marks - entry) * qty
+        notional = qty * marks
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl_pct = np.where(entry > 0, (marks - entry) / entry * 100, 0.0)
+        rows = []
+        for i in np.flatnonzero(qty > 0):
+            rows.append(
+                dict(
+                    zip(
+                        POSITION_COLUMNS,
+                        (
+                            self.symbols[i], "long", float(qty[i]), float(entry[i]), float(marks[i]), None, None,
+                            float(unrealized[i]), float(pnl_pct[i]), float(notional[i]), self.opened_at[i],
+                        ),
+                    )
+                )
+            )
+        return rows
+
+
+class LedgerWallet:
+    # PaperWallet ile ayni arayuz: botun tek sembolluk paper cuzdani defterin o sembol satirina bakar.
+    # Sembol sadece pozisyon yokken degisir (apply_config); eski satir defterde sifir miktarla kalir.
+    def __init__(self, ledger: PaperLedger, symbol: str) -> None:
+        self.ledger = ledger
+        self.symbol = symbol
+
+    @property
+    def wallet_balance(self) -> float:
+        return self.ledger.wallet_balance
+
+    @wallet_balance.setter
+    def wallet_balance(self, value: float) -> None:
+        self.ledger.wallet_balance = float(value)
+
+    @property
+    def available_balance(self) -> float:
+        return self.ledger.available_balance
+
+    @available_balance.setter
+    def available_balance(self, value: float) -> None:
+        self.ledger.available_balance = float(value)
+
+    @property
+    def base_qty(self) -> float:
+        i = self.ledger.index.get(self.symbol.upper())
+        return float(self.ledger.qty[i]) if i is not None else 0.0
+
+    @base_qty.setter
+    def base_qty(self, value: float) -> None:
+        self.ledger.qty[self.ledger.slot(self.symbol)] = float(value)
+
+    @property
+    def entry_price(self) -> float:
+        i = self.ledger.index.get(self.symbol.upper())
+        return float(self.ledger.avg_entry[i]) if i is not None else 0.0
+
+    @entry_price.setter
+    def entry_price(self, value: float) -> None:
+        self.ledger.avg_entry[self.ledger.slot(self.symbol)] = float(value)
+
+    def buy(self, price: float, quote_amount: float) -> float:
+        return self.ledger.buy(self.symbol, price, quote_amount)
+
+    def sell(self, price: float, qty: float) -> tuple[float, float]:
+        return self.ledger.sell(self.symbol, price, qty)
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import time
+from typing import Callable
 
 from tradebot.config.settings import BotConfig
+from tradebot.risk.portfolio import ExposureBook
 
 
 class RiskManager:
-    def __init__(self, cfg: BotConfig) -> None:
+    def __init__(self, cfg: BotConfig, clock: Callable[[], float] = time.time, book: ExposureBook | None = None) -> None:
         self.cfg = cfg
+        self.clock = clock
+        self.book = book
         self.last_trade_ts: dict[str, float] = {}
 
-    def validate(self, symbol: str, decision: dict, available_balance: float, open_positions: int, session_realized_pnl: float) -> tuple[bool, str]:
+    def validate(
+        self,
+        symbol: str,
+        decision: dict,
+        available_balance: float,
+        open_positions: int,
+        session_realized_pnl: float,
+        notional: float = 0.0,
+    ) -> tuple[bool, str]:
         if decision["action"] == "buy":
             if open_positions >= self.cfg.max_positions:
                 return False, "max_positions limit"
@@ -18,14 +30,35 @@ class RiskManager:
                 return False, "position already open (pyramiding off)"
         if decision["action"] in {"buy", "sell"} and decision.get("position_size_pct", 0.0) > self.cfg.max_position_size_pct:
             return False, "max_position_size_pct limit"
-        if -session_realized_pnl >= self.cfg.max_daily_loss_usdt:
-            return False, "max_daily_loss_usdt reached"
+        # Defter varsa zarar limiti defterin UTC gunluk gerceklesmis PnL'ine bakar ve gun basinda sifirlanir.
+        # Sadece yeni girisi durdurur; zarardaki pozisyondan sell/close ile cikis her zaman serbest.
+        if decision["action"] == "buy":
+            daily_pnl = self.book.realized_day() if self.book is not None else session_realized_pnl
+            if -daily_pnl >= self.cfg.max_daily_loss_usdt:
+                return False, "max_daily_loss_usdt reached"
         if decision["action"] == "buy" and available_balance <= 0:
             return False, "insufficient available balance"
-        now = time.time()
+        if decision["action"] == "buy" and self.book is not None and notional > 0:
+            reason = self._exposure_check(symbol, notional)
+            if reason:
+                return False, reason
+        now = self.clock()
         if decision["action"] == "buy" and now - self.last_trade_ts.get(symbol, 0) < self.cfg.cooldown_seconds:
             return False, "cooldown active"
         return True, "ok"
 
+    def _exposure_check(self, symbol: str, notional: float) -> str | None:
+        after = self.book.projected(symbol, notional)
+        limits = (
+            ("symbol", self.cfg.max_symbol_notional_usdt, "max_symbol_notional_usdt limit"),
+            ("group", self.cfg.max_group_notional_usdt, "max_group_notional_usdt limit"),
+            ("gross", self.cfg.max_gross_exposure_usdt, "max_gross_exposure_usdt limit"),
+            ("net", self.cfg.max_net_exposure_usdt, "max_net_exposure_usdt limit"),
+        )
+        for key, limit, reason in limits:
+            if limit > 0 and abs(after[key]) > limit:
+                return reason
+        return None
+
     def register_trade(self, symbol: str) -> None:
-        self.last_trade_ts[symbol] = time.time()
+        self.last_trade_ts[symbol] = self.clock()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+DAY_SECONDS = 86_400
+
+
+def utc_day(ts: float) -> int:
+    return int(ts // DAY_SECONDS)
+
+
+def parse_groups(specs: list[str]) -> dict[str, str]:
+    # "majors:BTCUSDT|ETHUSDT" -> {"BTCUSDT": "majors", "ETHUSDT": "majors"}
+    groups = {}
+    for spec in specs:
+        name, _, symbols = spec.partition(":")
+        for symbol in symbols.split("|"):
+            if symbol.strip():
+                groups[symbol.strip().upper()] = name.strip()
+    return groups
+
+
+class ExposureBook:
+    # Portfoy toplamlari (gross/net, sembol ve grup notional'i, gerceklesmemis PnL, UTC gunluk PnL) her fill ve
+    # fiyat guncellemesinde sadece degisen sembolun farki kadar guncellenir; pre-trade kontrolu pozisyonlari taramaz.
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self.groups: dict[str, str] = {}
+        self.gross = 0.0
+        self.net = 0.0
+        self.unrealized = 0.0
+        self.realized_today = 0.0
+        self.group_net: dict[str, float] = {}
+        self.day = utc_day(clock())
+        self.day_open_unrealized = 0.0
+        self.fills = 0
+        # symbol -> [qty, cost, mark]; (account, symbol) -> [qty, avg_price]
+        self._symbols: dict[str, list[float]] = {}
+        self._positions: dict[tuple[str, str], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def configure_groups(self, groups: dict[str, str]) -> None:
+        with self._lock:
+            for symbol, row in self._symbols.items():
+                self._move(symbol, row[0] * row[2], 0.0)
+            self.groups = dict(groups)
+            for symbol, row in self._symbols.items():
+                self._move(symbol, 0.0, row[0] * row[2])
+
+    def group_of(self, symbol: str) -> str:
+        # Gruba atanmamis sembol kendi basina bir gruptur.
+        return self.groups.get(symbol, symbol)
+
+    def _roll(self) -> None:
+        day = utc_day(self.clock())
+        if day != self.day:
+            self.day = day
+            self.realized_today = 0.0
+            self.day_open_unrealized = self.unrealized
+
+    def _move(self, symbol: str, old: float, new: float) -> None:
+        self.gross += abs(new) - abs(old)
+        self.net += new - old
+        group = self.group_of(symbol)
+        self.group_net[group] = self.group_net.get(group, 0.0) + new - old
+
+    def _update(self, symbol: str, qty: float, cost: float, mark: float) -> None:
+        row = self._symbols.setdefault(symbol, [0.0, 0.0, mark])
+        old_qty, old_cost, old_mark = row
+        self._move(symbol, old_qty * old_mark, qty * mark)
+        self.unrealized += (qty * mark - cost) - (old_qty * old_mark - old_cost)
+        row[:] = [qty, cost, mark]
+
+    def mark(self, symbol: str, price: float) -> None:
+        if price <= 0:
+            return
+        with self._lock:
+            self._roll()
+            row = self._symbols.get(symbol)
+            if row is None:
+                self._symbols[symbol] = [0.0, 0.0, price]
+            else:
+                self._update(symbol, row[0], row[1], price)
+
+    def set_position(self, account: str, symbol: str, qty: float, avg_price: float, mark: float | None = None) -> None:
+        # Acilista/yeniden senkronda hesabin pozisyonu mutlak degerle yazilir.
+        with self._lock:
+            self._roll()
+            row = self._symbols.get(symbol, [0.0, 0.0, 0.0])
+            old_qty, old_avg = self._positions.get((account, symbol), [0.0, 0.0])
+            self._positions[(account, symbol)] = [qty, avg_price if qty else 0.0]
+            mark = mark or row[2] or avg_price
+            self._update(symbol, row[0] - old_qty + qty, row[1] - old_qty * old_avg + qty * avg_price, mark)
+
+    def fill(self, account: str, symbol: str, side: str, qty: float, price: float, realized_pnl: float | None = None) -> float:
+        if qty <= 0 or price <= 0:
+            return 0.0
+        with self._lock:
+            self._roll()
+            position = self._positions.setdefault((account, symbol), [0.0, 0.0])
+            row = self._symbols.get(symbol, [0.0, 0.0, price])
+            old_qty, old_cost = position[0], position[0] * position[1]
+            if side.upper() == "BUY":
+                position[0] += qty
+                position[1] = (old_cost + qty * price) / position[0]
+                realized = 0.0
+            else:
+                # Spot: elde olandan fazlasi satilamaz.
+                closed = min(qty, position[0])
+                realized = (price - position[1]) * closed if position[1] > 0 else 0.0
+                position[0] -= closed
+                if position[0] <= 0:
+                    position[:] = [0.0, 0.0]
+            self._update(symbol, row[0] + position[0] - old_qty, row[1] - old_cost + position[0] * position[1], price)
+            if realized_pnl is not None:
+                # Ucretleri iceren (execution'in hesapladigi) deger esas alinir.
+                realized = realized_pnl
+            self.realized_today += realized
+            self.fills += 1
+            return realized
+
+    def add_realized(self, pnl: float, day: int) -> None:
+        # Restart sonrasi journal'dan bugunun gerceklesmis PnL'i geri yuklenir.
+        with self._lock:
+            self._roll()
+            if day == self.day:
+                self.realized_today += pnl
+
+    def realized_day(self) -> float:
+        # Gunluk zarar limiti bunu kullanir: anlik fiyat dususu (gerceklesmemis) yeni girisi durdurmaz.
+        with self._lock:
+            self._roll()
+            return self.realized_today
+
+    def day_pnl(self) -> float:
+        # Gun icindeki gerceklesmis PnL + gun basindan beri gerceklesmemis PnL degisimi.
+        with self._lock:
+            self._roll()
+            return self.realized_today + self.unrealized - self.day_open_unrealized
+
+    def projected(self, symbol: str, delta_notional: float) -> dict[str, float]:
+        # O(1): sadece ilgili sembolun ve grubunun satiri okunur.
+        with self._lock:
+            row = self._symbols.get(symbol, [0.0, 0.0, 0.0])
+            old = row[0] * row[2]
+            new = old + delta_notional
+            return {
+                "symbol": new,
+                "gross": self.gross + abs(new) - abs(old),
+                "net": self.net + delta_notional,
+                "group": self.group_net.get(self.group_of(symbol), 0.0) + delta_notional,
+            }
+
+    def position(self, account: str, symbol: str) -> tuple[float, float]:
+        with self._lock:
+            qty, avg = self._positions.get((account, symbol), [0.0, 0.0])
+            return qty, avg
+
+    def metrics(self) -> dict[str, Any]:
+        day_pnl = self.day_pnl()
+        with self._lock:
+            return {
+                "gross_notional": round(self.gross, 4),
+                "net_notional": round(self.net, 4),
+                "unrealized_pnl": round(self.unrealized, 4),
+                "realized_today": round(self.realized_today, 4),
+                "day_pnl": round(day_pnl, 4),
+                "symbols": sum(1 for row in self._symbols.values() if row[0]),
+                "groups": {group: round(value, 4) for group, value in self.group_net.items() if abs(value) > 1e-9},
+                "fills_total": self.fills,
+            }
+
+
+# Process'te hesap/mod basina bir defter: ayni defteri paylasan botlar (shard worker'daki semboller) tek portfoydur,
+# farkli hesap/moddaki botlarin exposure'i ve zarari birbirini etkilemez.
+_BOOKS: dict[str, ExposureBook] = {}
+_GROUPS: dict[str, str] = {}
+_BOOKS_LOCK = threading.Lock()
+
+
+def book_name(bot_mode: str, market_type: str, name: str) -> str:
+    return f"{bot_mode}.{market_type}.{name}"
+
+
+def configure(groups: list[str]) -> None:
+    global _GROUPS
+    with _BOOKS_LOCK:
+        _GROUPS = parse_groups(groups)
+        books = list(_BOOKS.values())
+    for book in books:
+        book.configure_groups(_GROUPS)
+
+
+def get_book(name: str) -> ExposureBook:
+    with _BOOKS_LOCK:
+        book = _BOOKS.get(name)
+        if book is None:
+            book = _BOOKS[name] = ExposureBook()
+            book.configure_groups(_GROUPS)
+        return book
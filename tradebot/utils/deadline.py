@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Iterator
+
+# Tick asamasinin bitis zamani (monotonic). contextvars asyncio.to_thread'e kopyalanir; worker thread'deki
+# bloklayan cagri (HTTP/LLM) kendi timeout'unu kalan sureyle sinirlar ve asama bitince gercekten doner.
+_deadline: ContextVar[float | None] = ContextVar("tradebot_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def cap_timeout(default: float) -> float:
+    # Asama suresi dolduysa yeni istek hic baslamaz.
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("stage deadline exceeded")
+    return min(default, left)
@@ -1,3 +1,3 @@
-from tradebot.loggingx.logger import get_logger, get_recent_logs, sanitize_secret
+from tradebot.loggingx.logger import get_log_version, get_logger, get_recent_logs, sanitize_secret
 
-__all__ = ["get_logger", "get_recent_logs", "sanitize_secret"]
+__all__ = ["get_log_version", "get_logger", "get_recent_logs", "sanitize_secret"]